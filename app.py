@@ -8,19 +8,41 @@ Backend Flask completo com:
 - Cashflow V2 (fluxo com adiantamento)
 """
 
-from flask import Flask, jsonify, render_template, send_file
+from flask import Flask, g, jsonify, render_template, request, send_file
 from flask_cors import CORS
 import os
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import pandas as pd
+from datetime import datetime, timedelta
 
 # Importar processadores
 from backend.processors.settlement_processor import SettlementProcessorV3
 from backend.processors.releases_processor import ReleasesProcessorV2
 from backend.processors.reconciliator_v5 import ReconciliatorV5
 from backend.processors.movements_processor import MovementsProcessorV2
+from backend.processors.payout_attribution import PayoutAttributionEngine
+from backend.processors.installment_matcher import InstallmentMatcher
+from backend.processors.orphan_pairing import OrphanPairingEngine
+from backend.processors.mismatch_explainer import MismatchExplainer
+from backend.processors.rule_engine import ReconciliationRuleEngine
 from backend.utils.cashflow import CashFlowCalculatorV2
+from backend.utils.cashflow_index import GRANULARITIES as CASHFLOW_GRANULARITIES
+from backend.utils.receivables_forecast import ReceivablesForecaster
+from backend.utils.receivables_cube import DIMENSIONS as CUBE_DIMENSIONS
+from backend.utils.overdue_tracker import OverdueTracker
+from backend.utils.balance_ledger import BalanceLedger
+from backend.utils.installment_index import InstallmentIndex
 from backend.utils.json_cache import JSONCache
 from backend.utils.exporter import ReportExporter
+from backend.utils.partitions import ROOT_PARTITION, SellerPartitioner
+from backend.utils.period_close import PeriodCloseManager
+from backend.utils.jobs import JobManager, NullProgress
+from backend.utils.snapshot import SnapshotStore
+from backend.utils.response_cache import ResponseCache, data_etag
+from backend.utils.compression import ENCODERS as COMPRESSION_ENCODERS, compress, negotiate
 
 app = Flask(__name__, 
             template_folder='frontend/templates',
@@ -28,15 +50,9 @@ app = Flask(__name__,
 
 CORS(app)
 
-# Cache global em memória
-_cache = {
-    'processed': False,
-    'settlement_proc': None,
-    'releases_proc': None,
-    'reconciliator': None,
-    'movements_proc': None,
-    'cashflow': None
-}
+# Dados em memória: snapshot imutável e versionado, trocado atomicamente
+# (processadores consolidados, partições por conta e rastreador de vencidos)
+_snapshots = SnapshotStore()
 
 # Cache em JSON para persistência
 _json_cache = JSONCache(cache_dir='cache')
@@ -44,155 +60,345 @@ _json_cache = JSONCache(cache_dir='cache')
 # Exportador de relatórios (TXT e JSON)
 _exporter = ReportExporter(output_dir='reports')
 
-def _update_installments_from_releases(installments, releases):
-    """Cruza dados de Settlement com Releases para marcar parcelas como recebidas
-
-    Atualiza o status e received_amount de cada parcela com base nos pagamentos
-    que constam em Releases.
-    """
-    print("    Cruzando dados de Settlement com Releases...")
+# Descoberta das partições por conta Mercado Pago (USER_ID)
+_partitioner = SellerPartitioner(settlement_dir='data/settlement', releases_dir='data/recebimentos')
 
-    # Agrupar releases por external_reference para busca rápida
-    releases_by_ext_ref = {}
-    for release in releases:
-        ext_ref = release.get('external_reference', '')
-        if ext_ref not in releases_by_ext_ref:
-            releases_by_ext_ref[ext_ref] = []
-        releases_by_ext_ref[ext_ref].append(release)
+# Snapshots de períodos fechados (fora do cache: não são limpos por /api/reset)
+_period_manager = PeriodCloseManager(base_dir='periods')
 
-    updated_count = 0
+# Máximo de partições processadas em paralelo
+MAX_PARTITION_WORKERS = 4
 
-    # Para cada parcela, procurar se foi recebida
-    for installment in installments:
-        ext_ref = installment.get('external_reference', '')
+# Etapas do pipeline (progresso dos jobs de processamento)
+PARTITION_STAGES = ['settlement', 'releases', 'movements', 'reconciliation',
+                    'installments', 'cashflow', 'ledger', 'partition_cache']
+PROCESS_STAGES = ['discover'] + PARTITION_STAGES + ['merge', 'overdue', 'cube', 'cache']
 
-        # Procurar releases para este external_reference
-        if ext_ref in releases_by_ext_ref:
-            releases_list = releases_by_ext_ref[ext_ref]
+# Jobs de processamento em segundo plano (POST /api/process)
+_jobs = JobManager(PROCESS_STAGES)
 
-            # Somar todos os pagamentos (PAYMENT type)
-            total_received = 0.0
-            received_dates = []
+# Um processamento por vez (jobs e fechamento de período)
+_process_lock = threading.Lock()
 
-            for release in releases_list:
-                desc = str(release.get('description', '')).lower()
+# Rotas de leitura cujas respostas dependem apenas do snapshot (ETag / 304)
+CACHEABLE_PREFIXES = (
+    '/api/summary', '/api/sellers', '/api/ledger', '/api/periods', '/api/transactions',
+    '/api/installments', '/api/cashflow', '/api/reconciliation', '/api/movements', '/api/debug'
+)
 
-                # Buscar pagamentos diretos
-                if desc == 'payment':
-                    amount = float(release.get('net_credit_amount', 0))
-                    total_received += amount
+# Respostas de leitura já serializadas (LRU, esvaziado a cada nova versão)
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESPONSE_CACHE_MAX_ENTRIES = 512
+_response_cache = ResponseCache(max_bytes=RESPONSE_CACHE_MAX_BYTES, max_entries=RESPONSE_CACHE_MAX_ENTRIES)
 
-                    # Guardar data de recebimento
-                    release_date = release.get('money_release_date')
-                    if release_date:
-                        received_dates.append(release_date)
+# Respostas JSON a partir deste tamanho são comprimidas (gzip/br/zstd negociado)
+COMPRESSION_MIN_BYTES = 1024
 
-            # Se encontrou pagamentos, marcar como recebido
-            if total_received > 0:
-                installment['status'] = 'received'
-                installment['received_amount'] = round(total_received, 2)
+def _update_installments_from_releases(installments, releases):
+    """Cruza dados de Settlement com Releases para marcar parcelas como recebidas
 
-                # Usar a data mais recente de recebimento
-                if received_dates:
-                    received_dates.sort()
-                    installment['received_date'] = received_dates[-1]
+    Faz o join por (SOURCE_ID, número da parcela) via InstallmentMatcher:
+    cada parcela recebe o próprio valor, data de recebimento e dias de adiantamento.
+    """
+    print("    Cruzando dados de Settlement com Releases...")
 
-                updated_count += 1
+    matcher = InstallmentMatcher(releases)
+    updated_count = matcher.apply(installments)
 
     print(f"    {updated_count} parcelas marcadas como recebidas")
 
-def process_all_data():
-    """Processa todos os dados e atualiza cache (memória + JSON)"""
-    print("\n" + "="*70)
-    print(" PROCESSANDO DADOS - V5 COM CACHE JSON")
-    print("="*70)
+def _aggregates_payload(reconciliator):
+    """Tabela de agregados por SOURCE_ID para persistir (reclassificação sem reprocessar)"""
+    return {
+        'columns': reconciliator.aggregates.to_dict(orient='list'),
+        'orphan_settlement': len(reconciliator.results['orphan_settlement']),
+        'orphan_releases': len(reconciliator.results['orphan_releases']),
+        'rules': reconciliator.rule_engine.to_dict()
+    }
+
+def _process_partition(partition, progress=None, folder_keys=()):
+    """Executa o pipeline completo de uma partição (conta Mercado Pago)
+
+    Cada partição é ingerida, conciliada e salva em cache de forma independente.
+    progress recebe o andamento por etapa (ProcessingJob; opcional).
+    folder_keys: pastas por conta descobertas; a partição da raiz não pode
+    resolver para uma conta que já tem pasta própria.
+    """
+    progress = progress or NullProgress()
+    key = partition['partition_key']
+    print(f"\n[PARTICAO {key}] Iniciando processamento...")
+
+    # Estado dos períodos fechados: itens congelados e linhas dos arquivos pulados
+    period_state = _period_manager.load_state(key, partition)
+    if period_state['closed_through']:
+        print(f"[{key}] Períodos fechados até {period_state['closed_through']}: "
+              f"{len(period_state['frozen_ids'])} SOURCE_IDs congelados")
 
     # 1. Processar Settlement
-    print("\n1. PROCESSANDO SETTLEMENT...")
-    settlement_proc = SettlementProcessorV3()
-    settlement_proc.process_files('data/settlement')
+    print(f"\n[{key}] 1. PROCESSANDO SETTLEMENT...")
+    with progress.step('settlement', key):
+        settlement_proc = SettlementProcessorV3()
+        settlement_proc.process_files(
+            partition['settlement_dir'],
+            skip_files=period_state['skip_settlement_files'],
+            extra_rows=period_state['skipped_settlement_rows'],
+            exclude_source_ids=period_state['frozen_ids']
+        )
+        # Atividade tardia: só linhas congeladas que não existiam no fechamento
+        settlement_proc.late_rows = _period_manager.late_rows(period_state, 'settlement', settlement_proc.late_rows)
+        progress.add_rows('settlement', len(settlement_proc.transactions))
+
+    seller_id = SellerPartitioner.resolve_seller_id(key, settlement_proc.transactions)
+    if key == ROOT_PARTITION and seller_id in folder_keys:
+        raise ValueError(_duplicate_seller_message(seller_id))
 
     # 2. Processar Recebimentos
-    print("\n2. PROCESSANDO RECEBIMENTOS...")
-    releases_proc = ReleasesProcessorV2()
-    releases_proc.process_files('data/recebimentos')
+    print(f"\n[{key}] 2. PROCESSANDO RECEBIMENTOS...")
+    with progress.step('releases', key):
+        releases_proc = ReleasesProcessorV2()
+        releases_proc.process_files(
+            partition['releases_dir'],
+            skip_files=period_state['skip_releases_files'],
+            extra_rows=period_state['skipped_releases_rows'],
+            exclude_source_ids=period_state['frozen_ids']
+        )
+        releases_proc.late_rows = _period_manager.late_rows(period_state, 'releases', releases_proc.late_rows)
+        progress.add_rows('releases', len(releases_proc.releases))
 
     # 3. Processar Movimentações
-    print("\n3. PROCESSANDO MOVIMENTACOES...")
-    movements = releases_proc.get_movements()
-    movements_proc = MovementsProcessorV2(movements)
+    print(f"\n[{key}] 3. PROCESSANDO MOVIMENTACOES...")
+    with progress.step('movements', key):
+        movements_proc = MovementsProcessorV2(releases_proc.get_movements())
+        progress.add_rows('movements', len(movements_proc.movements))
 
     # 4. Conciliar usando ReconciliatorV5 com SOURCE_ID
-    print("\n4. CONCILIANDO COM V5 (SOURCE_ID)...")
+    # SOURCE_IDs congelados entram pelo resultado do fechamento, não pelas linhas
+    print(f"\n[{key}] 4. CONCILIANDO COM V5 (SOURCE_ID)...")
+    with progress.step('reconciliation', key):
+        frozen_ids = period_state['frozen_ids']
+        reconciliator = ReconciliatorV5()
+        reconciliator.process(
+            [t for t in settlement_proc.transactions if t['source_id'] not in frozen_ids],
+            [r for r in releases_proc.releases if r['source_id'] not in frozen_ids]
+        )
+        reconciliator.aggregates['seller_id'] = seller_id
+        reconciliator.add_frozen(period_state['frozen_items'])
+        progress.add_rows('reconciliation', len(reconciliator.aggregates))
 
-    # Obter dados processados do settlement
-    settlement_data = settlement_proc.transactions  # Settlement processado
+    # 4b. Cruzar dados de Settlement com Releases para marcar parcelas como recebidas
+    print(f"\n[{key}] 4b. ATUALIZANDO STATUS DAS PARCELAS...")
+    with progress.step('installments', key):
+        # Parcelas dos SOURCE_IDs congelados vêm do snapshot (status do fechamento),
+        # sem recalcular nem cruzar com os releases atuais
+        installments = settlement_proc.get_installments()
+        installments[:] = [i for i in installments if i['source_id'] not in frozen_ids]
+        for installment in installments:
+            installment['seller_id'] = seller_id
+        _update_installments_from_releases(installments, releases_proc.releases)
+
+        installments.extend(period_state['frozen_installments'])
+        settlement_proc.order_balances.update(period_state['frozen_order_balances'])
+        progress.add_rows('installments', len(installments))
 
-    # Obter todos os dados de recebimentos (including movements)
-    releases_data = releases_proc.releases
+    # 5. Calcular Fluxo de Caixa
+    print(f"\n[{key}] 5. CALCULANDO FLUXO DE CAIXA...")
+    with progress.step('cashflow', key):
+        cashflow = CashFlowCalculatorV2(installments)
+        progress.add_rows('cashflow', len(installments))
+
+    with progress.step('ledger', key):
+        # 5b. Razão de saldo da conta (releases ordenados + saldo acumulado)
+        ledger = BalanceLedger(releases_proc.releases)
+
+        # 5c. Atribuição FIFO dos payouts aos créditos que os financiaram
+        payout_attribution = PayoutAttributionEngine(releases_proc.releases)
+        progress.add_rows('ledger', len(ledger))
+
+    partition_result = {
+        'partition_key': key,
+        'seller_id': seller_id,
+        'fingerprint': partition['fingerprint'],
+        'settlement_files': partition['settlement_files'],
+        'releases_files': partition['releases_files'],
+        'processed_at': datetime.now().isoformat(),
+        'closed_through': period_state['closed_through'],
+        'settlement_proc': settlement_proc,
+        'releases_proc': releases_proc,
+        'reconciliator': reconciliator,
+        'movements_proc': movements_proc,
+        'cashflow': cashflow,
+        'ledger': ledger,
+        'payout_attribution': payout_attribution
+    }
 
-    # Usar ReconciliatorV5 que faz matching por SOURCE_ID
-    reconciliator = ReconciliatorV5()
-    reconciliation_results = reconciliator.process(settlement_data, releases_data)
+    # 6. Salvar cache JSON da partição
+    print(f"\n[{key}] 6. SALVANDO CACHE JSON DA PARTICAO...")
+    with progress.step('partition_cache', key):
+        _save_json_cache(JSONCache(cache_dir=os.path.join('cache', 'sellers', seller_id)), partition_result)
+        progress.add_rows('partition_cache', 1)
 
-    # Manter referencias necessarias para compatibilidade com cache e rotas
-    installments = settlement_proc.get_installments()
+    return partition_result
 
-    # 4b. Cruzar dados de Settlement com Releases para marcar parcelas como recebidas
-    print("\n4b. ATUALIZANDO STATUS DAS PARCELAS...")
-    _update_installments_from_releases(installments, releases_proc.releases)
+def _duplicate_seller_message(seller_id):
+    return (
+        f"Arquivos na raiz pertencem à conta {seller_id}, que já tem pasta própria; "
+        f"mova-os para data/settlement/{seller_id}/ e data/recebimentos/{seller_id}/"
+    )
 
-    # 5. Calcular Fluxo de Caixa
-    print("\n5. CALCULANDO FLUXO DE CAIXA...")
-    cashflow = CashFlowCalculatorV2(installments)
+def _check_duplicate_sellers(partitions):
+    """Rejeita duas partições resolvidas para a mesma conta (USER_ID)
 
-    # 6. Salvar em Cache JSON
-    print("\n6. SALVANDO EM CACHE JSON...")
+    Seriam somadas duas vezes na visão consolidada e gravariam o mesmo
+    cache/sellers/<conta>.
+    """
+    seen = {}
+    for key, partition in sorted(partitions.items()):
+        seller_id = partition['seller_id']
+        if seller_id in seen:
+            raise ValueError(_duplicate_seller_message(seller_id))
+        seen[seller_id] = key
+
+def _merge_partitions(partitions):
+    """Combina as partições em uma visão consolidada (todas as contas)"""
+    partitions = sorted(partitions, key=lambda p: p['seller_id'])
+
+    settlement_proc = SettlementProcessorV3.merge(
+        [p['settlement_proc'] for p in partitions],
+        [p['seller_id'] for p in partitions]
+    )
+    releases_proc = ReleasesProcessorV2.merge(p['releases_proc'] for p in partitions)
+    reconciliator = ReconciliatorV5.merge(p['reconciliator'] for p in partitions)
+
+    if len(partitions) == 1:
+        movements_proc = partitions[0]['movements_proc']
+        cashflow = partitions[0]['cashflow']
+        ledger = partitions[0]['ledger']
+        payout_attribution = partitions[0]['payout_attribution']
+    else:
+        movements_proc = MovementsProcessorV2(releases_proc.get_movements())
+        cashflow = CashFlowCalculatorV2(settlement_proc.get_installments())
+        ledger = BalanceLedger(releases_proc.releases)
+        payout_attribution = PayoutAttributionEngine(releases_proc.releases)
+
+    return {
+        'settlement_proc': settlement_proc,
+        'releases_proc': releases_proc,
+        'reconciliator': reconciliator,
+        'movements_proc': movements_proc,
+        'cashflow': cashflow,
+        'ledger': ledger,
+        'payout_attribution': payout_attribution
+    }
 
-    settlement_summary = settlement_proc.get_summary()
-    releases_summary = releases_proc.get_summary()
+def _save_json_cache(json_cache, data):
+    """Salva resumos de um conjunto de processadores em um JSONCache"""
+    metadata = {
+        'processed_at': datetime.now().isoformat(),
+        'version': 'V5',
+        'cache_format': 'JSON'
+    }
+    if 'seller_id' in data:
+        metadata['seller_id'] = data['seller_id']
+        metadata['fingerprint'] = data['fingerprint']
 
-    # Usar resumo do ReconciliatorV5
-    reconciliation_summary = reconciliator.get_summary()
+    json_cache.save_settlement(data['settlement_proc'].get_summary())
+    json_cache.save_releases(data['releases_proc'].get_summary())
+    json_cache.save_reconciliation(data['reconciliator'].get_summary())
+    json_cache.save_aggregates(_aggregates_payload(data['reconciliator']))
+    json_cache.save_cashflow(data['cashflow'].get_summary())
+    json_cache.save_metadata(metadata)
 
-    movements_summary = movements_proc.get_full_summary()
-    cashflow_summary = cashflow.get_summary()
+def process_all_data(force=False, force_keys=None, progress=None):
+    """Processa todos os dados e atualiza cache (memória + JSON)
 
-    # Preparar dados para cache JSON
-    cache_data = {
-        'settlement': settlement_summary,
-        'releases': releases_summary,
-        'reconciliation': reconciliation_summary,
-        'movements': movements_summary,
-        'cashflow': cashflow_summary,
-        'metadata': {
-            'processed_at': datetime.now().isoformat(),
-            'version': 'V5',
-            'cache_format': 'JSON'
-        }
-    }
+    Os dados são particionados por conta Mercado Pago (USER_ID). Apenas as
+    partições novas ou com arquivos alterados são reprocessadas, em paralelo;
+    use force=True para reprocessar todas ou force_keys para partições específicas.
+
+    O novo conjunto é montado à parte: até o fim, as leituras continuam sendo
+    servidas pelos dados anteriores. progress recebe o andamento (ProcessingJob).
+
+    Returns:
+        DataSnapshot publicado
+    """
+    with _process_lock:
+        return _process_all_data(force, set(force_keys or []), progress or NullProgress())
+
+def _process_all_data(force, force_keys, progress):
+    print("\n" + "="*70)
+    print(" PROCESSANDO DADOS - V5 COM CACHE JSON (POR CONTA)")
+    print("="*70)
+
+    with progress.step('discover'):
+        partitions = _partitioner.discover()
+        progress.add_rows('discover', len(partitions))
+
+    # Cópia das partições: o snapshot atual segue servindo leituras até a troca
+    updated = dict(_snapshots.current.partitions)
+
+    # Remover partições cujos arquivos não existem mais
+    for key in list(updated.keys()):
+        if key not in partitions:
+            print(f"\n  Partição removida: {key}")
+            del updated[key]
 
-    # Salvar cada componente
-    _json_cache.save_settlement(settlement_summary)
-    _json_cache.save_releases(releases_summary)
-    _json_cache.save_reconciliation(reconciliation_summary)
-    _json_cache.save_cashflow(cashflow_summary)
-    _json_cache.save_metadata(cache_data['metadata'])
-
-    # Atualizar cache em memória
-    _cache['processed'] = True
-    _cache['settlement_proc'] = settlement_proc
-    _cache['releases_proc'] = releases_proc
-    _cache['reconciliator'] = reconciliator
-    _cache['movements_proc'] = movements_proc
-    _cache['cashflow'] = cashflow
+    changed = [
+        p for key, p in partitions.items()
+        if force or key in force_keys or key not in updated
+        or updated[key]['fingerprint'] != p['fingerprint']
+    ]
+
+    print(f"\n  Partições encontradas: {len(partitions)} | a processar: {len(changed)}")
+    progress.expect(PARTITION_STAGES, [p['partition_key'] for p in changed])
+
+    if changed:
+        folder_keys = frozenset(key for key in partitions if key != ROOT_PARTITION)
+        workers = min(len(changed), MAX_PARTITION_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            process = partial(_process_partition, progress=progress, folder_keys=folder_keys)
+            for result in executor.map(process, changed):
+                updated[result['partition_key']] = result
+
+    _check_duplicate_sellers(updated)
+
+    # Visão consolidada (todas as contas)
+    with progress.step('merge'):
+        merged = _merge_partitions(updated.values())
+        progress.add_rows('merge', len(updated))
+
+    # Parcelas vencidas: pending -> overdue (e a cada virada de dia, via before_request)
+    # O índice por status de /api/installments/* acompanha as promoções
+    with progress.step('overdue'):
+        installments = merged['settlement_proc'].get_installments()
+        merged['installment_index'] = InstallmentIndex(installments)
+        overdue_tracker = OverdueTracker(
+            installments,
+            on_change=[p['cashflow'].invalidate for p in updated.values()] + [merged['cashflow'].invalidate],
+            on_promote=[merged['installment_index'].move_status]
+        )
+        progress.add_rows('overdue', overdue_tracker.get_status()['indexed'])
+
+    # Pré-agregar o cubo de recebíveis (consultas não tocam nas parcelas)
+    with progress.step('cube'):
+        progress.add_rows('cube', len(merged['cashflow'].get_cube()))
+
+    print("\n7. SALVANDO CACHE JSON CONSOLIDADO...")
+    with progress.step('cache'):
+        _save_json_cache(_json_cache, merged)
+        progress.add_rows('cache', 1)
+
+    # Publicar o novo conjunto (uma única troca de referência)
+    snapshot = _snapshots.publish(partitions=updated, overdue_tracker=overdue_tracker, **merged)
 
     print("\n" + "="*70)
-    print(" PROCESSAMENTO CONCLUIDO!")
+    print(f" PROCESSAMENTO CONCLUIDO! (versão {snapshot.version})")
+    print(f" Contas: {', '.join(sorted(p['seller_id'] for p in updated.values()))}")
     print(f" Cache JSON salvo em: {_json_cache.cache_dir}")
     print(f" Tamanho do cache: {_json_cache.get_cache_size()} MB")
     print("="*70 + "\n")
 
+    return snapshot
+
 # ========================================
 # ROTAS
 # ========================================
@@ -219,69 +425,194 @@ def test():
         ]
     })
 
+@app.before_request
+def _roll_overdue():
+    """Virada de dia: promove parcelas vencidas (sem custo se o dia não mudou)"""
+    tracker = _snapshots.current.overdue_tracker
+    if tracker is not None:
+        tracker.advance()
+
+def _request_etag(snapshot):
+    """ETag da requisição atual (None se a rota não for uma leitura cacheável)"""
+    if request.method not in ('GET', 'HEAD') or not snapshot.processed:
+        return None
+    if not request.path.startswith(CACHEABLE_PREFIXES):
+        return None
+    tracker = snapshot.overdue_tracker
+    return data_etag(snapshot.version, tracker.today if tracker else None, request.path, request.args)
+
+def _etag_variants(etag):
+    return [etag] + [f'{etag}-{encoding}' for encoding in COMPRESSION_ENCODERS]
+
+def _cache_generation(snapshot):
+    """Geração das respostas em cache: versão do snapshot + dia do rastreador"""
+    tracker = snapshot.overdue_tracker
+    return snapshot.version, tracker.today if tracker else None
+
+@app.before_request
+def _conditional_get():
+    """If-None-Match com o ETag da versão atual: 304 sem executar a rota
+
+    Sem If-None-Match válido, respostas já serializadas saem do cache.
+    """
+    snapshot = _snapshots.current
+    etag = _request_etag(snapshot)
+    g.etag = etag
+    g.etag_generation = _cache_generation(snapshot)
+    g.from_cache = False
+
+    if not etag:
+        return None
+
+    # O ETag da representação comprimida tem o sufixo da codificação
+    matched = next((tag for tag in _etag_variants(etag) if request.if_none_match.contains(tag)), None)
+    if matched:
+        response = app.response_class(status=304)
+        response.set_etag(matched)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    cached = _response_cache.get(etag, g.etag_generation)
+    if cached is not None:
+        g.from_cache = True
+        return app.response_class(cached['body'], mimetype=cached['mimetype'])
+
+@app.after_request
+def _set_etag(response):
+    """Marca respostas 200 de leitura com o ETag e guarda o corpo serializado
+
+    Só se a geração (versão do snapshot e dia do rastreador) não mudou
+    durante a rota.
+    """
+    etag = g.get('etag')
+    cacheable = (
+        bool(etag) and response.status_code == 200 and
+        _cache_generation(_snapshots.current) == g.etag_generation
+    )
+    if cacheable:
+        if not g.from_cache and not response.direct_passthrough:
+            _response_cache.put(etag, g.etag_generation, response.get_data(), response.mimetype)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+
+    _compress_response(response, etag if cacheable else None)
+    return response
+
+def _compress_response(response, etag=None):
+    """Comprime respostas JSON grandes com a codificação aceita pelo cliente
+
+    Com etag, a versão comprimida é reaproveitada do cache de respostas.
+    """
+    if response.direct_passthrough or response.mimetype != 'application/json':
+        return
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return
+
+    response.vary.add('Accept-Encoding')
+    if response.content_length is not None and response.content_length < COMPRESSION_MIN_BYTES:
+        return
+
+    encoding = negotiate(request.accept_encodings)
+    if encoding is None:
+        return
+
+    body = _response_cache.get_encoded(etag, g.etag_generation, encoding) if etag else None
+    if body is None:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_BYTES:
+            return
+        body = compress(data, encoding)
+        if etag:
+            _response_cache.put_encoded(etag, g.etag_generation, encoding, body)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(f'{etag}-{encoding}')
+
 @app.route('/api/status')
 def status():
     """Status do sistema"""
-    settlement_files = 0
-    recebimentos_files = 0
-    
-    if os.path.exists('data/settlement'):
-        settlement_files = len([
-            f for f in os.listdir('data/settlement') 
-            if f.endswith(('.xlsx', '.xls', '.csv'))
-        ])
-    
-    if os.path.exists('data/recebimentos'):
-        recebimentos_files = len([
-            f for f in os.listdir('data/recebimentos') 
-            if f.endswith(('.xlsx', '.xls'))
-        ])
-    
+    snapshot = _snapshots.current
+    partitions = _partitioner.discover()
+
+    settlement_files = sum(len(p['settlement_files']) for p in partitions.values())
+    recebimentos_files = sum(len(p['releases_files']) for p in partitions.values())
+
     return jsonify({
-        'processed': _cache['processed'],
+        'processed': snapshot.processed,
+        'snapshot': snapshot.describe(),
         'settlement_files': settlement_files,
         'recebimentos_files': recebimentos_files,
+        'partitions': len(partitions),
+        'overdue_tracker': snapshot.overdue_tracker.get_status() if snapshot.overdue_tracker else None,
+        'processing_job': _jobs.active.job_id if _jobs.active else None,
         'version': 'V5'
     })
 
+def _process_job(job, force=False):
+    """Corpo do job de processamento: pipeline completo + resumos do resultado"""
+    snapshot = process_all_data(force=force, progress=job)
+
+    return {
+        'settlement': snapshot['settlement_proc'].get_summary(),
+        'releases': snapshot['releases_proc'].get_summary(),
+        'reconciliation': snapshot['reconciliator'].get_summary(),
+        'movements': snapshot['movements_proc'].get_full_summary(),
+        'snapshot_version': snapshot.version,
+        'version': 'V5'
+    }
+
 @app.route('/api/process', methods=['POST'])
 def process():
-    """Processar/reprocessar dados"""
-    try:
-        process_all_data()
-        
-        settlement_summary = _cache['settlement_proc'].get_summary()
-        releases_summary = _cache['releases_proc'].get_summary()
-        detailed_status = _cache['reconciliator'].get_summary()
-        movements_summary = _cache['movements_proc'].get_full_summary()
-        
-        return jsonify({
-            'success': True,
-            'settlement': settlement_summary,
-            'releases': releases_summary,
-            'reconciliation': detailed_status,
-            'movements': movements_summary,
-            'version': 'V5'
-        })
-        
-    except Exception as e:
-        import traceback
-        return jsonify({
-            'success': False,
-            'error': str(e),
-            'traceback': traceback.format_exc()
-        }), 500
+    """Processar/reprocessar dados em segundo plano
+
+    Reprocessa apenas as contas com arquivos novos/alterados.
+    Use ?force=1 para reprocessar todas.
+
+    Retorna 202 com o job_id; acompanhe em /api/process/jobs/<job_id>.
+    Os dados anteriores continuam disponíveis até o job terminar.
+    """
+    force = request.args.get('force', '0') in ['1', 'true']
+    job, created = _jobs.submit(partial(_process_job, force=force), params={'force': force})
+
+    return jsonify({
+        'success': True,
+        'job_id': job.job_id,
+        'created': created,
+        'status_url': f'/api/process/jobs/{job.job_id}',
+        'job': _jobs.describe(job)
+    }), 202
+
+@app.route('/api/process/jobs')
+def process_jobs():
+    """Jobs de processamento recentes (mais recentes primeiro)"""
+    active = _jobs.active
+
+    return jsonify({
+        'success': True,
+        'active_job_id': active.job_id if active else None,
+        'jobs': _jobs.list()
+    })
+
+@app.route('/api/process/jobs/<job_id>')
+def process_job_status(job_id):
+    """Andamento de um job: etapa atual, linhas por etapa, ETA e resultado"""
+    job = _jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} não encontrado'}), 404
+
+    return jsonify({
+        'success': True,
+        'job': _jobs.describe(job)
+    })
 
 @app.route('/api/reset', methods=['GET'])
 def reset():
     """Limpar cache (memória e JSON)"""
     # Limpar cache em memória
-    _cache['processed'] = False
-    _cache['settlement_proc'] = None
-    _cache['releases_proc'] = None
-    _cache['reconciliator'] = None
-    _cache['movements_proc'] = None
-    _cache['cashflow'] = None
+    _snapshots.clear()
+    _response_cache.clear()
 
     # Limpar cache em JSON
     _json_cache.clear_all()
@@ -298,20 +629,22 @@ def cache_info():
 
     return jsonify({
         'success': True,
-        'cache_info': info
+        'cache_info': info,
+        'response_cache': _response_cache.get_stats()
     })
 
 @app.route('/api/summary')
 def summary():
     """Resumo geral (para dashboard)"""
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
 
-    settlement_summary = _cache['settlement_proc'].get_summary()
-    releases_summary = _cache['releases_proc'].get_summary()
-    reconciliation_summary = _cache['reconciliator'].get_summary()
-    movements_summary = _cache['movements_proc'].get_full_summary()
-    cashflow_summary = _cache['cashflow'].get_summary()
+    settlement_summary = snapshot['settlement_proc'].get_summary()
+    releases_summary = snapshot['releases_proc'].get_summary()
+    reconciliation_summary = snapshot['reconciliator'].get_summary()
+    movements_summary = snapshot['movements_proc'].get_full_summary()
+    cashflow_summary = snapshot['cashflow'].get_summary()
 
     return jsonify({
         'success': True,
@@ -323,6 +656,256 @@ def summary():
         'version': 'V5'
     })
 
+# ========================================
+# CONTAS (VENDEDORES)
+# ========================================
+
+def _find_partition(snapshot, seller_id):
+    """Retorna a partição processada de uma conta (USER_ID) no snapshot"""
+    for partition in snapshot.partitions.values():
+        if partition['seller_id'] == seller_id:
+            return partition
+    return None
+
+@app.route('/api/sellers')
+def sellers():
+    """Lista as contas Mercado Pago processadas com seus resumos"""
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    sellers_list = []
+    for partition in sorted(snapshot.partitions.values(), key=lambda p: p['seller_id']):
+        sellers_list.append({
+            'seller_id': partition['seller_id'],
+            'partition': partition['partition_key'],
+            'processed_at': partition['processed_at'],
+            'settlement_files': partition['settlement_files'],
+            'releases_files': partition['releases_files'],
+            'reconciliation': partition['reconciliator'].get_summary(),
+            'cashflow': partition['cashflow'].get_summary()
+        })
+
+    return jsonify({
+        'success': True,
+        'sellers': sellers_list,
+        'count': len(sellers_list)
+    })
+
+@app.route('/api/sellers/<seller_id>/summary')
+def seller_summary(seller_id):
+    """Resumo completo de uma conta"""
+    snapshot = _snapshots.current
+    partition = _find_partition(snapshot, seller_id)
+    if not partition:
+        return jsonify({'error': f'Conta não encontrada: {seller_id}'}), 404
+
+    return jsonify({
+        'success': True,
+        'seller_id': seller_id,
+        'settlement': partition['settlement_proc'].get_summary(),
+        'releases': partition['releases_proc'].get_summary(),
+        'reconciliation': partition['reconciliator'].get_summary(),
+        'movements': partition['movements_proc'].get_full_summary(),
+        'cashflow': partition['cashflow'].get_summary(),
+        'version': 'V5'
+    })
+
+@app.route('/api/sellers/<seller_id>/reconciliation')
+def seller_reconciliation(seller_id):
+    """Resultado da conciliação de uma conta"""
+    snapshot = _snapshots.current
+    partition = _find_partition(snapshot, seller_id)
+    if not partition:
+        return jsonify({'error': f'Conta não encontrada: {seller_id}'}), 404
+
+    return jsonify({
+        'success': True,
+        'seller_id': seller_id,
+        'results': partition['reconciliator'].get_results()
+    })
+
+# ========================================
+# SALDO DA CONTA (LEDGER)
+# ========================================
+
+def _ledger_for_request(snapshot):
+    """Ledger consolidado ou da conta em ?seller_id (None se a conta não existir)"""
+    seller_id = request.args.get('seller_id')
+    if not seller_id:
+        return snapshot['ledger']
+    partition = _find_partition(seller_id)
+    return partition['ledger'] if partition else None
+
+@app.route('/api/ledger/summary')
+def ledger_summary():
+    """Saldos inicial/final e extremos do saldo da conta"""
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    ledger = _ledger_for_request(snapshot)
+    if ledger is None:
+        return jsonify({'error': 'Conta não encontrada'}), 404
+
+    return jsonify({
+        'success': True,
+        'summary': ledger.get_summary()
+    })
+
+@app.route('/api/ledger/balance')
+def ledger_balance():
+    """Saldo da conta ao fim de uma data
+
+    Query: date (YYYY-MM-DD; padrão: hoje), seller_id (opcional)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    ledger = _ledger_for_request(snapshot)
+    if ledger is None:
+        return jsonify({'error': 'Conta não encontrada'}), 404
+
+    date = request.args.get('date') or datetime.now().strftime('%Y-%m-%d')
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': f'Data inválida: {date} (use YYYY-MM-DD)'}), 400
+
+    return jsonify({
+        'success': True,
+        'date': date,
+        'balance': ledger.balance_at(date)
+    })
+
+@app.route('/api/ledger/daily')
+def ledger_daily():
+    """Saldo de fechamento diário
+
+    Query: start, end (YYYY-MM-DD), seller_id (opcional)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    ledger = _ledger_for_request(snapshot)
+    if ledger is None:
+        return jsonify({'error': 'Conta não encontrada'}), 404
+
+    start, end, _, error = _cashflow_query('day')
+    if error:
+        return jsonify({'error': error}), 400
+
+    return jsonify({
+        'success': True,
+        'daily': ledger.daily_series(start, end)
+    })
+
+@app.route('/api/ledger/entries')
+def ledger_entries():
+    """Lançamentos com saldo corrente
+
+    Query: start, end (YYYY-MM-DD), limit (padrão 100), offset, seller_id (opcional)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    ledger = _ledger_for_request(snapshot)
+    if ledger is None:
+        return jsonify({'error': 'Conta não encontrada'}), 404
+
+    start, end, _, error = _cashflow_query('day')
+    if error:
+        return jsonify({'error': error}), 400
+
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    page = ledger.entries(start, end, limit=limit, offset=offset)
+
+    return jsonify({
+        'success': True,
+        'total': page['total'],
+        'limit': limit,
+        'offset': offset,
+        'entries': page['entries']
+    })
+
+# ========================================
+# FECHAMENTO DE PERÍODOS
+# ========================================
+
+@app.route('/api/periods')
+def periods():
+    """Períodos fechados por conta e atividade tardia em itens congelados"""
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    accounts = []
+    for partition in sorted(snapshot.partitions.values(), key=lambda p: p['seller_id']):
+        late_rows = partition['settlement_proc'].late_rows + partition['releases_proc'].late_rows
+        accounts.append({
+            'seller_id': partition['seller_id'],
+            'closed_through': partition['closed_through'],
+            'periods': _period_manager.list_periods(partition['partition_key']),
+            'late_activity': {
+                'count': len(late_rows),
+                'source_ids': sorted({r['source_id'] for r in late_rows})
+            }
+        })
+
+    return jsonify({
+        'success': True,
+        'sellers': accounts
+    })
+
+@app.route('/api/periods/close', methods=['POST'])
+def close_period():
+    """Fecha um mês: congela itens conciliados e leva adiante os itens em aberto
+
+    Body JSON: {"period": "YYYY-MM", "seller_id": "..." (opcional, padrão: todas)}
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    body = request.get_json(silent=True) or {}
+    period = body.get('period')
+    seller_id = body.get('seller_id')
+
+    targets = [
+        p for p in snapshot.partitions.values()
+        if not seller_id or p['seller_id'] == seller_id
+    ]
+    if not targets:
+        return jsonify({'error': f'Conta não encontrada: {seller_id}'}), 404
+
+    discovered = _partitioner.discover()
+    closed = []
+
+    try:
+        for partition in targets:
+            closed.append(_period_manager.close_period(
+                discovered.get(partition['partition_key'], partition),
+                partition['seller_id'],
+                period,
+                partition['settlement_proc'],
+                partition['releases_proc'],
+                partition['reconciliator']
+            ))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e), 'closed': closed}), 400
+
+    # Reprocessar as contas fechadas a partir dos snapshots
+    process_all_data(force_keys=[p['partition_key'] for p in targets])
+
+    return jsonify({
+        'success': True,
+        'closed': closed
+    })
+
 # ========================================
 # TRANSAÇÕES E PARCELAS
 # ========================================
@@ -330,164 +913,348 @@ def summary():
 @app.route('/api/transactions')
 def transactions():
     """Lista todas as transações"""
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
     
-    transactions = _cache['settlement_proc'].get_transactions_summary()
+    transactions = snapshot['settlement_proc'].get_transactions_summary()
     
     return jsonify({
         'success': True,
         'transactions': transactions
     })
 
+def _installments_page(snapshot, view):
+    """Página de uma visão do índice de parcelas (query: limit, offset)"""
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, 5000))
+    offset = max(0, request.args.get('offset', 0, type=int))
+
+    return snapshot['installment_index'].get_page(view, limit=limit, offset=offset)
+
 @app.route('/api/installments/pending')
 def pending_installments():
     """Parcelas pendentes - Ordenadas do mais antigo para o mais recente
 
     Mostra todas as parcelas com saldo pendente de receber (incluindo futuras)
+    Query: limit, offset (padrão: todas)
     """
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
 
-    # Obter parcelas pendentes do Settlement
-    installments = _cache['settlement_proc'].get_installments()
-    pending = [i for i in installments if i.get('status') == 'pending']
-
-    # Ordenar por data de vencimento (do mais antigo para o mais recente)
-    pending_sorted = sorted(
-        pending,
-        key=lambda x: x.get('money_release_date') or '9999-12-31'
-    )
-
-    total = sum(float(i.get('installment_net_amount', 0)) for i in pending_sorted)
+    page = _installments_page(snapshot, 'pending')
 
     return jsonify({
         'success': True,
-        'installments': pending_sorted,
-        'count': len(pending_sorted),
-        'total_amount': round(total, 2)
+        'installments': page['installments'],
+        'count': page['count'],
+        'total_amount': page['total_amount'],
+        'page_amount': page['page_amount'],
+        'limit': page['limit'],
+        'offset': page['offset']
     })
 
 @app.route('/api/installments/received')
 def received_installments():
-    """Parcelas recebidas - Ordenadas da mais recente para a mais antiga"""
-    if not _cache['processed']:
-        return jsonify({'error': 'Dados não processados'}), 400
+    """Parcelas recebidas - Ordenadas da mais recente para a mais antiga
 
-    installments = _cache['settlement_proc'].get_installments()
-    received = [i for i in installments if i.get('status') in ['received', 'received_advance']]
-
-    # Ordenar por data de recebimento (do mais recente para o mais antigo)
-    received_sorted = sorted(
-        received,
-        key=lambda x: x.get('received_date') or '0000-01-01',
-        reverse=True
-    )
+    Query: limit, offset (padrão: todas)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
 
-    total = sum(float(i.get('received_amount', 0)) for i in received_sorted)
+    page = _installments_page(snapshot, 'received')
 
     return jsonify({
         'success': True,
-        'installments': received_sorted,
-        'count': len(received_sorted),
-        'total_amount': round(total, 2)
+        'installments': page['installments'],
+        'count': page['count'],
+        'total_amount': page['total_amount'],
+        'page_amount': page['page_amount'],
+        'limit': page['limit'],
+        'offset': page['offset']
     })
 
 @app.route('/api/installments/overdue')
 def overdue_installments():
-    """Parcelas atrasadas - Ordenadas da mais antiga para a mais recente"""
-    if not _cache['processed']:
-        return jsonify({'error': 'Dados não processados'}), 400
-
-    installments = _cache['settlement_proc'].get_installments()
-    overdue = [i for i in installments if i.get('status') == 'overdue']
+    """Parcelas atrasadas - Ordenadas da mais antiga para a mais recente
 
-    # Ordenar por data de vencimento (do mais antigo para o mais recente)
-    overdue_sorted = sorted(
-        overdue,
-        key=lambda x: x.get('money_release_date') or '9999-12-31'
-    )
+    Query: limit, offset (padrão: todas)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
 
-    total = sum(float(i.get('installment_net_amount', 0)) for i in overdue_sorted)
+    page = _installments_page(snapshot, 'overdue')
 
     return jsonify({
         'success': True,
-        'installments': overdue_sorted,
-        'count': len(overdue_sorted),
-        'total_amount': round(total, 2)
+        'installments': page['installments'],
+        'count': page['count'],
+        'total_amount': page['total_amount'],
+        'page_amount': page['page_amount'],
+        'limit': page['limit'],
+        'offset': page['offset']
     })
 
 @app.route('/api/installments/advance')
 def advance_installments():
-    """Parcelas recebidas antecipadamente - Ordenadas por dias de antecipação (maior primeiro)"""
-    if not _cache['processed']:
-        return jsonify({'error': 'Dados não processados'}), 400
-
-    installments = _cache['settlement_proc'].get_installments()
-    advance = [i for i in installments if i.get('status') == 'received_advance']
-
-    # Ordenar por dias de antecipação (do maior para o menor)
-    advance_sorted = sorted(
-        advance,
-        key=lambda x: x.get('days_advance') or 0,
-        reverse=True
-    )
+    """Parcelas recebidas antecipadamente - Ordenadas por dias de antecipação (maior primeiro)
 
-    total = sum(float(i.get('received_amount', 0)) for i in advance_sorted)
+    Query: limit, offset (padrão: todas)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
 
-    if advance_sorted:
-        avg_days = sum(float(i.get('days_advance', 0)) for i in advance_sorted) / len(advance_sorted)
-    else:
-        avg_days = 0
+    page = _installments_page(snapshot, 'advance')
 
     return jsonify({
         'success': True,
-        'installments': advance_sorted,
-        'count': len(advance_sorted),
-        'total_amount': round(total, 2),
-        'avg_days_advance': round(avg_days, 1)
+        'installments': page['installments'],
+        'count': page['count'],
+        'total_amount': page['total_amount'],
+        'page_amount': page['page_amount'],
+        'limit': page['limit'],
+        'offset': page['offset'],
+        'avg_days_advance': page['avg_days_advance']
     })
 
 # ========================================
 # FLUXO DE CAIXA
 # ========================================
 
+def _cashflow_query(default_granularity):
+    """Lê start, end e granularity da query string
+
+    Returns:
+        Tupla (start, end, granularity, erro); erro é None se válido
+    """
+    start = request.args.get('start') or None
+    end = request.args.get('end') or None
+    granularity = request.args.get('granularity', default_granularity)
+
+    for value in [start, end]:
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return None, None, None, f'Data inválida: {value} (use YYYY-MM-DD)'
+
+    if start and end and start > end:
+        return None, None, None, 'start deve ser anterior ou igual a end'
+
+    if granularity not in CASHFLOW_GRANULARITIES:
+        return None, None, None, f"Granularidade inválida: {granularity} (use {', '.join(CASHFLOW_GRANULARITIES)})"
+
+    return start, end, granularity, None
+
 @app.route('/api/cashflow/monthly')
 def cashflow_monthly():
-    """Fluxo de caixa mensal"""
-    if not _cache['processed']:
+    """Fluxo de caixa mensal
+
+    Query: start, end (YYYY-MM-DD; padrão: a partir de hoje), granularity (padrão: month)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
-    
-    monthly = _cache['cashflow'].get_monthly_cashflow()
-    
+
+    start, end, granularity, error = _cashflow_query('month')
+    if error:
+        return jsonify({'error': error}), 400
+
+    monthly = snapshot['cashflow'].get_cashflow_series(
+        granularity, start or datetime.now().strftime('%Y-%m-%d'), end
+    )
+
     return jsonify({
         'success': True,
+        'granularity': granularity,
         'cashflow': monthly
     })
 
 @app.route('/api/cashflow/daily')
 def cashflow_daily():
-    """Fluxo de caixa diário"""
-    if not _cache['processed']:
+    """Fluxo de caixa diário
+
+    Query: start, end (YYYY-MM-DD; padrão: últimos 30 dias), granularity (padrão: day)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
-    
-    daily = _cache['cashflow'].get_daily_cashflow()
-    
+
+    start, end, granularity, error = _cashflow_query('day')
+    if error:
+        return jsonify({'error': error}), 400
+
+    daily = snapshot['cashflow'].get_cashflow_series(
+        granularity, start or (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'), end
+    )
+
     return jsonify({
         'success': True,
+        'granularity': granularity,
         'cashflow': daily
     })
 
+@app.route('/api/cashflow/range')
+def cashflow_range():
+    """Total a receber em um intervalo de datas
+
+    Query: start, end (YYYY-MM-DD; ausentes = sem limite)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    start, end, _, error = _cashflow_query('day')
+    if error:
+        return jsonify({'error': error}), 400
+
+    return jsonify({
+        'success': True,
+        'total': snapshot['cashflow'].get_range_total(start, end)
+    })
+
+def _list_param(name, cast):
+    """Lê um parâmetro de lista separado por vírgulas (ValueError se inválido)"""
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    return [cast(v) for v in raw.split(',') if v.strip()]
+
+@app.route('/api/cashflow/forecast')
+def cashflow_forecast():
+    """Projeção de recebíveis e simulação de cenários de antecipação
+
+    Query:
+        windows: Janelas em dias a antecipar (ex: 7,15,30,60)
+        rates: Taxas mensais (%) a simular (padrão: taxa histórica)
+        as_of: Data base YYYY-MM-DD (padrão: hoje)
+        granularity: Granularidade da curva projetada (padrão: week)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    try:
+        windows = _list_param('windows', int)
+        rates = _list_param('rates', float)
+    except ValueError:
+        return jsonify({'error': 'windows e rates devem ser listas numéricas separadas por vírgula'}), 400
+
+    if windows and any(w <= 0 for w in windows):
+        return jsonify({'error': 'windows devem ser positivas'}), 400
+    if rates and any(r < 0 for r in rates):
+        return jsonify({'error': 'rates não podem ser negativas'}), 400
+
+    as_of = request.args.get('as_of') or None
+    if as_of:
+        try:
+            datetime.strptime(as_of, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': f'Data inválida: {as_of} (use YYYY-MM-DD)'}), 400
+
+    granularity = request.args.get('granularity', 'week')
+    if granularity not in CASHFLOW_GRANULARITIES:
+        return jsonify({'error': f'Granularidade inválida: {granularity}'}), 400
+
+    forecaster = ReceivablesForecaster(snapshot['cashflow'], snapshot['movements_proc'])
+    forecast = forecaster.simulate(windows=windows, rates=rates, as_of=as_of, granularity=granularity)
+
+    return jsonify({
+        'success': True,
+        'forecast': forecast
+    })
+
+@app.route('/api/cashflow/cube')
+def cashflow_cube():
+    """Cubo de recebíveis: agrupa e filtra por status, tipo, bandeira, mês e conta
+
+    Query:
+        group_by: Dimensões do resultado (ex: payment_type,month)
+        <dimensão>: Filtro com valores separados por vírgula (ex: status=pending,overdue)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    group_by = _list_param('group_by', str) or []
+    filters = {
+        name: _list_param(name, str)
+        for name in CUBE_DIMENSIONS
+        if request.args.get(name)
+    }
+
+    try:
+        result = snapshot['cashflow'].get_cube().query(group_by=group_by, filters=filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'success': True,
+        'group_by': group_by,
+        'filters': filters,
+        'rows': result['rows'],
+        'total': result['total']
+    })
+
+@app.route('/api/cashflow/cube/dimensions')
+def cashflow_cube_dimensions():
+    """Valores disponíveis de cada dimensão do cubo"""
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    return jsonify({
+        'success': True,
+        'dimensions': snapshot['cashflow'].get_cube().dimension_values()
+    })
+
+@app.route('/api/cashflow/aging')
+def cashflow_aging():
+    """Aging dos recebíveis em aberto (0-30, 31-60, 61-90, 90+ dias) por tipo de pagamento
+
+    Query: as_of (YYYY-MM-DD; padrão: hoje)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    as_of = request.args.get('as_of') or None
+    if as_of:
+        try:
+            datetime.strptime(as_of, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': f'Data inválida: {as_of} (use YYYY-MM-DD)'}), 400
+
+    return jsonify({
+        'success': True,
+        'aging': snapshot['cashflow'].get_aging(as_of)
+    })
+
 @app.route('/api/cashflow/upcoming')
 def cashflow_upcoming():
-    """Próximos recebimentos (7 dias)"""
-    if not _cache['processed']:
+    """Próximos recebimentos (padrão: 7 dias)
+
+    Query: days (1 a 366)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
-    
-    upcoming = _cache['cashflow'].get_upcoming_days(7)
-    
+
+    days = request.args.get('days', 7, type=int)
+    if not 1 <= days <= 366:
+        return jsonify({'error': 'days deve estar entre 1 e 366'}), 400
+
+    upcoming = snapshot['cashflow'].get_upcoming_days(days)
+
     return jsonify({
         'success': True,
+        'days': days,
         'upcoming': upcoming
     })
 
@@ -498,53 +1265,283 @@ def cashflow_upcoming():
 @app.route('/api/reconciliation')
 def reconciliation():
     """Relatório completo de conciliação"""
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
 
-    results = _cache['reconciliator'].get_results()
+    results = snapshot['reconciliator'].get_results()
 
     return jsonify({
         'success': True,
         'results': results
     })
 
+def _reclassify(snapshot, engine, apply):
+    """Reclassifica o snapshot (ou a tabela do cache JSON); None se não houver dados"""
+    if snapshot['processed'] and apply:
+        # Aplicar sobre cópias das conciliações de cada conta e publicar uma nova
+        # versão; o lock impede que um processamento parta de contas pela metade
+        with _process_lock:
+            snapshot = _snapshots.current
+            outcome = snapshot['reconciliator'].reclassify(engine)
+
+            partitions = {
+                key: dict(partition, reconciliator=partition['reconciliator'].copy())
+                for key, partition in snapshot.partitions.items()
+            }
+            for partition in partitions.values():
+                partition['reconciliator'].reclassify(engine, apply=True)
+
+            reconciliator = ReconciliatorV5.merge(p['reconciliator'] for p in partitions.values())
+            _snapshots.update(partitions=partitions, reconciliator=reconciliator)
+            outcome['applied'] = True
+
+            _json_cache.save_reconciliation(reconciliator.get_summary())
+            _json_cache.save_aggregates(_aggregates_payload(reconciliator))
+    elif snapshot['processed']:
+        outcome = snapshot['reconciliator'].reclassify(engine)
+    else:
+        # Sem dados em memória: usar a tabela persistida no cache JSON
+        stored = _json_cache.load_aggregates()
+        if not stored:
+            return None
+
+        aggregates = pd.DataFrame(stored['columns'])
+        outcome = ReconciliatorV5.reclassify_table(aggregates, engine, stored)
+        outcome.pop('_statuses')
+        outcome.pop('_rules')
+        outcome['applied'] = False
+
+    return outcome
+
+@app.route('/api/reconciliation/reclassify', methods=['POST'])
+def reclassify():
+    """Reaplica regras/tolerância sobre os agregados por SOURCE_ID (sem reler XLSX)
+
+    Body JSON (todos opcionais):
+        params: {"tolerance": 0.05}
+        rules: lista de regras no formato de config/reconciliation_rules.json
+        apply: true para atualizar os resultados em memória
+    """
+    snapshot = _snapshots.current
+    body = request.get_json(silent=True) or {}
+    started = time.perf_counter()
+
+    try:
+        base_engine = (
+            snapshot['reconciliator'].rule_engine if snapshot['processed']
+            else ReconciliationRuleEngine.from_file()
+        )
+        engine = base_engine.with_overrides(
+            params=body.get('params'),
+            rules=body.get('rules')
+        )
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({'success': False, 'error': f'Regras inválidas: {e}'}), 400
+
+    # Valores de tipo errado só falham ao avaliar as regras sobre os agregados
+    try:
+        outcome = _reclassify(snapshot, engine, bool(body.get('apply')))
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'error': f'Regras inválidas: {e}'}), 400
+    if outcome is None:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    outcome['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+    return jsonify({
+        'success': True,
+        'reclassification': outcome
+    })
+
+@app.route('/api/reconciliation/orphans/pairs')
+def orphan_pairs():
+    """Pares sugeridos entre órfãos de Settlement e Recebimentos
+
+    Query params: amount_tolerance (R$), date_window_days, max_candidates
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    engine = OrphanPairingEngine(
+        amount_tolerance=request.args.get('amount_tolerance', 0.05, type=float),
+        date_window_days=request.args.get('date_window_days', 3, type=int),
+        max_candidates=request.args.get('max_candidates', 5, type=int)
+    )
+
+    results = snapshot['reconciliator'].get_results()
+    pairs = engine.pair(results['orphan_settlement'], results['orphan_releases'])
+
+    return jsonify({
+        'success': True,
+        'orphan_pairs': pairs
+    })
+
+@app.route('/api/reconciliation/mismatch/explain')
+def mismatch_explain():
+    """Explica quais linhas produzem a diferença dos itens em mismatch
+
+    Query params: source_id (opcional), time_budget_ms, max_depth, max_rows
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    explainer = MismatchExplainer(
+        time_budget_ms=request.args.get('time_budget_ms', 50, type=float),
+        max_rows=request.args.get('max_rows', 24, type=int),
+        max_depth=request.args.get('max_depth', 3, type=int)
+    )
+
+    reconciliator = snapshot['reconciliator']
+    mismatches = reconciliator.get_results()['mismatch']
+
+    source_id = request.args.get('source_id')
+    if source_id:
+        mismatches = [m for m in mismatches if m['source_id'] == source_id]
+
+    explanations = explainer.explain_all(mismatches, reconciliator.releases_by_source)
+
+    return jsonify({
+        'success': True,
+        'mismatch_explanations': explanations
+    })
+
 # ========================================
 # MOVIMENTAÇÕES
 # ========================================
 
 @app.route('/api/movements/advance_fees')
 def advance_fees():
-    """Taxas de antecipação"""
-    if not _cache['processed']:
+    """Taxas de antecipação e taxa efetiva por parcela, dia e tipo de pagamento
+
+    Query: limit (padrão 100), offset - paginação das parcelas em effective_rates
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
     
-    fees = _cache['movements_proc'].get_advance_fees_summary()
+    fees = snapshot['movements_proc'].get_advance_fees_summary()
+    rates = snapshot['movements_proc'].get_advance_fee_rates(
+        snapshot['cashflow'].get_advance_summary()['installments']
+    )
+
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    offset = max(0, request.args.get('offset', 0, type=int))
     
     return jsonify({
         'success': True,
-        'fees': fees
+        'fees': fees,
+        'effective_rates': {
+            'summary': rates['summary'],
+            'by_day': rates['by_day'],
+            'by_payment_type': rates['by_payment_type'],
+            'installments': rates['installments'][offset:offset + limit],
+            'installments_total': len(rates['installments']),
+            'limit': limit,
+            'offset': offset
+        }
     })
 
 @app.route('/api/movements/payouts')
 def payouts():
     """Saques realizados"""
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
     
-    payouts = _cache['movements_proc'].get_payouts_summary()
+    payouts = snapshot['movements_proc'].get_payouts_summary()
     
     return jsonify({
         'success': True,
         'payouts': payouts
     })
 
+@app.route('/api/movements/payouts/attribution')
+def payouts_attribution():
+    """Atribuição FIFO dos payouts: quanto de cada saque foi coberto e por quais créditos"""
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    return jsonify({
+        'success': True,
+        'attribution': snapshot['payout_attribution'].get_summary()
+    })
+
+@app.route('/api/movements/payouts/<payout_id>/attribution')
+def payout_attribution(payout_id):
+    """Créditos (payments, liberações) consumidos por um payout, inclusive parciais"""
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    payout = snapshot['payout_attribution'].get_payout(payout_id)
+    if payout is None:
+        return jsonify({'error': f'Payout não encontrado: {payout_id}'}), 404
+
+    return jsonify({
+        'success': True,
+        'payout': payout
+    })
+
+@app.route('/api/movements/payouts/attribution/reference/<reference>')
+def payout_attribution_by_reference(reference):
+    """Payouts que consumiram créditos de um external_reference ou SOURCE_ID"""
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    return jsonify({
+        'success': True,
+        **snapshot['payout_attribution'].get_by_reference(reference)
+    })
+
+@app.route('/api/movements/reserves/lifecycle')
+def reserves_lifecycle():
+    """Ciclo de vida das reservas: retenções pareadas com liberações e retenções em aberto
+
+    Query: as_of (YYYY-MM-DD; padrão: hoje), type (ex: reserve_for_debt_payment)
+    """
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    as_of = request.args.get('as_of') or None
+    if as_of:
+        try:
+            datetime.strptime(as_of, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': f'Data inválida: {as_of} (use YYYY-MM-DD)'}), 400
+
+    lifecycle = snapshot['movements_proc'].get_reserve_lifecycle(as_of)
+
+    rtype = request.args.get('type')
+    if rtype:
+        lifecycle = {
+            **lifecycle,
+            'by_type': {rtype: lifecycle['by_type'].get(rtype)},
+            'pairs': [p for p in lifecycle['pairs'] if p['type'] == rtype],
+            'open': [h for h in lifecycle['open'] if h['type'] == rtype],
+            'unmatched_releases': [u for u in lifecycle['unmatched_releases'] if u['type'] == rtype],
+            'undated': [u for u in lifecycle['undated'] if u['type'] == rtype]
+        }
+        lifecycle['open_amount'] = round(sum(h['amount'] for h in lifecycle['open']), 2)
+
+    return jsonify({
+        'success': True,
+        'lifecycle': lifecycle
+    })
+
 @app.route('/api/movements/chargebacks')
 def chargebacks():
     """Chargebacks"""
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
     
-    chargebacks = _cache['movements_proc'].get_chargebacks_summary()
+    chargebacks = snapshot['movements_proc'].get_chargebacks_summary()
     
     return jsonify({
         'success': True,
@@ -554,10 +1551,11 @@ def chargebacks():
 @app.route('/api/movements/summary')
 def movements_summary():
     """Resumo completo de movimentações"""
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
 
-    summary = _cache['movements_proc'].get_full_summary()
+    summary = snapshot['movements_proc'].get_full_summary()
 
     return jsonify({
         'success': True,
@@ -571,33 +1569,35 @@ def movements_summary():
 @app.route('/api/debug/reference/<external_ref>')
 def debug_reference(external_ref):
     """Analisa detalhadamente uma external reference específica"""
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
 
     # Buscar no settlement
     settlement_installments = [
-        i for i in _cache['settlement_proc'].installments
+        i for i in snapshot['settlement_proc'].installments
         if i['external_reference'] == external_ref
     ]
 
     # Buscar nos payments (apenas vendas válidas)
     payments_found = [
-        p for p in _cache['releases_proc'].get_payments_only()
+        p for p in snapshot['releases_proc'].get_payments_only()
         if p.get('external_reference') == external_ref
     ]
 
     # Buscar TODAS as releases (incluindo movimentações)
     all_releases_found = [
-        r for r in _cache['releases_proc'].releases
+        r for r in snapshot['releases_proc'].releases
         if r.get('external_reference') == external_ref
     ]
 
-    # Buscar order balance
-    order_balance = _cache['settlement_proc'].order_balances.get(external_ref, {})
+    # Buscar order balance (por conta: a mesma referência pode existir em várias)
+    order_balances = snapshot['settlement_proc'].find_order_balances(external_ref)
+    order_balance = next(iter(order_balances.values())) if len(order_balances) == 1 else {}
 
     # Buscar parcelas conciliadas
     reconciled_installments = [
-        i for i in _cache['reconciliator'].installments
+        i for i in snapshot['reconciliator'].installments
         if i['external_reference'] == external_ref
     ]
 
@@ -607,7 +1607,8 @@ def debug_reference(external_ref):
         'settlement': {
             'installments_count': len(settlement_installments),
             'installments': settlement_installments,
-            'order_balance': order_balance
+            'order_balance': order_balance,
+            'order_balances': order_balances
         },
         'releases': {
             'payments_count': len(payments_found),
@@ -637,15 +1638,16 @@ def debug_reference(external_ref):
 @app.route('/api/export/all', methods=['POST'])
 def export_all():
     """Exporta todos os dados em TXT e JSON"""
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados. Execute /api/process primeiro'}), 400
 
     try:
-        settlement_summary = _cache['settlement_proc'].get_summary()
-        releases_summary = _cache['releases_proc'].get_summary()
-        reconciliation_summary = _cache['reconciliator'].get_summary()
-        movements_summary = _cache['movements_proc'].get_full_summary()
-        cashflow_summary = _cache['cashflow'].get_summary()
+        settlement_summary = snapshot['settlement_proc'].get_summary()
+        releases_summary = snapshot['releases_proc'].get_summary()
+        reconciliation_summary = snapshot['reconciliator'].get_summary()
+        movements_summary = snapshot['movements_proc'].get_full_summary()
+        cashflow_summary = snapshot['cashflow'].get_summary()
 
         exports = _exporter.export_all(
             settlement_summary,
@@ -675,15 +1677,16 @@ def export_all():
 @app.route('/api/export/txt', methods=['POST'])
 def export_txt():
     """Exporta relatório em TXT"""
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
 
     try:
-        settlement_summary = _cache['settlement_proc'].get_summary()
-        releases_summary = _cache['releases_proc'].get_summary()
-        reconciliation_summary = _cache['reconciliator'].get_summary()
-        movements_summary = _cache['movements_proc'].get_full_summary()
-        cashflow_summary = _cache['cashflow'].get_summary()
+        settlement_summary = snapshot['settlement_proc'].get_summary()
+        releases_summary = snapshot['releases_proc'].get_summary()
+        reconciliation_summary = snapshot['reconciliator'].get_summary()
+        movements_summary = snapshot['movements_proc'].get_full_summary()
+        cashflow_summary = snapshot['cashflow'].get_summary()
 
         # Exportar apenas TXT
         from backend.utils.exporter import ReportExporter
@@ -709,15 +1712,16 @@ def export_txt():
 @app.route('/api/export/json', methods=['POST'])
 def export_json():
     """Exporta relatório em JSON"""
-    if not _cache['processed']:
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
         return jsonify({'error': 'Dados não processados'}), 400
 
     try:
-        settlement_summary = _cache['settlement_proc'].get_summary()
-        releases_summary = _cache['releases_proc'].get_summary()
-        reconciliation_summary = _cache['reconciliator'].get_summary()
-        movements_summary = _cache['movements_proc'].get_full_summary()
-        cashflow_summary = _cache['cashflow'].get_summary()
+        settlement_summary = snapshot['settlement_proc'].get_summary()
+        releases_summary = snapshot['releases_proc'].get_summary()
+        reconciliation_summary = snapshot['reconciliator'].get_summary()
+        movements_summary = snapshot['movements_proc'].get_full_summary()
+        cashflow_summary = snapshot['cashflow'].get_summary()
 
         # Exportar apenas JSON
         from backend.utils.exporter import ReportExporter
@@ -740,6 +1744,28 @@ def export_json():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/export/aging', methods=['POST'])
+def export_aging():
+    """Exporta o aging dos recebíveis em TXT e JSON"""
+    snapshot = _snapshots.current
+    if not snapshot['processed']:
+        return jsonify({'error': 'Dados não processados'}), 400
+
+    try:
+        exports = _exporter.export_aging(snapshot['cashflow'].get_aging())
+
+        return jsonify({
+            'success': True,
+            'message': 'Aging exportado com sucesso',
+            'exports': {
+                'txt': os.path.basename(exports['txt']),
+                'json': os.path.basename(exports['json'])
+            },
+            'paths': exports
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/export/list', methods=['GET'])
 def export_list():
     """Lista arquivos de exportação recentes"""
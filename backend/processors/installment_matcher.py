@@ -0,0 +1,112 @@
+"""
+Installment Matcher - Marca parcelas recebidas cruzando Settlement x Recebimentos
+Faz o join das parcelas do Settlement com os payments de Recebimentos em
+uma única passada, usando a chave (SOURCE_ID, número da parcela):
+- Cada parcela recebe apenas o seu próprio valor recebido
+- Data de recebimento vem do RELEASE_DATE do payment
+- Detecta adiantamento (release antes do MONEY_RELEASE_DATE) e calcula dias
+"""
+
+from datetime import date
+
+
+class InstallmentMatcher:
+    """Índice hash de payments por (SOURCE_ID, parcela) para marcar parcelas recebidas"""
+
+    def __init__(self, releases):
+        """
+        Inicializa com a lista de releases (ReleasesProcessorV2.releases)
+
+        Apenas releases com description = 'payment' entram no índice.
+        """
+        self.releases = releases
+        self.index = {}
+        self._build_index()
+
+    @staticmethod
+    def normalize_installment_number(value):
+        """Normaliza número da parcela: '2/6' -> '2', '1.0' -> '1', vazio -> '1'"""
+        text = str(value or '').strip()
+
+        if '/' in text:
+            text = text.split('/')[0].strip()
+
+        try:
+            return str(int(float(text)))
+        except (TypeError, ValueError):
+            return '1'
+
+    def _build_index(self):
+        """Agrupa os payments por (SOURCE_ID, parcela) em uma única passada"""
+        for release in self.releases:
+            if str(release.get('description', '')).strip().lower() != 'payment':
+                continue
+
+            source_id = str(release.get('source_id', '')).strip()
+            if not source_id or source_id == 'nan':
+                continue
+
+            key = (source_id, self.normalize_installment_number(release.get('installments')))
+            entry = self.index.get(key)
+            if entry is None:
+                entry = self.index[key] = {
+                    'amount': 0.0,
+                    'release_date': None,
+                    'count': 0
+                }
+
+            entry['amount'] += float(release.get('net_credit_amount', 0) or 0)
+            entry['count'] += 1
+
+            # Manter a data de liberação mais recente da parcela
+            release_date = release.get('release_date')
+            if release_date and (entry['release_date'] is None or release_date > entry['release_date']):
+                entry['release_date'] = release_date
+
+    def apply(self, installments):
+        """Atualiza status, valor e data recebida de cada parcela
+
+        Returns:
+            Número de parcelas marcadas como recebidas
+        """
+        updated_count = 0
+
+        for installment in installments:
+            key = (
+                str(installment.get('source_id', '')).strip(),
+                self.normalize_installment_number(installment.get('installment_number'))
+            )
+            entry = self.index.get(key)
+
+            if not entry or entry['amount'] <= 0:
+                continue
+
+            received_date = entry['release_date']
+            days_advance = self._days_between(received_date, installment.get('money_release_date'))
+
+            installment['received_amount'] = round(entry['amount'], 2)
+            installment['received_date'] = received_date
+
+            if days_advance > 0:
+                installment['status'] = 'received_advance'
+                installment['days_advance'] = days_advance
+            else:
+                installment['status'] = 'received'
+                installment['days_advance'] = 0
+
+            updated_count += 1
+
+        return updated_count
+
+    def _days_between(self, received_date, expected_date):
+        """Dias entre o recebimento e a data prevista (positivo = antecipado)"""
+        if not received_date or not expected_date:
+            return 0
+
+        try:
+            received = date.fromisoformat(str(received_date)[:10])
+            expected = date.fromisoformat(str(expected_date)[:10])
+        except ValueError:
+            return 0
+
+        return (expected - received).days
@@ -0,0 +1,254 @@
+"""
+Mismatch Explainer - Explica a diferença dos itens 'mismatch' do ReconciliatorV5
+Procura quais linhas componentes produzem a diferença entre Settlement e Recebimentos:
+- Componentes: linha de settlement, refunds, chargebacks, chargeback cancels,
+  payments e movimentações (reservas) do SOURCE_ID
+- Hipóteses por linha: faltante, duplicada ou com sinal invertido
+- Itens sem diferença (mismatch por regra) saem como 'no_difference'; marcar
+  todas as linhas como faltantes é tautológico e não conta como explicação
+- Busca subset-sum limitada (profundidade e linhas) com memoização em centavos
+- Orçamento de tempo por item para explicar milhares de mismatches em lote
+"""
+
+import time
+
+
+# Hipóteses que retiram a linha da soma
+REMOVAL_KINDS = ('missing', 'duplicated')
+
+
+class _SearchTimeout(Exception):
+    """Orçamento de tempo do item esgotado"""
+
+
+class MismatchExplainer:
+    """Explica mismatches via subset-sum limitada sobre as linhas componentes"""
+
+    def __init__(self, time_budget_ms=50, max_rows=24, max_depth=3, tolerance_cents=1):
+        """
+        Args:
+            time_budget_ms: Tempo máximo de busca por item (ms)
+            max_rows: Máximo de linhas componentes consideradas por item
+            max_depth: Máximo de linhas em uma explicação
+            tolerance_cents: Tolerância de arredondamento (centavos)
+        """
+        self.time_budget_ms = float(time_budget_ms)
+        self.max_rows = int(max_rows)
+        self.max_depth = int(max_depth)
+        self.tolerance_cents = int(tolerance_cents)
+
+    def explain_all(self, mismatches, releases_by_source=None):
+        """Explica uma lista de mismatches em lote
+
+        Args:
+            mismatches: Lista results['mismatch'] do ReconciliatorV5
+            releases_by_source: ReconciliatorV5.releases_by_source (para movimentações)
+
+        Returns:
+            Dict com contagem por resultado e explicações por SOURCE_ID
+        """
+        releases_by_source = releases_by_source or {}
+        started = time.perf_counter()
+
+        explanations = []
+        counts = {'explained': 0, 'no_difference': 0, 'not_found': 0, 'timeout': 0}
+
+        for item in mismatches:
+            movements = (releases_by_source.get(item['source_id']) or {}).get('movements', [])
+            explanation = self.explain(item, movements)
+            counts[explanation['result']] += 1
+            explanations.append(explanation)
+
+        return {
+            'count': len(explanations),
+            'explained': counts['explained'],
+            'no_difference': counts['no_difference'],
+            'not_found': counts['not_found'],
+            'timeout': counts['timeout'],
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'params': {
+                'time_budget_ms': self.time_budget_ms,
+                'max_rows': self.max_rows,
+                'max_depth': self.max_depth
+            },
+            'explanations': explanations
+        }
+
+    def explain(self, item, movements=None):
+        """Explica um único mismatch
+
+        A diferença buscada é settlement_net - releases_net (com sinal).
+        Cada linha oferece hipóteses com o valor que explicariam dessa diferença.
+        Diferença zero (dentro da tolerância) resulta em 'no_difference'.
+        """
+        started = time.perf_counter()
+        deadline = started + self.time_budget_ms / 1000.0
+
+        gap_cents = self._to_cents(item.get('settlement_net', 0)) - self._to_cents(item.get('releases_net', 0))
+        rows = self._build_rows(item, movements or [])
+
+        result = 'not_found'
+        found = None
+        if abs(gap_cents) <= self.tolerance_cents:
+            result = 'no_difference'
+        else:
+            try:
+                found = self._search(rows, gap_cents, deadline)
+                if found is not None:
+                    result = 'explained'
+            except _SearchTimeout:
+                result = 'timeout'
+
+        return {
+            'source_id': item.get('source_id'),
+            'difference': round(gap_cents / 100.0, 2),
+            'result': result,
+            'rows_considered': len(rows),
+            'components': found or [],
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def _build_rows(self, item, movements):
+        """Monta as linhas componentes com suas hipóteses (kind, centavos explicados)"""
+        rows = []
+
+        settlement = item.get('settlement')
+        refunds = item.get('refunds') or {}
+        chargebacks = item.get('chargebacks') or {}
+        cancels = item.get('chargeback_cancels') or {}
+
+        # Lado Settlement: contribuição = settlement_net_amount
+        settlement_rows = [('settlement', settlement)] if settlement else []
+        settlement_rows += [('refund', r) for r in refunds.get('settlement', [])]
+        settlement_rows += [('chargeback', r) for r in chargebacks.get('settlement', [])]
+        settlement_rows += [('chargeback_cancel', r) for r in cancels.get('settlement', [])]
+
+        for component, row in settlement_rows:
+            cents = self._to_cents(row.get('settlement_net_amount', 0))
+            rows.append(self._row('settlement', component, row, cents, cents))
+
+        # Lado Recebimentos: contribuição com sinal no releases_net
+        release_rows = [('payment', r, r.get('net_credit_amount', 0)) for r in item.get('payments', [])]
+        release_rows += [('refund', r, -float(r.get('net_debit_amount', 0) or 0)) for r in refunds.get('releases', [])]
+        release_rows += [('chargeback', r, -float(r.get('net_debit_amount', 0) or 0)) for r in chargebacks.get('releases', [])]
+        release_rows += [('chargeback_cancel', r, r.get('net_credit_amount', 0)) for r in cancels.get('releases', [])]
+
+        for component, row, value in release_rows:
+            cents = self._to_cents(value)
+            # Remover a linha de Recebimentos aumenta a diferença em +cents
+            rows.append(self._row('releases', component, row, cents, -cents))
+
+        # Movimentações não entram no releases_net: incluí-las explicaria +cents
+        for row in movements:
+            cents = self._to_cents(
+                float(row.get('net_credit_amount', 0) or 0) - float(row.get('net_debit_amount', 0) or 0)
+            )
+            if cents:
+                rows.append({
+                    'side': 'releases',
+                    'component': row.get('description', 'movement'),
+                    'row': row,
+                    'options': [('unbalanced_movement', cents)]
+                })
+
+        rows = [r for r in rows if r['options']]
+
+        # Linhas de maior valor primeiro: explicações curtas aparecem antes
+        rows.sort(key=lambda r: -max(abs(c) for _, c in r['options']))
+        rows = rows[:self.max_rows]
+
+        self._mark_duplicates(rows)
+        return rows
+
+    def _row(self, side, component, row, cents, explained_cents):
+        """Cria linha com hipóteses 'missing' e 'sign_flipped'"""
+        options = []
+        if cents:
+            options.append(('missing', explained_cents))
+            options.append(('sign_flipped', 2 * explained_cents))
+
+        return {
+            'side': side,
+            'component': component,
+            'row': row,
+            'options': options
+        }
+
+    def _mark_duplicates(self, rows):
+        """Troca 'missing' por 'duplicated' quando há linha gêmea no mesmo lado"""
+        seen = {}
+        for row in rows:
+            key = (row['side'], row['component'], row['options'][0][1])
+            seen[key] = seen.get(key, 0) + 1
+
+        for row in rows:
+            kind, cents = row['options'][0]
+            if kind == 'missing' and seen[(row['side'], row['component'], cents)] > 1:
+                row['options'][0] = ('duplicated', cents)
+
+    def _search(self, rows, target, deadline):
+        """Busca a menor combinação de hipóteses cuja soma explica a diferença
+
+        Combinações que retiram todas as linhas consideradas são descartadas:
+        a soma delas é a própria diferença e não aponta nenhuma linha.
+        """
+        for depth in range(1, min(self.max_depth, len(rows)) + 1):
+            failed = set()
+            chosen = self._dfs(rows, 0, target, depth, failed, deadline, depth == len(rows))
+            if chosen is not None:
+                return [self._describe(rows[i], kind, cents) for i, kind, cents in chosen]
+
+        return None
+
+    def _dfs(self, rows, index, remaining, depth, failed, deadline, removed_only=False):
+        """DFS memoizada sobre (linha, restante, profundidade)
+
+        removed_only: todas as linhas já escolhidas foram retiradas e a
+        combinação cobre todas as linhas (tautológica se terminar assim)
+        """
+        if depth == 0:
+            return [] if abs(remaining) <= self.tolerance_cents and not removed_only else None
+        if index >= len(rows):
+            return None
+
+        key = (index, remaining, depth, removed_only)
+        if key in failed:
+            return None
+
+        if time.perf_counter() > deadline:
+            raise _SearchTimeout()
+
+        for kind, cents in rows[index]['options']:
+            rest = self._dfs(
+                rows, index + 1, remaining - cents, depth - 1, failed, deadline,
+                removed_only and kind in REMOVAL_KINDS
+            )
+            if rest is not None:
+                return [(index, kind, cents)] + rest
+
+        rest = self._dfs(rows, index + 1, remaining, depth, failed, deadline, removed_only)
+        if rest is not None:
+            return rest
+
+        failed.add(key)
+        return None
+
+    def _describe(self, row, kind, cents):
+        """Formata uma linha escolhida para a resposta"""
+        data = row['row'] or {}
+        return {
+            'side': row['side'],
+            'component': row['component'],
+            'kind': kind,
+            'explained_amount': round(cents / 100.0, 2),
+            'date': data.get('release_date') or data.get('approval_date'),
+            'description': data.get('description'),
+            'external_reference': data.get('external_reference')
+        }
+
+    def _to_cents(self, value):
+        """Converte valor em reais para centavos inteiros"""
+        try:
+            return int(round(float(value or 0) * 100))
+        except (TypeError, ValueError):
+            return 0
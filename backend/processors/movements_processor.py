@@ -3,210 +3,329 @@ Movements Processor V2
 Processa movimentações especiais do Mercado Pago:
 - Taxas de antecipação (fee-release_in_advance)
 - Saques (payout)
-- Reservas (reserve_for_debt_payment, reserve_for_payout)
+- Reservas (reserve_for_debt_payment, reserve_for_payout) e ciclo retenção/liberação
 - Chargebacks nos releases
+Os resumos são calculados em uma única passada (_categorize) e reutilizados
+até as movimentações mudarem (set_movements)
 """
 
 from datetime import datetime
 from collections import defaultdict
 
+import numpy as np
+import pandas as pd
+
 class MovementsProcessorV2:
     def __init__(self, movements):
         """
         Inicializa com lista de movimentações
         movements: lista retornada por ReleasesProcessor.get_movements()
         """
+        self.set_movements(movements)
+
+    def set_movements(self, movements):
+        """Substitui as movimentações e recalcula os resumos em cache"""
         self.movements = movements
+        self._reserve_lifecycle = None
+        self._advance_fee_rates = None
+        self._full_summary = None
         self._categorize()
         
     def _categorize(self):
-        """Categoriza movimentações por tipo"""
+        """Categoriza movimentações por tipo e calcula os resumos em uma única passada"""
         self.advance_fees = []
         self.payouts = []
         self.reserves = []
         self.chargebacks = []
+
+        fees_list = []
+        fees_total = 0
+        payouts_list = []
+        payouts_total = 0
+        reserves_by_type = defaultdict(lambda: {
+            'count': 0,
+            'total_credit': 0,
+            'total_debit': 0,
+            'net': 0,
+            'items': []
+        })
+        chargebacks_list = []
+        chargeback_applied = 0
+        chargeback_reversed = 0
         
         for mov in self.movements:
             desc = mov['description']
             
             if 'advance' in desc and 'fee' in desc:
                 self.advance_fees.append(mov)
+                amount = abs(mov['net_debit_amount'])
+                fees_total += amount
+                fees_list.append({
+                    'date': mov['release_date'],
+                    'source_id': mov['source_id'],
+                    'amount': amount,
+                    'gross_amount': mov['gross_amount'],
+                    'mp_fee': abs(mov['mp_fee'])
+                })
+
             elif desc == 'payout':
                 self.payouts.append(mov)
+                amount = abs(mov['net_debit_amount'])
+                payouts_total += amount
+                payouts_list.append({
+                    'date': mov['release_date'],
+                    'source_id': mov['source_id'],
+                    'amount': amount,
+                    'gross_amount': mov['gross_amount']
+                })
+
             elif desc.startswith('reserve_'):
                 self.reserves.append(mov)
+                reserve = reserves_by_type[desc]
+                reserve['count'] += 1
+                reserve['total_credit'] += mov['net_credit_amount']
+                reserve['total_debit'] += mov['net_debit_amount']
+                reserve['items'].append({
+                    'date': mov['release_date'],
+                    'source_id': mov['source_id'],
+                    'credit': mov['net_credit_amount'],
+                    'debit': mov['net_debit_amount']
+                })
+
             elif 'chargeback' in desc:
                 self.chargebacks.append(mov)
-    
-    def get_advance_fees_summary(self):
-        """Retorna resumo das taxas de antecipação"""
-        if not self.advance_fees:
-            return {
+                if desc == 'chargeback':
+                    amount = abs(mov['net_debit_amount'])
+                    chargeback_applied += amount
+                    cb_type = 'applied'
+                elif desc == 'chargeback_cancel':
+                    amount = mov['net_credit_amount']
+                    chargeback_reversed += amount
+                    cb_type = 'reversed'
+                else:
+                    continue
+
+                chargebacks_list.append({
+                    'type': cb_type,
+                    'date': mov['release_date'],
+                    'source_id': mov['source_id'],
+                    'external_reference': mov['external_reference'],
+                    'amount': amount
+                })
+
+        for reserve in reserves_by_type.values():
+            reserve['net'] = reserve['total_credit'] - abs(reserve['total_debit'])
+
+        # Ordenar por data (uma única vez)
+        fees_list.sort(key=lambda x: x['date'], reverse=True)
+        payouts_list.sort(key=lambda x: x['date'], reverse=True)
+        chargebacks_list.sort(key=lambda x: x['date'], reverse=True)
+
+        if fees_list:
+            self._advance_fees_summary = {
+                'count': len(fees_list),
+                'total_amount': round(fees_total, 2),
+                'fees': fees_list
+            }
+        else:
+            self._advance_fees_summary = {
                 'total_fees': 0,
                 'total_amount': 0,
                 'count': 0,
                 'fees': []
             }
-        
-        fees_list = []
-        total_amount = 0
-        
-        for fee in self.advance_fees:
-            amount = abs(fee['net_debit_amount'])
-            total_amount += amount
-            
-            fees_list.append({
-                'date': fee['release_date'],
-                'source_id': fee['source_id'],
-                'amount': amount,
-                'gross_amount': fee['gross_amount'],
-                'mp_fee': abs(fee['mp_fee'])
-            })
-        
-        # Ordenar por data
-        fees_list.sort(key=lambda x: x['date'], reverse=True)
-        
-        return {
-            'count': len(fees_list),
-            'total_amount': round(total_amount, 2),
-            'fees': fees_list
-        }
-    
-    def get_payouts_summary(self):
-        """Retorna resumo dos saques"""
-        if not self.payouts:
-            return {
-                'count': 0,
-                'total_amount': 0,
-                'payouts': []
-            }
-        
-        payouts_list = []
-        total_amount = 0
-        
-        for payout in self.payouts:
-            amount = abs(payout['net_debit_amount'])
-            total_amount += amount
-            
-            payouts_list.append({
-                'date': payout['release_date'],
-                'source_id': payout['source_id'],
-                'amount': amount,
-                'gross_amount': payout['gross_amount']
-            })
-        
-        # Ordenar por data
-        payouts_list.sort(key=lambda x: x['date'], reverse=True)
-        
-        return {
+
+        self._payouts_summary = {
             'count': len(payouts_list),
-            'total_amount': round(total_amount, 2),
+            'total_amount': round(payouts_total, 2) if payouts_list else 0,
             'payouts': payouts_list
         }
-    
-    def get_reserves_summary(self):
-        """Retorna resumo das reservas"""
-        # Agrupar reservas por tipo
-        reserves_by_type = defaultdict(lambda: {
-            'count': 0,
-            'total_credit': 0,
-            'total_debit': 0,
-            'net': 0,
-            'items': []
-        })
-        
-        for reserve in self.reserves:
-            rtype = reserve['description']
-            
-            reserves_by_type[rtype]['count'] += 1
-            reserves_by_type[rtype]['total_credit'] += reserve['net_credit_amount']
-            reserves_by_type[rtype]['total_debit'] += reserve['net_debit_amount']
-            reserves_by_type[rtype]['net'] = (
-                reserves_by_type[rtype]['total_credit'] - 
-                abs(reserves_by_type[rtype]['total_debit'])
-            )
-            
-            reserves_by_type[rtype]['items'].append({
-                'date': reserve['release_date'],
-                'source_id': reserve['source_id'],
-                'credit': reserve['net_credit_amount'],
-                'debit': reserve['net_debit_amount']
-            })
-        
-        return dict(reserves_by_type)
-    
-    def get_chargebacks_summary(self):
-        """Retorna resumo dos chargebacks"""
-        if not self.chargebacks:
-            return {
+
+        self._reserves_summary = dict(reserves_by_type)
+
+        if self.chargebacks:
+            self._chargebacks_summary = {
+                'count': len(chargebacks_list),
+                'chargeback_applied': round(chargeback_applied, 2),
+                'chargeback_reversed': round(chargeback_reversed, 2),
+                'net_chargeback': round(chargeback_applied - chargeback_reversed, 2),
+                'chargebacks': chargebacks_list
+            }
+        else:
+            self._chargebacks_summary = {
                 'count': 0,
                 'chargeback_applied': 0,
                 'chargeback_reversed': 0,
                 'net_chargeback': 0,
                 'chargebacks': []
             }
-        
-        chargeback_applied = 0
-        chargeback_reversed = 0
-        chargebacks_list = []
-        
-        for cb in self.chargebacks:
-            desc = cb['description']
-            
-            if desc == 'chargeback':
-                amount = abs(cb['net_debit_amount'])
-                chargeback_applied += amount
-                
-                chargebacks_list.append({
-                    'type': 'applied',
-                    'date': cb['release_date'],
-                    'source_id': cb['source_id'],
-                    'external_reference': cb['external_reference'],
-                    'amount': amount
-                })
-            
-            elif desc == 'chargeback_cancel':
-                amount = cb['net_credit_amount']
-                chargeback_reversed += amount
-                
-                chargebacks_list.append({
-                    'type': 'reversed',
-                    'date': cb['release_date'],
-                    'source_id': cb['source_id'],
-                    'external_reference': cb['external_reference'],
-                    'amount': amount
+    
+    def get_advance_fees_summary(self):
+        """Retorna resumo das taxas de antecipação"""
+        return self._advance_fees_summary
+    
+    def get_payouts_summary(self):
+        """Retorna resumo dos saques"""
+        return self._payouts_summary
+    
+    def get_reserves_summary(self):
+        """Retorna resumo das reservas"""
+        return self._reserves_summary
+    
+    def get_reserve_lifecycle(self, as_of=None):
+        """Pareia cada retenção reserve_for_* com sua liberação posterior
+
+        Índice por (tipo, SOURCE_ID, valor): débitos abrem uma retenção, créditos
+        fecham a retenção aberta mais antiga com a mesma chave. Sem chave exata
+        (liberação agregada ou com outro tipo), fecha as retenções do mesmo
+        SOURCE_ID que cabem no valor. Construído em uma única passada pelas
+        reservas ordenadas por data e mantido em cache. Reservas sem data não
+        entram no pareamento e são listadas em 'undated'.
+
+        Args:
+            as_of: Data de referência para os dias em aberto (padrão: hoje)
+        """
+        as_of = as_of or datetime.now().strftime('%Y-%m-%d')
+        if self._reserve_lifecycle and self._reserve_lifecycle['as_of'] == as_of:
+            return self._reserve_lifecycle
+
+        undated = [
+            {
+                'type': r['description'],
+                'source_id': r['source_id'],
+                'credit': r['net_credit_amount'],
+                'debit': r['net_debit_amount']
+            }
+            for r in self.reserves if not r.get('release_date')
+        ]
+
+        # Mesmo dia: retenção (débito) antes da liberação (crédito)
+        ordered = sorted(
+            (r for r in self.reserves if r.get('release_date')),
+            key=lambda r: (r['release_date'][:10], 0 if r['net_debit_amount'] else 1)
+        )
+
+        open_holds = defaultdict(list)      # (tipo, SOURCE_ID, valor) -> retenções
+        holds_by_source = defaultdict(list)  # SOURCE_ID -> retenções (fallback)
+        pairs = []
+        unmatched_releases = []
+
+        for reserve in ordered:
+            rtype = reserve['description']
+            source_id = reserve['source_id']
+            date = reserve['release_date'][:10]
+
+            if reserve['net_debit_amount']:
+                hold = {
+                    'type': rtype,
+                    'source_id': source_id,
+                    'amount': round(abs(reserve['net_debit_amount']), 2),
+                    'held_at': date
+                }
+                open_holds[(rtype, source_id, hold['amount'])].append(hold)
+                holds_by_source[source_id].append(hold)
+                continue
+
+            amount = round(reserve['net_credit_amount'], 2)
+
+            # 1. Mesmo tipo, SOURCE_ID e valor
+            candidates = [h for h in open_holds.get((rtype, source_id, amount), []) if 'released_at' not in h]
+            if candidates:
+                self._release_hold(candidates[0], date, 'exact', pairs)
+                continue
+
+            # 2. Liberação agregada/outro tipo: fecha retenções do mesmo SOURCE_ID que cabem no valor
+            remaining = amount
+            for hold in holds_by_source.get(source_id, []):
+                if 'released_at' not in hold and hold['amount'] <= remaining + 0.005:
+                    self._release_hold(hold, date, 'source_id', pairs)
+                    remaining = round(remaining - hold['amount'], 2)
+
+            if remaining > 0.005:
+                unmatched_releases.append({
+                    'type': rtype,
+                    'source_id': source_id,
+                    'amount': remaining,
+                    'released_at': date
                 })
-        
-        # Ordenar por data
-        chargebacks_list.sort(key=lambda x: x['date'], reverse=True)
-        
-        return {
-            'count': len(chargebacks_list),
-            'chargeback_applied': round(chargeback_applied, 2),
-            'chargeback_reversed': round(chargeback_reversed, 2),
-            'net_chargeback': round(chargeback_applied - chargeback_reversed, 2),
-            'chargebacks': chargebacks_list
+
+        still_open = [
+            dict(hold, held_days=self._days_between(hold['held_at'], as_of))
+            for holds in holds_by_source.values()
+            for hold in holds
+            if 'released_at' not in hold
+        ]
+        still_open.sort(key=lambda h: h['held_at'])
+
+        by_type = defaultdict(lambda: {
+            'pairs': 0,
+            'avg_held_days': 0,
+            'max_held_days': 0,
+            'open_count': 0,
+            'open_amount': 0
+        })
+        for pair in pairs:
+            summary = by_type[pair['type']]
+            summary['pairs'] += 1
+            summary['avg_held_days'] += pair['held_days']
+            summary['max_held_days'] = max(summary['max_held_days'], pair['held_days'])
+        for summary in by_type.values():
+            if summary['pairs']:
+                summary['avg_held_days'] = round(summary['avg_held_days'] / summary['pairs'], 1)
+        for hold in still_open:
+            by_type[hold['type']]['open_count'] += 1
+            by_type[hold['type']]['open_amount'] = round(by_type[hold['type']]['open_amount'] + hold['amount'], 2)
+
+        self._reserve_lifecycle = {
+            'as_of': as_of,
+            'by_type': dict(by_type),
+            'pairs': pairs,
+            'open': still_open,
+            'open_amount': round(sum(h['amount'] for h in still_open), 2),
+            'unmatched_releases': unmatched_releases,
+            'undated': undated
         }
+        return self._reserve_lifecycle
+
+    def _release_hold(self, hold, date, matched_by, pairs):
+        """Fecha uma retenção com a data de liberação"""
+        hold['released_at'] = date
+        hold['held_days'] = self._days_between(hold['held_at'], date)
+        hold['matched_by'] = matched_by
+        pairs.append(hold)
+
+    def _days_between(self, start, end):
+        """Dias entre duas datas YYYY-MM-DD"""
+        try:
+            return (datetime.strptime(end[:10], '%Y-%m-%d') - datetime.strptime(start[:10], '%Y-%m-%d')).days
+        except (TypeError, ValueError):
+            return None
+
+    def get_chargebacks_summary(self):
+        """Retorna resumo dos chargebacks"""
+        return self._chargebacks_summary
     
     def get_full_summary(self):
-        """Retorna resumo completo de todas as movimentações"""
-        advance_fees = self.get_advance_fees_summary()
-        payouts = self.get_payouts_summary()
-        reserves = self.get_reserves_summary()
-        chargebacks = self.get_chargebacks_summary()
-        
-        return {
-            'total_movements': len(self.movements),
-            'advance_fees': advance_fees,
-            'payouts': payouts,
-            'reserves': reserves,
-            'chargebacks': chargebacks,
-            'financial_summary': {
-                'total_fees_paid': advance_fees['total_amount'],
-                'total_withdrawn': payouts['total_amount'],
-                'net_chargeback': chargebacks['net_chargeback']
+        """Retorna resumo completo de todas as movimentações (em cache)"""
+        if self._full_summary is None:
+            advance_fees = self.get_advance_fees_summary()
+            payouts = self.get_payouts_summary()
+            reserves = self.get_reserves_summary()
+            chargebacks = self.get_chargebacks_summary()
+            
+            self._full_summary = {
+                'total_movements': len(self.movements),
+                'advance_fees': advance_fees,
+                'payouts': payouts,
+                'reserves': reserves,
+                'chargebacks': chargebacks,
+                'financial_summary': {
+                    'total_fees_paid': advance_fees['total_amount'],
+                    'total_withdrawn': payouts['total_amount'],
+                    'net_chargeback': chargebacks['net_chargeback']
+                }
             }
-        }
+        return self._full_summary
     
     def validate_against_payments(self, total_received_from_payments):
         """
@@ -236,6 +355,119 @@ class MovementsProcessorV2:
             }
         }
     
+    def get_advance_fee_rates(self, advance_installments):
+        """Taxa efetiva de antecipação por parcela (join taxas x parcelas antecipadas)
+
+        Cada taxa fee-release_in_advance é associada às parcelas received_advance
+        pelo SOURCE_ID e, se não houver, pela data (received_date = data da taxa).
+        A taxa de cada grupo é rateada por valor x dias antecipados, que é como o
+        custo da antecipação é formado.
+
+        Args:
+            advance_installments: Parcelas com status received_advance
+
+        Returns:
+            Dict com summary, by_day, by_payment_type e installments (uma linha por parcela)
+        """
+        cached = self._advance_fee_rates
+        if cached and cached[0] is advance_installments:
+            return cached[1]
+
+        # Tipos explícitos: colunas vazias viriam como float64 e quebrariam 'date:' + ...
+        fees = pd.DataFrame({
+            'source_id': pd.Series([f['source_id'] for f in self.advance_fees], dtype=object),
+            'date': pd.Series([f['release_date'][:10] for f in self.advance_fees], dtype=object),
+            'fee': pd.Series([abs(f['net_debit_amount']) for f in self.advance_fees], dtype=float)
+        })
+        inst = pd.DataFrame({
+            'source_id': pd.Series([i.get('source_id') for i in advance_installments], dtype=object),
+            'external_reference': pd.Series([i.get('external_reference') for i in advance_installments], dtype=object),
+            'installment_number': pd.Series([i.get('installment_number') for i in advance_installments], dtype=object),
+            'payment_type': pd.Series([i.get('payment_type') or 'unknown' for i in advance_installments], dtype=object),
+            'date': pd.Series([(i.get('received_date') or '')[:10] for i in advance_installments], dtype=object),
+            'amount': pd.Series([float(i.get('received_amount') or 0.0) for i in advance_installments], dtype=float),
+            'days': pd.Series([max(int(i.get('days_advance') or 0), 0) for i in advance_installments], dtype=int)
+        })
+        inst['weight'] = inst['amount'] * inst['days'].clip(lower=1)
+
+        # 1. Join por SOURCE_ID; 2. taxas restantes por data
+        by_source = inst['source_id'].isin(fees['source_id'])
+        inst['group'] = np.where(by_source, 'source:' + inst['source_id'].astype(str), 'date:' + inst['date'])
+        fees_left = fees[~fees['source_id'].isin(inst.loc[by_source, 'source_id'])]
+        group_fees = pd.concat([
+            fees[fees['source_id'].isin(inst.loc[by_source, 'source_id'])]
+            .assign(group='source:' + fees['source_id'].astype(str)),
+            fees_left.assign(group='date:' + fees_left['date'])
+        ]).groupby('group')['fee'].sum()
+
+        inst['group_fee'] = inst['group'].map(group_fees).fillna(0.0)
+        inst['group_weight'] = inst.groupby('group')['weight'].transform('sum')
+        inst['fee'] = np.where(inst['group_weight'] > 0, inst['group_fee'] * inst['weight'] / inst['group_weight'], 0.0)
+        inst['matched'] = inst['group_fee'] > 0
+
+        ratio = np.where(inst['amount'] > 0, inst['fee'] / inst['amount'], 0.0)
+        days = inst['days'].to_numpy()
+        inst['rate_pct'] = ratio * 100
+        inst['monthly_rate_pct'] = np.where(days > 0, ratio * 30 / np.maximum(days, 1) * 100, 0.0)
+        inst['annualized_rate_pct'] = np.where(days > 0, (np.power(1 + ratio, 365 / np.maximum(days, 1)) - 1) * 100, 0.0)
+
+        matched = inst[inst['matched']]
+        # Grupos de taxa sem nenhuma parcela (ex: data cujas parcelas já foram pelo SOURCE_ID)
+        unmatched_fees = group_fees[~group_fees.index.isin(inst['group'])]
+
+        result = {
+            'summary': {
+                **self._rate_row(matched),
+                'installments_without_fee': int((~inst['matched']).sum()),
+                'fees_without_installments': round(float(unmatched_fees.sum()), 2)
+            },
+            'by_day': [
+                {'date': date, **self._rate_row(group)}
+                for date, group in matched.groupby('date', sort=True)
+            ],
+            'by_payment_type': [
+                {'payment_type': payment_type, **self._rate_row(group)}
+                for payment_type, group in matched.groupby('payment_type', sort=True)
+            ],
+            'installments': [
+                {
+                    'source_id': row.source_id,
+                    'external_reference': row.external_reference,
+                    'installment_number': row.installment_number,
+                    'payment_type': row.payment_type,
+                    'received_date': row.date,
+                    'amount': round(row.amount, 2),
+                    'days_advance': int(row.days),
+                    'fee': round(row.fee, 2),
+                    'rate_pct': round(row.rate_pct, 4),
+                    'monthly_rate_pct': round(row.monthly_rate_pct, 4),
+                    'annualized_rate_pct': round(row.annualized_rate_pct, 2)
+                }
+                for row in matched.itertuples(index=False)
+            ]
+        }
+
+        self._advance_fee_rates = (advance_installments, result)
+        return result
+
+    def _rate_row(self, group):
+        """Taxas agregadas de um grupo de parcelas antecipadas"""
+        amount = float(group['amount'].sum())
+        fee = float(group['fee'].sum())
+        amount_days = float((group['amount'] * group['days']).sum())
+        avg_days = amount_days / amount if amount else 0.0
+        ratio = fee / amount if amount else 0.0
+
+        return {
+            'count': int(len(group)),
+            'advanced_amount': round(amount, 2),
+            'fee': round(fee, 2),
+            'avg_days_advance': round(avg_days, 1),
+            'rate_pct': round(ratio * 100, 4),
+            'monthly_rate_pct': round(fee / (amount_days / 30) * 100, 4) if amount_days else 0,
+            'annualized_rate_pct': round(((1 + ratio) ** (365 / avg_days) - 1) * 100, 2) if avg_days else 0
+        }
+
     def get_advance_fee_rate(self, advance_payments_amount):
         """
         Calcula a taxa efetiva de antecipação
@@ -0,0 +1,190 @@
+"""
+Orphan Pairing Engine - Sugere pares entre órfãos do ReconciliatorV5
+Cruza orphan_settlement com orphan_releases quando o SOURCE_ID difere ou falta:
+- Ordena os órfãos de Recebimentos por valor
+- Busca binária na janela de tolerância de valor (O(n log n))
+- Filtra pela janela de datas e calcula score de confiança
+- Retorna pares sugeridos (1:1) ordenados por confiança
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+
+class OrphanPairingEngine:
+    """Pareia órfãos de Settlement e Recebimentos por valor e data"""
+
+    # Pesos do score de confiança (somam 1.0)
+    WEIGHT_AMOUNT = 0.5
+    WEIGHT_DATE = 0.3
+    WEIGHT_REFERENCE = 0.2
+
+    def __init__(self, amount_tolerance=0.05, date_window_days=3, max_candidates=5):
+        """
+        Args:
+            amount_tolerance: Diferença máxima de valor (R$) entre os órfãos
+            date_window_days: Diferença máxima de dias entre as datas
+            max_candidates: Máximo de candidatos avaliados por órfão de Settlement
+        """
+        self.amount_tolerance = float(amount_tolerance)
+        self.date_window_days = int(date_window_days)
+        self.max_candidates = int(max_candidates)
+
+    def pair(self, orphan_settlement, orphan_releases):
+        """Gera pares sugeridos entre órfãos
+
+        Args:
+            orphan_settlement: Lista results['orphan_settlement'] do ReconciliatorV5
+            orphan_releases: Lista results['orphan_releases'] do ReconciliatorV5
+
+        Returns:
+            Dict com pares sugeridos (1:1), total de candidatos e parâmetros
+        """
+        settlement_items = [self._settlement_item(o) for o in orphan_settlement]
+        settlement_items = [i for i in settlement_items if i['amount'] != 0]
+
+        release_items = [self._release_item(o) for o in orphan_releases]
+        release_items = [i for i in release_items if i['amount'] != 0]
+        release_items.sort(key=lambda x: x['amount'])
+        release_amounts = [i['amount'] for i in release_items]
+
+        candidates = []
+        for s_item in settlement_items:
+            low = bisect_left(release_amounts, s_item['amount'] - self.amount_tolerance)
+            high = bisect_right(release_amounts, s_item['amount'] + self.amount_tolerance)
+
+            scored = []
+            for r_item in release_items[low:high]:
+                candidate = self._score(s_item, r_item)
+                if candidate:
+                    scored.append(candidate)
+
+            scored.sort(key=lambda x: x['confidence'], reverse=True)
+            for rank, candidate in enumerate(scored[:self.max_candidates], start=1):
+                candidate['rank'] = rank
+                candidates.append(candidate)
+
+        # Atribuição gulosa 1:1 pela maior confiança
+        candidates.sort(key=lambda x: (-x['confidence'], x['amount_difference'], x['days_difference']))
+        used_settlement = set()
+        used_releases = set()
+        pairs = []
+
+        for candidate in candidates:
+            s_id = candidate['settlement_source_id']
+            r_id = candidate['releases_source_id']
+            if s_id in used_settlement or r_id in used_releases:
+                continue
+            used_settlement.add(s_id)
+            used_releases.add(r_id)
+            pairs.append(candidate)
+
+        return {
+            'count': len(pairs),
+            'candidates_evaluated': len(candidates),
+            'orphan_settlement': len(settlement_items),
+            'orphan_releases': len(release_items),
+            'params': {
+                'amount_tolerance': self.amount_tolerance,
+                'date_window_days': self.date_window_days,
+                'max_candidates': self.max_candidates
+            },
+            'pairs': pairs
+        }
+
+    def _score(self, s_item, r_item):
+        """Calcula a confiança de um par (None se fora da janela de datas)"""
+        amount_diff = abs(s_item['amount'] - r_item['amount'])
+
+        if s_item['date'] and r_item['date']:
+            days_diff = abs((s_item['date'] - r_item['date']).days)
+            if days_diff > self.date_window_days:
+                return None
+            date_score = 1.0 - days_diff / (self.date_window_days + 1)
+        else:
+            days_diff = None
+            date_score = 0.0
+
+        if self.amount_tolerance > 0:
+            amount_score = 1.0 - amount_diff / (self.amount_tolerance * 2)
+        else:
+            amount_score = 1.0
+
+        same_reference = bool(s_item['external_reference']) and \
+            s_item['external_reference'] == r_item['external_reference']
+
+        confidence = (
+            self.WEIGHT_AMOUNT * amount_score +
+            self.WEIGHT_DATE * date_score +
+            (self.WEIGHT_REFERENCE if same_reference else 0.0)
+        )
+
+        return {
+            'settlement_source_id': s_item['source_id'],
+            'releases_source_id': r_item['source_id'],
+            'settlement_amount': s_item['amount'],
+            'releases_amount': r_item['amount'],
+            'amount_difference': round(amount_diff, 2),
+            'settlement_date': s_item['date'].isoformat() if s_item['date'] else None,
+            'releases_date': r_item['date'].isoformat() if r_item['date'] else None,
+            'days_difference': days_diff,
+            'same_external_reference': same_reference,
+            'external_reference': s_item['external_reference'],
+            'confidence': round(confidence, 4)
+        }
+
+    def _settlement_item(self, orphan):
+        """Extrai valor líquido, data e referência de um órfão de Settlement"""
+        data = orphan.get('settlement') or {}
+        settlement = data.get('settlement')
+
+        rows = [settlement] if settlement else []
+        rows += data.get('refunds', []) + data.get('chargebacks', []) + data.get('chargeback_cancels', [])
+
+        amount = sum(float(r.get('settlement_net_amount', 0) or 0) for r in rows)
+        first = settlement or (rows[0] if rows else {})
+
+        return {
+            'source_id': orphan.get('source_id'),
+            'amount': round(amount, 2),
+            'date': self._to_date(first.get('approval_date') or first.get('money_release_date')),
+            'external_reference': self._clean_reference(first.get('external_reference'))
+        }
+
+    def _release_item(self, orphan):
+        """Extrai valor líquido, data e referência de um órfão de Recebimentos"""
+        data = orphan.get('releases') or {}
+
+        rows = []
+        for key in ['payments', 'refunds', 'chargebacks', 'chargeback_cancels', 'movements']:
+            rows += data.get(key, [])
+
+        amount = sum(
+            float(r.get('net_credit_amount', 0) or 0) - float(r.get('net_debit_amount', 0) or 0)
+            for r in rows
+        )
+
+        dates = [self._to_date(r.get('approval_date') or r.get('release_date')) for r in rows]
+        dates = [d for d in dates if d]
+        first = rows[0] if rows else {}
+
+        return {
+            'source_id': orphan.get('source_id'),
+            'amount': round(amount, 2),
+            'date': min(dates) if dates else None,
+            'external_reference': self._clean_reference(first.get('external_reference'))
+        }
+
+    def _clean_reference(self, value):
+        """Normaliza external_reference ('nan' e vazio viram '')"""
+        text = str(value or '').strip()
+        return '' if text == 'nan' else text
+
+    def _to_date(self, value):
+        """Converte string ISO para date (None se inválida)"""
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(str(value)[:10])
+        except ValueError:
+            return None
@@ -0,0 +1,150 @@
+"""
+Payout Attribution - Quais releases financiaram cada saque (payout)
+Percorre os releases em ordem de data com uma fila FIFO de créditos:
+- Créditos (payments, liberações de reserva, chargeback_cancel...) entram na fila
+- Débitos consomem a fila do crédito mais antigo para o mais novo
+- Payouts registram as alocações consumidas (inclusive parciais)
+- Outros débitos (taxas, refunds, reservas) consomem sem gerar atribuição
+- reserve_for_payout (par débito/crédito do próprio saque) é ignorado
+Tempo linear: cada crédito é consumido (ou dividido) no máximo uma vez por débito
+"""
+
+from collections import defaultdict
+from datetime import date
+
+
+# Descrições que não movimentam saldo disponível para atribuição
+PASS_THROUGH = {'reserve_for_payout'}
+
+
+class PayoutAttributionEngine:
+    """Atribuição FIFO de payouts aos créditos que os financiaram"""
+
+    def __init__(self, releases):
+        """
+        Args:
+            releases: Lista de releases (ReleasesProcessorV2.releases)
+        """
+        self.payouts = {}
+        self.by_reference = defaultdict(list)
+        self.absorbed = defaultdict(float)
+        self.unfunded_debits = 0.0
+        self._attribute(releases)
+
+    def _attribute(self, releases):
+        """Varredura FIFO (dois ponteiros: fila de créditos e fluxo de releases)"""
+        rows = [
+            r for r in releases
+            if r.get('release_date') and r.get('description') not in PASS_THROUGH
+        ]
+
+        # Mesmo dia: créditos antes dos débitos (as datas não têm horário)
+        rows.sort(key=lambda r: (r['release_date'][:10], 0 if r.get('net_credit_amount', 0) > 0 else 1))
+
+        queue = []      # créditos: [restante, release]
+        head = 0        # ponteiro para o crédito mais antigo com saldo
+
+        for release in rows:
+            credit = release.get('net_credit_amount') or 0.0
+            debit = abs(release.get('net_debit_amount') or 0.0)
+
+            if credit > 0:
+                queue.append([credit, release])
+            if debit <= 0:
+                continue
+
+            is_payout = release.get('description') == 'payout'
+            allocations = []
+            remaining = debit
+
+            while remaining > 0.005 and head < len(queue):
+                entry = queue[head]
+                used = min(entry[0], remaining)
+                entry[0] -= used
+                remaining -= used
+
+                if is_payout:
+                    allocations.append(self._allocation(entry[1], used, release))
+
+                if entry[0] <= 0.005:
+                    head += 1
+
+            if is_payout:
+                self._record_payout(release, debit, allocations, remaining)
+            else:
+                self.absorbed[release.get('description')] += debit - remaining
+                self.unfunded_debits += remaining
+
+        self.unallocated_credits = round(sum(entry[0] for entry in queue[head:]), 2)
+
+    def _allocation(self, credit_release, amount, payout):
+        """Parcela de um crédito consumida por um payout"""
+        return {
+            'source_id': credit_release.get('source_id'),
+            'external_reference': credit_release.get('external_reference'),
+            'description': credit_release.get('description'),
+            'release_date': credit_release['release_date'][:10],
+            'amount': round(amount, 2),
+            'partial': amount < (credit_release.get('net_credit_amount') or 0.0) - 0.005,
+            'age_days': self._days_between(credit_release['release_date'], payout['release_date'])
+        }
+
+    def _record_payout(self, payout, amount, allocations, unfunded):
+        """Registra o payout e indexa as alocações por referência"""
+        payout_id = payout.get('source_id')
+        record = {
+            'payout_id': payout_id,
+            'date': payout['release_date'][:10],
+            'amount': round(amount, 2),
+            'allocated': round(amount - unfunded, 2),
+            'unfunded': round(max(unfunded, 0.0), 2),
+            'allocations_count': len(allocations),
+            'allocations': allocations
+        }
+        self.payouts[payout_id] = record
+
+        for allocation in allocations:
+            link = {'payout_id': payout_id, 'payout_date': record['date'], 'amount': allocation['amount']}
+            for key in (allocation['external_reference'], allocation['source_id']):
+                if key and key != 'nan':
+                    self.by_reference[key].append(link)
+
+    def _days_between(self, start, end):
+        """Dias entre a liberação do crédito e o payout"""
+        try:
+            return (date.fromisoformat(end[:10]) - date.fromisoformat(start[:10])).days
+        except (TypeError, ValueError):
+            return None
+
+    def get_payout(self, payout_id):
+        """Atribuição de um payout (None se não existir)"""
+        return self.payouts.get(str(payout_id))
+
+    def get_by_reference(self, reference):
+        """Payouts que consumiram créditos de um external_reference ou SOURCE_ID"""
+        links = self.by_reference.get(str(reference), [])
+        return {
+            'reference': reference,
+            'payouts': links,
+            'total_amount': round(sum(link['amount'] for link in links), 2)
+        }
+
+    def get_summary(self):
+        """Resumo da atribuição (sem as alocações detalhadas)"""
+        payouts = sorted(self.payouts.values(), key=lambda p: p['date'], reverse=True)
+        ages = [a['age_days'] * a['amount'] for p in payouts for a in p['allocations'] if a['age_days'] is not None]
+        allocated = sum(p['allocated'] for p in payouts)
+
+        return {
+            'count': len(payouts),
+            'total_amount': round(sum(p['amount'] for p in payouts), 2),
+            'total_allocated': round(allocated, 2),
+            'total_unfunded': round(sum(p['unfunded'] for p in payouts), 2),
+            'avg_funding_age_days': round(sum(ages) / allocated, 1) if allocated else 0,
+            'absorbed_by_other_debits': {k: round(v, 2) for k, v in self.absorbed.items()},
+            'unallocated_credits': self.unallocated_credits,
+            'payouts': [
+                {k: v for k, v in p.items() if k != 'allocations'}
+                for p in payouts
+            ]
+        }
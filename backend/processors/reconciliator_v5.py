@@ -6,11 +6,21 @@ Implementa lógica completa de reconciliação de cartão de crédito
 from collections import defaultdict
 from datetime import datetime
 
+import numpy as np
+import pandas as pd
+
+from backend.processors.rule_engine import ReconciliationRuleEngine, AGGREGATE_COLUMNS, VALID_STATUSES
+
 
 class ReconciliatorV5:
     """Reconcilia Settlement com Recebimentos usando SOURCE_ID"""
 
-    def __init__(self):
+    def __init__(self, rule_engine=None):
+        """
+        Args:
+            rule_engine: ReconciliationRuleEngine (padrão: config/reconciliation_rules.json)
+        """
+        self.rule_engine = rule_engine or ReconciliationRuleEngine.from_file()
         self.results = {
             'matched': [],
             'refunded': [],
@@ -23,6 +33,9 @@ class ReconciliatorV5:
         }
         self.settlement_by_source = {}
         self.releases_by_source = {}
+        self.aggregates = pd.DataFrame(columns=AGGREGATE_COLUMNS)
+        self._items = []
+        self.frozen_items = []
 
     def process(self, settlement_data, releases_data):
         """Processa dados de Settlement e Recebimentos"""
@@ -35,9 +48,15 @@ class ReconciliatorV5:
         # Reconciliar cada transação
         all_sources = set(self.settlement_by_source.keys()) | set(self.releases_by_source.keys())
 
+        matched_items = []
         for source_id in all_sources:
             if source_id and source_id != 'nan':
-                self._reconcile_source(source_id)
+                item = self._reconcile_source(source_id)
+                if item:
+                    matched_items.append(item)
+
+        # Aplicar regras de status sobre todos os SOURCE_IDs de uma vez
+        self._classify(matched_items)
 
         # Resumo
         self._print_summary()
@@ -128,14 +147,115 @@ class ReconciliatorV5:
             })
             return
 
-        # Caso: Ambos existem - fazer reconciliação completa
-        result = self._match_settlement_releases(source_id, settlement_data, releases_data)
-        status = result['status']
+        # Caso: Ambos existem - calcular balanços (status é definido em lote)
+        return self._match_settlement_releases(source_id, settlement_data, releases_data)
+
+    def _classify(self, items):
+        """Define o status de cada item avaliando as regras sobre os agregados"""
+        print("  [3/3] Aplicando regras de status...")
+
+        self.aggregates = pd.DataFrame(
+            [item.pop('_aggregate') for item in items],
+            columns=AGGREGATE_COLUMNS
+        )
+        self._items = items
+
+        statuses, rule_names = self.rule_engine.classify(self.aggregates)
+        self._apply_statuses(statuses, rule_names)
+
+    def _apply_statuses(self, statuses, rule_names):
+        """Distribui os itens conciliados nos buckets de status"""
+        for status in VALID_STATUSES:
+            self.results[status] = [f for f in self.frozen_items if f['status'] == status]
+
+        for item, status, rule_name in zip(self._items, statuses, rule_names):
+            item['status'] = status
+            item['rule'] = rule_name
+            self.results[status].append(item)
+
+        self.aggregates['status'] = statuses
+        self.aggregates['rule'] = rule_names
+
+    def reclassify(self, rule_engine, apply=False):
+        """Reaplica as regras de status sobre os agregados, sem reler arquivos
+
+        Args:
+            rule_engine: ReconciliationRuleEngine com as regras/tolerância a testar
+            apply: Se True, atualiza os buckets de resultados com os novos status
+        """
+        orphan_counts = {
+            'orphan_settlement': len(self.results['orphan_settlement']),
+            'orphan_releases': len(self.results['orphan_releases'])
+        }
+        outcome = self.reclassify_table(self.aggregates, rule_engine, orphan_counts)
+
+        if apply:
+            self.rule_engine = rule_engine
+            self._apply_statuses(outcome.pop('_statuses'), outcome.pop('_rules'))
+        else:
+            outcome.pop('_statuses')
+            outcome.pop('_rules')
+
+        outcome['applied'] = bool(apply)
+        return outcome
+
+    @staticmethod
+    def reclassify_table(aggregates, rule_engine, orphan_counts=None):
+        """Classifica uma tabela de agregados (em memória ou carregada do cache)
+
+        Returns:
+            Dict com resumo por status, transições em relação ao status atual
+            e lista de SOURCE_IDs que mudariam de status
+        """
+        orphan_counts = orphan_counts or {}
+        statuses, rule_names = rule_engine.classify(aggregates)
+
+        summary = {status: 0 for status in VALID_STATUSES}
+        unique, counts = np.unique(statuses.astype(str), return_counts=True) if len(statuses) else ([], [])
+        for status, count in zip(unique, counts):
+            summary[status] = int(count)
+
+        summary['orphan_settlement'] = int(orphan_counts.get('orphan_settlement', 0))
+        summary['orphan_releases'] = int(orphan_counts.get('orphan_releases', 0))
+        summary['total'] = int(len(statuses)) + summary['orphan_settlement'] + summary['orphan_releases']
+
+        transitions = {}
+        changes = []
+        if 'status' in aggregates and len(statuses):
+            previous = aggregates['status'].to_numpy()
+            changed = previous != statuses
+
+            for source_id, before, after, rule_name in zip(
+                aggregates['source_id'].to_numpy()[changed],
+                previous[changed],
+                statuses[changed],
+                rule_names[changed]
+            ):
+                key = f"{before}->{after}"
+                transitions[key] = transitions.get(key, 0) + 1
+                changes.append({
+                    'source_id': source_id,
+                    'from': before,
+                    'to': after,
+                    'rule': rule_name
+                })
 
-        self.results[status].append(result)
+        return {
+            'summary': summary,
+            'changed': len(changes),
+            'transitions': transitions,
+            'changes': changes,
+            'rules': rule_engine.to_dict(),
+            '_statuses': statuses,
+            '_rules': rule_names
+        }
 
     def _match_settlement_releases(self, source_id, settlement_data, releases_data):
-        """Faz match entre Settlement e Recebimentos"""
+        """Faz match entre Settlement e Recebimentos
+
+        Calcula os balanços e os agregados usados pelas regras de status.
+        O status é atribuído depois, em lote, por _classify.
+        """
         settlement = settlement_data['settlement']
         installments = settlement_data['installments']
         refunds_settlement = settlement_data['refunds']
@@ -184,46 +304,28 @@ class ReconciliatorV5:
             # Chargeback Cancel em Releases tem net_credit_amount (dinheiro voltando)
             releases_net += float(cancel.get('net_credit_amount', 0))
 
-        # Determinar status
-        tolerance = 0.01  # tolerância para arredondamento
         settlement_net_rounded = round(settlement_net, 2)
         releases_net_rounded = round(releases_net, 2)
 
-        # REGRA ESPECIAL: Se nao há payments em releases mas há refunds/chargebacks
-        # Isso significa uma ordem cancelada antes de qualquer liberação
-        # Nesse caso, o balanço de Settlement deve ser zero (payment - refund = 0)
-        # e Releases mostra apenas os refunds/chargebacks que saíram
-        if not payments and not chargebacks_releases and not chargeback_cancels_releases:
-            # Sem payments e sem chargebacks em releases
-            # So refunds - verificar se Settlement fechou em zero
-            if settlement_net_rounded == 0.0 and (refunds_settlement or refunds_releases):
-                # Ordem foi cancelada totalmente
-                status = 'refunded'
-            else:
-                status = 'mismatch'
-        elif abs(settlement_net_rounded - releases_net_rounded) < tolerance:
-            # Valores batem - determinar status específico
-            # Prioridade: chargebacks > refunds > pending > matched
-            if chargeback_cancels_releases:
-                # Tem reversão de chargeback
-                status = 'chargeback_reversed'
-            elif chargebacks_releases:
-                # Tem chargeback sem reversão
-                status = 'chargeback_pending'
-            elif refunds_releases or refunds_settlement:
-                # Tem refund(s)
-                status = 'refunded'
-            elif not payments and installments:
-                # Tem parcelas não liberadas ainda
-                status = 'pending'
-            else:
-                # Tudo Ok, balanço fechado
-                status = 'matched'
-        else:
-            status = 'mismatch'
+        aggregate = {
+            'source_id': source_id,
+            'settlement_net': settlement_net_rounded,
+            'releases_net': releases_net_rounded,
+            'difference': abs(settlement_net_rounded - releases_net_rounded),
+            'has_settlement': settlement is not None,
+            'n_installments': len(installments),
+            'n_refunds_settlement': len(refunds_settlement),
+            'n_chargebacks_settlement': len(chargebacks),
+            'n_chargeback_cancels_settlement': len(chargeback_cancels),
+            'n_payments': len(payments),
+            'n_refunds_releases': len(refunds_releases),
+            'n_chargebacks_releases': len(chargebacks_releases),
+            'n_chargeback_cancels_releases': len(chargeback_cancels_releases),
+            'n_movements': len(releases_data['movements'])
+        }
 
         return {
-            'status': status,
+            'status': None,
             'source_id': source_id,
             'settlement_net': settlement_net_rounded,
             'releases_net': releases_net_rounded,
@@ -242,7 +344,8 @@ class ReconciliatorV5:
             'chargeback_cancels': {
                 'settlement': chargeback_cancels,
                 'releases': chargeback_cancels_releases
-            }
+            },
+            '_aggregate': aggregate
         }
 
     def _print_summary(self):
@@ -275,6 +378,56 @@ class ReconciliatorV5:
             if len(self.results['mismatch']) > 5:
                 print(f"    ... e mais {len(self.results['mismatch']) - 5}")
 
+    def add_frozen(self, items):
+        """Inclui resultados congelados de períodos fechados (não são reclassificados)"""
+        for item in items:
+            self.frozen_items.append(item)
+            self.results[item['status']].append(item)
+
+    def copy(self):
+        """Cópia para reclassificar sem alterar a original
+
+        Itens conciliados (cujo status muda), buckets e agregados são copiados;
+        congelados, órfãos e linhas por SOURCE_ID são compartilhados (não mudam).
+        """
+        clone = ReconciliatorV5(rule_engine=self.rule_engine)
+        copies = {id(item): dict(item) for item in self._items}
+
+        clone.results = {
+            status: [copies.get(id(item), item) for item in items]
+            for status, items in self.results.items()
+        }
+        clone.settlement_by_source = self.settlement_by_source
+        clone.releases_by_source = self.releases_by_source
+        clone.aggregates = self.aggregates.copy()
+        clone._items = [copies[id(item)] for item in self._items]
+        clone.frozen_items = list(self.frozen_items)
+        return clone
+
+    @classmethod
+    def merge(cls, reconciliators):
+        """Combina reconciliações de várias partições (vendedores) em uma só"""
+        reconciliators = list(reconciliators)
+        if len(reconciliators) == 1:
+            return reconciliators[0]
+
+        merged = cls(rule_engine=reconciliators[0].rule_engine if reconciliators else None)
+        tables = []
+
+        for rec in reconciliators:
+            for status, items in rec.results.items():
+                merged.results[status].extend(items)
+            merged.settlement_by_source.update(rec.settlement_by_source)
+            merged.releases_by_source.update(rec.releases_by_source)
+            merged._items.extend(rec._items)
+            merged.frozen_items.extend(rec.frozen_items)
+            tables.append(rec.aggregates)
+
+        if tables:
+            merged.aggregates = pd.concat(tables, ignore_index=True)
+
+        return merged
+
     def get_results(self):
         """Retorna resultados da reconciliação"""
         return self.results
@@ -13,19 +13,36 @@ class ReleasesProcessorV2:
         self.releases = []
         self.payments_only = []
         self.movements = []
+        self.late_rows = []
         
-    def process_files(self, directory):
-        """Processa todos os arquivos de recebimentos"""
+    def process_files(self, directory, skip_files=None, extra_rows=None, exclude_source_ids=None):
+        """Processa todos os arquivos de recebimentos
+
+        Args:
+            directory: Pasta com os arquivos de recebimentos
+            skip_files: Nomes de arquivos a ignorar (períodos fechados)
+            extra_rows: Releases já processados a incluir (arquivos pulados de períodos fechados)
+            exclude_source_ids: SOURCE_IDs congelados; releases desses IDs lidos dos arquivos
+                são registrados em late_rows (e mantidos nos releases: saldo, payouts);
+                PeriodCloseManager.late_rows descarta as que já existiam no fechamento
+        """
         directory_path = Path(directory)
+        skip_files = set(skip_files or [])
+        exclude_source_ids = exclude_source_ids or set()
+        self.late_rows = []
         
-        if not directory_path.exists():
+        if not directory_path.exists() and not extra_rows:
             print(f"  Diretório não encontrado: {directory}")
             return []
         
-        all_releases = []
-        files = list(directory_path.glob('*.*'))
+        all_releases = list(extra_rows or [])
+        files = list(directory_path.glob('*.*')) if directory_path.exists() else []
         files = [f for f in files if f.suffix.lower() in ['.xls', '.xlsx', '.csv']]
         
+        if skip_files:
+            print(f"\nIgnorando {len([f for f in files if f.name in skip_files])} arquivo(s) de períodos fechados")
+            files = [f for f in files if f.name not in skip_files]
+        
         print(f"\nProcessando {len(files)} arquivo(s) de recebimentos...")
         
         for file_path in sorted(files):
@@ -36,6 +53,8 @@ class ReleasesProcessorV2:
                     df = pd.read_excel(file_path)
                 
                 releases = self._process_releases_file(df, file_path.name)
+                if exclude_source_ids:
+                    self.late_rows.extend(r for r in releases if r['source_id'] in exclude_source_ids)
                 all_releases.extend(releases)
                 print(f"    {file_path.name}: {len(releases)} releases")
             except Exception as e:
@@ -150,6 +169,22 @@ class ReleasesProcessorV2:
                 print(f"        Descricao desconhecida: {desc} (payment_method: {payment_method}, record_type: {record_type})")
                 self.movements.append(release)
     
+    @classmethod
+    def merge(cls, processors):
+        """Combina processadores de várias partições (vendedores) em um só"""
+        processors = list(processors)
+        if len(processors) == 1:
+            return processors[0]
+
+        merged = cls()
+        for proc in processors:
+            merged.releases.extend(proc.releases)
+            merged.payments_only.extend(proc.payments_only)
+            merged.movements.extend(proc.movements)
+            merged.late_rows.extend(proc.late_rows)
+
+        return merged
+
     def get_payments_only(self, settlement_external_refs=None):
         """Retorna APENAS os payments (para conciliação)
 
@@ -0,0 +1,224 @@
+"""
+Rule Engine - Regras declarativas de status da reconciliação
+Carrega regras ordenadas de um arquivo JSON e as compila em máscaras vetorizadas:
+- Cada regra é um predicado (all/any/not/comparação) sobre os agregados por SOURCE_ID
+- Parâmetros ($tolerance, etc) são resolvidos na compilação
+- Todas as regras são avaliadas de uma vez sobre a tabela de agregados (numpy)
+- A primeira regra verdadeira define o status; senão, usa default_status
+"""
+
+import json
+import operator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parents[2] / 'config' / 'reconciliation_rules.json'
+
+# Status aceitos (mesmos buckets do ReconciliatorV5)
+VALID_STATUSES = [
+    'matched',
+    'refunded',
+    'chargeback_pending',
+    'chargeback_reversed',
+    'pending',
+    'mismatch'
+]
+
+# Colunas da tabela de agregados por SOURCE_ID
+AGGREGATE_COLUMNS = [
+    'source_id',
+    'settlement_net',
+    'releases_net',
+    'difference',
+    'has_settlement',
+    'n_installments',
+    'n_refunds_settlement',
+    'n_chargebacks_settlement',
+    'n_chargeback_cancels_settlement',
+    'n_payments',
+    'n_refunds_releases',
+    'n_chargebacks_releases',
+    'n_chargeback_cancels_releases',
+    'n_movements'
+]
+
+# Colunas texto; as demais são numéricas (ou booleanas)
+TEXT_COLUMNS = ['source_id']
+
+_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le
+}
+
+
+class ReconciliationRuleEngine:
+    """Compila regras declarativas em predicados vetorizados"""
+
+    def __init__(self, config):
+        """
+        Args:
+            config: Dict com 'rules', 'params' e 'default_status'
+        """
+        self.config = config
+        self.params = dict(config.get('params', {}))
+        self.default_status = config.get('default_status', 'matched')
+        self.rules = list(config.get('rules', []))
+        self._compiled = self._compile()
+
+    @classmethod
+    def from_file(cls, path=None):
+        """Carrega regras de um arquivo JSON (padrão: config/reconciliation_rules.json)"""
+        path = Path(path) if path else DEFAULT_RULES_PATH
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def with_overrides(self, params=None, rules=None):
+        """Retorna novo engine com parâmetros e/ou regras substituídos
+
+        Raises:
+            ValueError: Parâmetros ou regras com formato ou tipos inválidos
+        """
+        if params is not None and not isinstance(params, dict):
+            raise ValueError("'params' deve ser um objeto")
+        if rules is not None and not isinstance(rules, list):
+            raise ValueError("'rules' deve ser uma lista de regras")
+
+        config = dict(self.config)
+        config['params'] = {**self.params, **(params or {})}
+        if rules is not None:
+            config['rules'] = rules
+        return ReconciliationRuleEngine(config)
+
+    @property
+    def tolerance(self):
+        """Tolerância de arredondamento configurada"""
+        return float(self.params.get('tolerance', 0.01))
+
+    def _compile(self):
+        """Compila cada regra em uma função df -> máscara booleana"""
+        if self.default_status not in VALID_STATUSES:
+            raise ValueError(f"default_status inválido: {self.default_status}")
+
+        compiled = []
+        for position, rule in enumerate(self.rules):
+            if not isinstance(rule, dict):
+                raise ValueError(f"Regra {position}: deve ser um objeto, recebido {type(rule).__name__}")
+            name = rule.get('name', f'rule_{position}')
+            status = rule.get('status')
+
+            if status not in VALID_STATUSES:
+                raise ValueError(f"Regra '{name}': status inválido '{status}'")
+            if 'when' not in rule:
+                raise ValueError(f"Regra '{name}': falta o predicado 'when'")
+
+            compiled.append((name, status, self._compile_node(rule['when'], name)))
+
+        return compiled
+
+    def _compile_node(self, node, rule_name):
+        """Compila um nó do predicado (all, any, not ou comparação)"""
+        if not isinstance(node, dict):
+            raise ValueError(f"Regra '{rule_name}': predicado deve ser um objeto")
+
+        for combinator in ('all', 'any'):
+            if combinator in node and not isinstance(node[combinator], list):
+                raise ValueError(f"Regra '{rule_name}': '{combinator}' deve ser uma lista")
+
+        if 'all' in node:
+            children = [self._compile_node(child, rule_name) for child in node['all']]
+            return lambda df: np.logical_and.reduce([c(df) for c in children]) if children \
+                else np.ones(len(df), dtype=bool)
+
+        if 'any' in node:
+            children = [self._compile_node(child, rule_name) for child in node['any']]
+            return lambda df: np.logical_or.reduce([c(df) for c in children]) if children \
+                else np.zeros(len(df), dtype=bool)
+
+        if 'not' in node:
+            child = self._compile_node(node['not'], rule_name)
+            return lambda df: ~child(df)
+
+        field = node.get('field')
+        op = node.get('op')
+
+        if field not in AGGREGATE_COLUMNS:
+            raise ValueError(f"Regra '{rule_name}': campo desconhecido '{field}'")
+        if op not in _OPERATORS:
+            raise ValueError(f"Regra '{rule_name}': operador desconhecido '{op}'")
+
+        value = self._resolve_value(node.get('value'), rule_name)
+        self._check_value(field, op, value, rule_name)
+        func = _OPERATORS[op]
+
+        return lambda df: np.asarray(func(df[field].to_numpy(), value), dtype=bool)
+
+    def _resolve_value(self, value, rule_name):
+        """Resolve referências a parâmetros ('$tolerance')"""
+        if isinstance(value, str) and value.startswith('$'):
+            key = value[1:]
+            if key not in self.params:
+                raise ValueError(f"Regra '{rule_name}': parâmetro desconhecido '{value}'")
+            return self.params[key]
+        return value
+
+    def _check_value(self, field, op, value, rule_name):
+        """Valida o tipo do valor comparado com a coluna"""
+        if field in TEXT_COLUMNS:
+            valid = isinstance(value, str) and op in ('==', '!=')
+            expected = 'texto (apenas == e !=)'
+        else:
+            valid = isinstance(value, (int, float))
+            expected = 'número'
+
+        if not valid:
+            raise ValueError(
+                f"Regra '{rule_name}': valor de '{field}' deve ser {expected}, recebido {value!r}"
+            )
+
+    def classify(self, aggregates):
+        """Avalia as regras sobre a tabela de agregados
+
+        Args:
+            aggregates: DataFrame com AGGREGATE_COLUMNS (uma linha por SOURCE_ID)
+
+        Returns:
+            Tupla (status, regra) com arrays numpy alinhados às linhas
+        """
+        size = len(aggregates)
+        statuses = np.full(size, self.default_status, dtype=object)
+        rule_names = np.full(size, 'default', dtype=object)
+
+        if size == 0 or not self._compiled:
+            return statuses, rule_names
+
+        masks = np.vstack([predicate(aggregates) for _, _, predicate in self._compiled])
+        fired = masks.any(axis=0)
+        first = masks.argmax(axis=0)
+
+        status_lookup = np.array([status for _, status, _ in self._compiled], dtype=object)
+        name_lookup = np.array([name for name, _, _ in self._compiled], dtype=object)
+
+        statuses[fired] = status_lookup[first[fired]]
+        rule_names[fired] = name_lookup[first[fired]]
+
+        return statuses, rule_names
+
+    def to_dict(self):
+        """Configuração atual (para exibição/persistência)"""
+        return {
+            'params': self.params,
+            'default_status': self.default_status,
+            'rules': self.rules
+        }
+
+
+def empty_aggregates():
+    """Tabela de agregados vazia com as colunas esperadas"""
+    return pd.DataFrame(columns=AGGREGATE_COLUMNS)
@@ -19,19 +19,36 @@ class SettlementProcessorV3:
         self.installments = []
         self.order_balances = {}
         self.payment_types = {}
+        self.late_rows = []
         
-    def process_files(self, directory):
-        """Processa todos os arquivos de settlement"""
+    def process_files(self, directory, skip_files=None, extra_rows=None, exclude_source_ids=None):
+        """Processa todos os arquivos de settlement
+
+        Args:
+            directory: Pasta com os arquivos de settlement
+            skip_files: Nomes de arquivos a ignorar (períodos fechados)
+            extra_rows: Linhas já processadas a incluir (arquivos pulados de períodos fechados)
+            exclude_source_ids: SOURCE_IDs congelados; linhas desses IDs lidas dos arquivos
+                são registradas em late_rows (e mantidas nas transações);
+                PeriodCloseManager.late_rows descarta as que já existiam no fechamento
+        """
         directory_path = Path(directory)
+        skip_files = set(skip_files or [])
+        exclude_source_ids = exclude_source_ids or set()
+        self.late_rows = []
         
-        if not directory_path.exists():
+        if not directory_path.exists() and not extra_rows:
             print(f"  Diretório não encontrado: {directory}")
             return []
         
-        all_data = []
-        files = list(directory_path.glob('*.*'))
+        all_data = list(extra_rows or [])
+        files = list(directory_path.glob('*.*')) if directory_path.exists() else []
         files = [f for f in files if f.suffix.lower() in ['.xls', '.xlsx', '.csv']]
         
+        if skip_files:
+            print(f"\nIgnorando {len([f for f in files if f.name in skip_files])} arquivo(s) de períodos fechados")
+            files = [f for f in files if f.name not in skip_files]
+        
         print(f"\nProcessando {len(files)} arquivo(s) de settlement...")
         
         for file_path in sorted(files):
@@ -42,6 +59,8 @@ class SettlementProcessorV3:
                     df = pd.read_excel(file_path)
                 
                 data = self._process_settlement_file(df, file_path.name)
+                if exclude_source_ids:
+                    self.late_rows.extend(d for d in data if d['source_id'] in exclude_source_ids)
                 all_data.extend(data)
                 print(f"    {file_path.name}: {len(data)} linhas")
             except Exception as e:
@@ -322,6 +341,38 @@ class SettlementProcessorV3:
         
         return 'outros'
     
+    @classmethod
+    def merge(cls, processors, seller_ids):
+        """Combina processadores de várias partições (vendedores) em um só
+
+        A mesma external_reference pode existir em contas diferentes: no
+        processador combinado, order_balances é indexado por
+        (seller_id, external_reference).
+
+        Args:
+            processors: Processadores das partições
+            seller_ids: USER_ID de cada processador (mesma ordem)
+        """
+        merged = cls()
+        for proc, seller_id in zip(processors, seller_ids):
+            merged.transactions.extend(proc.transactions)
+            merged.installments.extend(proc.installments)
+            merged.order_balances.update(
+                ((seller_id, ref), balance) for ref, balance in proc.order_balances.items()
+            )
+            merged.payment_types.update(proc.payment_types)
+            merged.late_rows.extend(proc.late_rows)
+
+        return merged
+
+    def find_order_balances(self, external_ref):
+        """Saldos de uma external_reference no processador combinado, por conta"""
+        return {
+            seller_id: balance
+            for (seller_id, ref), balance in self.order_balances.items()
+            if ref == external_ref
+        }
+
     def get_installments(self):
         """Retorna todas as parcelas"""
         return self.installments
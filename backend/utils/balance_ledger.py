@@ -0,0 +1,132 @@
+"""
+Balance Ledger - Linha do tempo do saldo da conta Mercado Pago
+Reconstrói o saldo a partir de todos os releases (créditos e débitos):
+- Releases ordenados por release_date (ordem estável do arquivo no mesmo dia)
+- Saldo corrente por soma acumulada (numpy)
+- Saldo em qualquer data por busca binária
+- Série diária com créditos, débitos e saldo de fechamento
+"""
+
+import numpy as np
+
+
+class BalanceLedger:
+    """Razão de saldo construído a partir dos releases"""
+
+    def __init__(self, releases, opening_balance=0.0):
+        """
+        Args:
+            releases: Lista de releases (ReleasesProcessorV2.releases)
+            opening_balance: Saldo anterior ao primeiro release do relatório
+        """
+        self.opening_balance = float(opening_balance)
+
+        rows = [r for r in releases if r.get('release_date')]
+        dates = np.array([r['release_date'][:10] for r in rows], dtype='<U10')
+        credits = np.array([r.get('net_credit_amount') or 0.0 for r in rows], dtype=float)
+        debits = np.abs(np.array([r.get('net_debit_amount') or 0.0 for r in rows], dtype=float))
+
+        order = np.argsort(dates, kind='stable')
+        self._rows = [rows[k] for k in order]
+        self.dates = dates[order]
+        self.credits = credits[order]
+        self.debits = debits[order]
+        self.amounts = self.credits - self.debits
+        self.balances = self.opening_balance + np.cumsum(self.amounts)
+
+        # Último lançamento de cada dia (dias contíguos após a ordenação)
+        self.days, first = np.unique(self.dates, return_index=True)
+        self._day_last = np.r_[first[1:] - 1, len(self.dates) - 1] if len(self.dates) else first
+        self._day_first = first
+
+    def __len__(self):
+        return len(self.dates)
+
+    def balance_at(self, date):
+        """Saldo ao fim do dia 'date' (YYYY-MM-DD)"""
+        position = int(np.searchsorted(self.dates, date, side='right'))
+        if position == 0:
+            return round(self.opening_balance, 2)
+        return round(float(self.balances[position - 1]), 2)
+
+    def _day_bounds(self, start_date=None, end_date=None):
+        lo = int(np.searchsorted(self.days, start_date, side='left')) if start_date else 0
+        hi = int(np.searchsorted(self.days, end_date, side='right')) if end_date else len(self.days)
+        return lo, max(lo, hi)
+
+    def daily_series(self, start_date=None, end_date=None):
+        """Saldo de fechamento por dia (apenas dias com lançamentos)"""
+        lo, hi = self._day_bounds(start_date, end_date)
+        if lo == hi:
+            return []
+
+        credits = np.add.reduceat(self.credits, self._day_first)[lo:hi]
+        debits = np.add.reduceat(self.debits, self._day_first)[lo:hi]
+        closing = self.balances[self._day_last[lo:hi]]
+        counts = (self._day_last - self._day_first + 1)[lo:hi]
+
+        return [
+            {
+                'date': str(day),
+                'credits': round(float(credits[k]), 2),
+                'debits': round(float(debits[k]), 2),
+                'net': round(float(credits[k] - debits[k]), 2),
+                'closing_balance': round(float(closing[k]), 2),
+                'count': int(counts[k])
+            }
+            for k, day in enumerate(self.days[lo:hi])
+        ]
+
+    def entries(self, start_date=None, end_date=None, limit=100, offset=0):
+        """Lançamentos com saldo corrente entre duas datas (paginado)"""
+        lo = int(np.searchsorted(self.dates, start_date, side='left')) if start_date else 0
+        hi = int(np.searchsorted(self.dates, end_date, side='right')) if end_date else len(self.dates)
+        hi = max(lo, hi)
+
+        page_lo = min(lo + offset, hi)
+        page_hi = min(page_lo + limit, hi)
+
+        return {
+            'total': hi - lo,
+            'entries': [
+                {
+                    'date': str(self.dates[k]),
+                    'source_id': self._rows[k].get('source_id'),
+                    'description': self._rows[k].get('description'),
+                    'credit': round(float(self.credits[k]), 2),
+                    'debit': round(float(self.debits[k]), 2),
+                    'balance': round(float(self.balances[k]), 2)
+                }
+                for k in range(page_lo, page_hi)
+            ]
+        }
+
+    def get_summary(self):
+        """Saldos inicial/final, totais e extremos do período"""
+        if not len(self.dates):
+            return {
+                'opening_balance': round(self.opening_balance, 2),
+                'closing_balance': round(self.opening_balance, 2),
+                'total_credits': 0,
+                'total_debits': 0,
+                'count': 0,
+                'first_date': None,
+                'last_date': None,
+                'min_balance': None,
+                'max_balance': None
+            }
+
+        low = int(np.argmin(self.balances))
+        high = int(np.argmax(self.balances))
+
+        return {
+            'opening_balance': round(self.opening_balance, 2),
+            'closing_balance': round(float(self.balances[-1]), 2),
+            'total_credits': round(float(self.credits.sum()), 2),
+            'total_debits': round(float(self.debits.sum()), 2),
+            'count': len(self.dates),
+            'first_date': str(self.dates[0]),
+            'last_date': str(self.dates[-1]),
+            'min_balance': {'date': str(self.dates[low]), 'balance': round(float(self.balances[low]), 2)},
+            'max_balance': {'date': str(self.dates[high]), 'balance': round(float(self.balances[high]), 2)}
+        }
@@ -10,15 +10,34 @@ Calcula fluxo de caixa com:
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+from backend.utils.cashflow_index import CashFlowIndex
+from backend.utils.receivables_cube import ReceivablesCube
+from backend.utils.aging import compute_aging
+
 class CashFlowCalculatorV2:
     def __init__(self, installments):
         self.installments = installments
-        # Filtrar parcelas canceladas do fluxo
+        self._index = None
+        self._stats = None
+        self._cube = None
+        self._aging = {}
+        self._split_active()
+
+    def _split_active(self):
+        """Filtrar parcelas canceladas do fluxo"""
         self.active_installments = [
-            i for i in installments 
+            i for i in self.installments
             if i.get('status') != 'cancelled' and not i.get('is_cancelled', False)
         ]
-    
+
+    def invalidate(self):
+        """Descarta índices e totais em cache (chamar quando status/valores das parcelas mudarem)"""
+        self._split_active()
+        self._index = None
+        self._stats = None
+        self._cube = None
+        self._aging = {}
+
     def _get_installment_value(self, installment):
         """Retorna o valor da parcela"""
         if installment.get('received_amount'):
@@ -46,6 +65,73 @@ class CashFlowCalculatorV2:
         except:
             return None
     
+    def _get_stats(self):
+        """Contagens, totais e listas por status em uma única passada (em cache)"""
+        if self._stats is not None:
+            return self._stats
+
+        by_status = {}
+        active_by_status = defaultdict(list)
+        active_totals = defaultdict(float)
+        cancelled = []
+        total_expected = 0.0
+        advance_received = 0.0
+        advance_days = 0
+
+        for installment in self.installments:
+            status = installment['status']
+            value = self._get_installment_value(installment)
+
+            entry = by_status.setdefault(status, {'count': 0, 'total_amount': 0.0})
+            entry['count'] += 1
+            entry['total_amount'] += value
+
+            if status == 'cancelled':
+                cancelled.append(installment)
+                continue
+            if installment.get('is_cancelled', False):
+                continue
+
+            active_by_status[status].append(installment)
+            active_totals[status] += value
+            if status in ['pending', 'received', 'received_advance', 'overdue']:
+                total_expected += value
+            if status == 'received_advance':
+                advance_received += installment.get('received_amount', 0)
+                advance_days += installment.get('days_advance', 0)
+
+        self._stats = {
+            'by_status': by_status,
+            'active_by_status': active_by_status,
+            'active_totals': active_totals,
+            'cancelled': cancelled,
+            'total_expected': total_expected,
+            'advance_received': advance_received,
+            'advance_days': advance_days
+        }
+        return self._stats
+
+    def get_index(self):
+        """Índice por dia do fluxo a receber (construído uma vez, sob demanda)"""
+        if self._index is None:
+            self._index = CashFlowIndex(
+                self.active_installments, self._get_installment_value, self._parse_date_safe
+            )
+        return self._index
+
+    def get_cube(self):
+        """Cubo de recebíveis (status x tipo x bandeira x mês x conta), construído uma vez"""
+        if self._cube is None:
+            self._cube = ReceivablesCube(self.installments, self._get_installment_value)
+        return self._cube
+
+    def get_aging(self, as_of=None):
+        """Aging dos recebíveis em aberto (em cache por data de referência)"""
+        as_of = as_of or datetime.now().strftime('%Y-%m-%d')
+        if as_of not in self._aging:
+            self._aging[as_of] = compute_aging(self.active_installments, self._get_installment_value, as_of)
+        return self._aging[as_of]
+
     def get_daily_cashflow(self, start_date=None, end_date=None):
         """Retorna fluxo de caixa diário - APENAS A RECEBER (pendentes e atrasados)
 
@@ -56,59 +142,8 @@ class CashFlowCalculatorV2:
             today = datetime.now()
             start_date = (today - timedelta(days=30)).strftime('%Y-%m-%d')
 
-        # APENAS parcelas que ainda não foram recebidas (pendentes e atrasadas)
-        relevant_installments = [
-            i for i in self.active_installments
-            if i['status'] in ['pending', 'overdue']
-        ]
-
-        daily_flow = defaultdict(lambda: {
-            'date': '',
-            'to_receive': 0.0,  # A receber total
-            'pending': 0.0,
-            'overdue': 0.0,
-            'count_to_receive': 0,
-            'count_pending': 0,
-            'count_overdue': 0
-        })
-
-        for installment in relevant_installments:
-            # Usar data esperada do settlement (money_release_date)
-            date = self._parse_date_safe(installment.get('money_release_date'))
-
-            if not date:
-                continue
-
-            if end_date and date > end_date:
-                continue
-
-            if date >= start_date:
-                daily_flow[date]['date'] = date
-
-                value = self._get_installment_value(installment)
-                status = installment['status']
-
-                if status == 'pending':
-                    daily_flow[date]['pending'] += value
-                    daily_flow[date]['count_pending'] += 1
-                elif status == 'overdue':
-                    daily_flow[date]['overdue'] += value
-                    daily_flow[date]['count_overdue'] += 1
+        return self.get_index().daily(start_date, end_date)
 
-                daily_flow[date]['to_receive'] += value
-                daily_flow[date]['count_to_receive'] += 1
-
-        # Converter para lista e ordenar
-        result = sorted(daily_flow.values(), key=lambda x: x['date'])
-
-        # Arredondar valores
-        for item in result:
-            item['to_receive'] = round(item['to_receive'], 2)
-            item['pending'] = round(item['pending'], 2)
-            item['overdue'] = round(item['overdue'], 2)
-
-        return result
-    
     def get_monthly_cashflow(self, start_date=None, end_date=None):
         """Retorna fluxo de caixa mensal - APENAS A RECEBER (pendentes e atrasados)
 
@@ -117,90 +152,35 @@ class CashFlowCalculatorV2:
         if not start_date:
             start_date = datetime.now().strftime('%Y-%m-%d')
 
-        # APENAS parcelas que ainda não foram recebidas (pendentes e atrasadas)
-        relevant_installments = [
-            i for i in self.active_installments
-            if i['status'] in ['pending', 'overdue']
-        ]
-
-        monthly_flow = defaultdict(lambda: {
-            'month': '',
-            'to_receive': 0.0,  # A receber total
-            'pending': 0.0,
-            'overdue': 0.0,
-            'count_to_receive': 0,
-            'count_pending': 0,
-            'count_overdue': 0
-        })
-
-        for installment in relevant_installments:
-            # Usar data esperada do settlement (money_release_date)
-            date = self._parse_date_safe(installment.get('money_release_date'))
-
-            if not date:
-                continue
-
-            if end_date and date > end_date:
-                continue
-
-            if date >= start_date:
-                month_key = date[:7]
+        return self.get_index().monthly(start_date, end_date)
 
-                monthly_flow[month_key]['month'] = month_key
+    def get_cashflow_series(self, granularity='day', start_date=None, end_date=None):
+        """Fluxo a receber agregado por dia, semana ISO, mês ou trimestre
 
-                value = self._get_installment_value(installment)
-                status = installment['status']
-
-                if status == 'pending':
-                    monthly_flow[month_key]['pending'] += value
-                    monthly_flow[month_key]['count_pending'] += 1
-                elif status == 'overdue':
-                    monthly_flow[month_key]['overdue'] += value
-                    monthly_flow[month_key]['count_overdue'] += 1
-
-                monthly_flow[month_key]['to_receive'] += value
-                monthly_flow[month_key]['count_to_receive'] += 1
-
-        result = sorted(monthly_flow.values(), key=lambda x: x['month'])
-
-        for item in result:
-            item['to_receive'] = round(item['to_receive'], 2)
-            item['pending'] = round(item['pending'], 2)
-            item['overdue'] = round(item['overdue'], 2)
+        Raises:
+            ValueError: Granularidade inválida
+        """
+        return self.get_index().series(granularity, start_date, end_date)
 
-        return result
+    def get_range_total(self, start_date=None, end_date=None):
+        """Total a receber (pendentes e atrasados) entre duas datas, inclusive"""
+        return self.get_index().range_totals(start_date, end_date)
     
     def get_summary_by_status(self):
         """Resumo por status"""
-        status_summary = defaultdict(lambda: {
-            'count': 0,
-            'total_amount': 0.0
-        })
-        
-        for installment in self.installments:
-            status = installment['status']
-            status_summary[status]['count'] += 1
-            
-            value = self._get_installment_value(installment)
-            status_summary[status]['total_amount'] += value
-        
-        for status in status_summary:
-            status_summary[status]['total_amount'] = round(status_summary[status]['total_amount'], 2)
-        
-        return dict(status_summary)
+        return {
+            status: {'count': entry['count'], 'total_amount': round(entry['total_amount'], 2)}
+            for status, entry in self._get_stats()['by_status'].items()
+        }
     
     def get_overdue_installments(self):
         """Parcelas atrasadas"""
-        overdue = [
-            i for i in self.active_installments 
-            if i['status'] == 'overdue'
-        ]
-        
-        total_overdue = sum(self._get_installment_value(i) for i in overdue)
+        stats = self._get_stats()
+        overdue = stats['active_by_status'].get('overdue', [])
         
         return {
             'count': len(overdue),
-            'total_amount': round(total_overdue, 2),
+            'total_amount': round(stats['active_totals'].get('overdue', 0.0), 2),
             'installments': overdue
         }
     
@@ -228,10 +208,8 @@ class CashFlowCalculatorV2:
     
     def get_advance_summary(self):
         """Resumo de parcelas antecipadas"""
-        advance = [
-            i for i in self.active_installments 
-            if i['status'] == 'received_advance'
-        ]
+        stats = self._get_stats()
+        advance = stats['active_by_status'].get('received_advance', [])
         
         if not advance:
             return {
@@ -241,72 +219,48 @@ class CashFlowCalculatorV2:
                 'installments': []
             }
         
-        total_amount = sum(i.get('received_amount', 0) for i in advance)
-        avg_days = sum(i.get('days_advance', 0) for i in advance) / len(advance)
-        
         return {
             'count': len(advance),
-            'total_amount': round(total_amount, 2),
-            'avg_days_advance': round(avg_days, 1),
+            'total_amount': round(stats['advance_received'], 2),
+            'avg_days_advance': round(stats['advance_days'] / len(advance), 1),
             'installments': advance
         }
     
     def get_cancelled_summary(self):
         """Resumo de parcelas canceladas"""
-        cancelled = [i for i in self.installments if i.get('status') == 'cancelled']
+        cancelled = self._get_stats()['cancelled']
         
-        by_reason = defaultdict(list)
+        by_reason = defaultdict(int)
         for inst in cancelled:
-            reason = inst.get('cancelled_reason', 'unknown')
-            by_reason[reason].append(inst)
+            by_reason[inst.get('cancelled_reason', 'unknown')] += 1
         
         return {
             'count': len(cancelled),
             'by_reason': {
-                'full_refund': len(by_reason.get('full_refund', [])),
-                'chargeback': len(by_reason.get('chargeback', [])),
-                'other': len(by_reason.get('unknown', [])) + len(by_reason.get('low_amount', []))
+                'full_refund': by_reason['full_refund'],
+                'chargeback': by_reason['chargeback'],
+                'other': by_reason['unknown'] + by_reason['low_amount']
             },
             'installments': cancelled
         }
     
     def get_summary(self):
-        """Totais gerais"""
-        total_expected = 0.0
-        total_received = 0.0
-        total_received_advance = 0.0
-        total_pending = 0.0
-        total_overdue = 0.0
-        
-        for i in self.active_installments:
-            value = self._get_installment_value(i)
-            status = i['status']
-            
-            if status in ['pending', 'received', 'received_advance', 'overdue']:
-                total_expected += value
-            
-            if status == 'received':
-                total_received += value
-            elif status == 'received_advance':
-                total_received_advance += value
-            elif status == 'pending':
-                total_pending += value
-            elif status == 'overdue':
-                total_overdue += value
-        
-        cancelled_count = len([i for i in self.installments if i.get('status') == 'cancelled'])
+        """Totais gerais (calculados em uma única passada e mantidos em cache)"""
+        stats = self._get_stats()
+        totals = stats['active_totals']
+        counts = stats['active_by_status']
         
         return {
-            'total_expected': round(total_expected, 2),
-            'total_received': round(total_received, 2),
-            'total_received_advance': round(total_received_advance, 2),
-            'total_pending': round(total_pending, 2),
-            'total_overdue': round(total_overdue, 2),
+            'total_expected': round(stats['total_expected'], 2),
+            'total_received': round(totals.get('received', 0.0), 2),
+            'total_received_advance': round(totals.get('received_advance', 0.0), 2),
+            'total_pending': round(totals.get('pending', 0.0), 2),
+            'total_overdue': round(totals.get('overdue', 0.0), 2),
             'count_total': len(self.installments),
             'count_active': len(self.active_installments),
-            'count_cancelled': cancelled_count,
-            'count_received': len([i for i in self.active_installments if i['status'] == 'received']),
-            'count_received_advance': len([i for i in self.active_installments if i['status'] == 'received_advance']),
-            'count_pending': len([i for i in self.active_installments if i['status'] == 'pending']),
-            'count_overdue': len([i for i in self.active_installments if i['status'] == 'overdue'])
-        }
\ No newline at end of file
+            'count_cancelled': len(stats['cancelled']),
+            'count_received': len(counts.get('received', [])),
+            'count_received_advance': len(counts.get('received_advance', [])),
+            'count_pending': len(counts.get('pending', [])),
+            'count_overdue': len(counts.get('overdue', []))
+        }
@@ -0,0 +1,169 @@
+"""
+Cashflow Index - Índice do fluxo a receber por dia com somas acumuladas
+Agrupa as parcelas pendentes e atrasadas por dia uma única vez:
+- Dias ordenados em array (busca binária por intervalo de datas)
+- Valores e contagens por dia + somas acumuladas (total de qualquer intervalo em O(log n))
+- Agregação por dia, semana ISO, mês ou trimestre em fatias contíguas
+  (dias ordenados => períodos contíguos)
+"""
+
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+
+# Campos agregados por dia (valores e contagens)
+VALUE_FIELDS = ['pending', 'overdue']
+COUNT_FIELDS = ['count_pending', 'count_overdue']
+
+# Granularidades suportadas -> nome da chave do período na resposta
+GRANULARITIES = {
+    'day': 'date',
+    'week': 'week',
+    'month': 'month',
+    'quarter': 'quarter'
+}
+
+
+class CashFlowIndex:
+    """Fluxo a receber (pending + overdue) indexado por dia"""
+
+    def __init__(self, installments, value_func, date_func):
+        """
+        Args:
+            installments: Parcelas ativas
+            value_func: Função parcela -> valor
+            date_func: Função parcela -> data YYYY-MM-DD (ou None)
+        """
+        per_day = defaultdict(lambda: [0.0, 0.0, 0, 0])
+
+        for installment in installments:
+            status = installment.get('status')
+            if status not in ('pending', 'overdue'):
+                continue
+
+            date = date_func(installment.get('money_release_date'))
+            if not date:
+                continue
+
+            bucket = per_day[date]
+            if status == 'pending':
+                bucket[0] += value_func(installment)
+                bucket[2] += 1
+            else:
+                bucket[1] += value_func(installment)
+                bucket[3] += 1
+
+        days = sorted(per_day)
+        rows = [per_day[d] for d in days]
+
+        self.dates = np.array(days, dtype='<U10')
+        self.values = {
+            'pending': np.array([r[0] for r in rows], dtype=float),
+            'overdue': np.array([r[1] for r in rows], dtype=float),
+            'count_pending': np.array([r[2] for r in rows], dtype=np.int64),
+            'count_overdue': np.array([r[3] for r in rows], dtype=np.int64)
+        }
+
+        # Somas acumuladas com zero inicial: total[lo:hi] = cum[hi] - cum[lo]
+        self.cumulative = {
+            field: np.concatenate([[0], np.cumsum(values)])
+            for field, values in self.values.items()
+        }
+
+        self.months = self.dates.astype('<U7')
+        self._period_keys = {'month': self.months}
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _bounds(self, start_date=None, end_date=None):
+        """Posições [lo, hi) dos dias entre start_date e end_date (inclusive)"""
+        lo = int(np.searchsorted(self.dates, start_date, side='left')) if start_date else 0
+        hi = int(np.searchsorted(self.dates, end_date, side='right')) if end_date else len(self.dates)
+        return lo, max(lo, hi)
+
+    def _row(self, key_name, key, pending, overdue, count_pending, count_overdue):
+        """Linha no formato do fluxo diário/mensal (sem chave se key_name for None)"""
+        row = {key_name: key} if key_name else {}
+        row.update({
+            'to_receive': round(float(pending + overdue), 2),
+            'pending': round(float(pending), 2),
+            'overdue': round(float(overdue), 2),
+            'count_to_receive': int(count_pending + count_overdue),
+            'count_pending': int(count_pending),
+            'count_overdue': int(count_overdue)
+        })
+        return row
+
+    def range_totals(self, start_date=None, end_date=None):
+        """Totais a receber entre duas datas (inclusive) via somas acumuladas"""
+        lo, hi = self._bounds(start_date, end_date)
+        totals = {
+            field: self.cumulative[field][hi] - self.cumulative[field][lo]
+            for field in VALUE_FIELDS + COUNT_FIELDS
+        }
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            **self._row(None, None, totals['pending'], totals['overdue'],
+                        totals['count_pending'], totals['count_overdue'])
+        }
+
+    def daily(self, start_date=None, end_date=None):
+        """Série diária (apenas dias com valores) entre duas datas"""
+        lo, hi = self._bounds(start_date, end_date)
+        pending = self.values['pending'][lo:hi]
+        overdue = self.values['overdue'][lo:hi]
+        count_pending = self.values['count_pending'][lo:hi]
+        count_overdue = self.values['count_overdue'][lo:hi]
+
+        return [
+            self._row('date', str(date), pending[k], overdue[k], count_pending[k], count_overdue[k])
+            for k, date in enumerate(self.dates[lo:hi])
+        ]
+
+    def monthly(self, start_date=None, end_date=None):
+        """Série mensal entre duas datas"""
+        return self._rollup(self.months, 'month', start_date, end_date)
+
+    def series(self, granularity='day', start_date=None, end_date=None):
+        """Série agregada por granularidade (day, week, month, quarter)"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Granularidade inválida: {granularity} (use {', '.join(GRANULARITIES)})")
+        if granularity == 'day':
+            return self.daily(start_date, end_date)
+        return self._rollup(self._keys(granularity), GRANULARITIES[granularity], start_date, end_date)
+
+    def _keys(self, granularity):
+        """Chave do período de cada dia (calculada uma vez por granularidade)"""
+        if granularity not in self._period_keys:
+            dates = pd.to_datetime(pd.Series(self.dates, dtype=object))
+            if granularity == 'week':
+                iso = dates.dt.isocalendar()
+                keys = iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)
+            else:
+                keys = dates.dt.year.astype(str) + '-Q' + dates.dt.quarter.astype(str)
+            self._period_keys[granularity] = keys.to_numpy(dtype=str)
+        return self._period_keys[granularity]
+
+    def _rollup(self, keys, key_name, start_date=None, end_date=None):
+        """Agrega dias consecutivos com a mesma chave de período (keys alinhado a dates)"""
+        lo, hi = self._bounds(start_date, end_date)
+        if lo == hi:
+            return []
+
+        period_keys = keys[lo:hi]
+        starts = np.flatnonzero(np.r_[True, period_keys[1:] != period_keys[:-1]])
+
+        sums = {
+            field: np.add.reduceat(self.values[field][lo:hi], starts)
+            for field in VALUE_FIELDS + COUNT_FIELDS
+        }
+
+        return [
+            self._row(key_name, str(period_keys[start]), sums['pending'][k], sums['overdue'][k],
+                      sums['count_pending'][k], sums['count_overdue'][k])
+            for k, start in enumerate(starts)
+        ]
@@ -0,0 +1,81 @@
+"""
+Compression - Compressão negociada das respostas JSON grandes
+- gzip sempre disponível (zlib); brotli e zstd apenas se os pacotes
+  'brotli' / 'zstandard' estiverem instalados (opcionais)
+- Negociação pelo Accept-Encoding (qualidade do cliente, depois a preferência
+  do servidor: br > zstd > gzip)
+- Compressão incremental em blocos (compressobj/compressor), sem cópias do
+  corpo inteiro; o resultado é guardado junto da resposta serializada
+"""
+
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Tamanho dos blocos enviados ao compressor
+CHUNK_SIZE = 64 * 1024
+
+
+def _chunks(body):
+    view = memoryview(body)
+    for start in range(0, len(view), CHUNK_SIZE):
+        yield view[start:start + CHUNK_SIZE]
+
+
+def _gzip(body):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    parts = [compressor.compress(chunk) for chunk in _chunks(body)]
+    parts.append(compressor.flush())
+    return b''.join(parts)
+
+
+def _brotli(body):
+    compressor = brotli.Compressor(quality=5)
+    parts = [compressor.process(bytes(chunk)) for chunk in _chunks(body)]
+    parts.append(compressor.finish())
+    return b''.join(parts)
+
+
+def _zstd(body):
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    parts = [compressor.compress(chunk) for chunk in _chunks(body)]
+    parts.append(compressor.flush())
+    return b''.join(parts)
+
+
+# Codificações disponíveis em ordem de preferência do servidor
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS['br'] = _brotli
+if zstandard is not None:
+    ENCODERS['zstd'] = _zstd
+ENCODERS['gzip'] = _gzip
+
+
+def negotiate(accept_encodings):
+    """Melhor codificação aceita pelo cliente (None = sem compressão)
+
+    Args:
+        accept_encodings: request.accept_encodings (werkzeug)
+    """
+    best = None
+    best_quality = 0
+    for encoding in ENCODERS:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding):
+    """Comprime o corpo com a codificação informada"""
+    return ENCODERS[encoding](body)
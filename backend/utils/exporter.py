@@ -217,6 +217,55 @@ class ReportExporter:
         print(f"[EXPORT] Arquivo JSON gerado: {filepath}")
         return filepath
 
+    def export_aging(self, aging):
+        """
+        Exporta o aging dos recebíveis em aberto em TXT e JSON
+        Retorna: dict com caminhos dos arquivos gerados
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        bucket_names = list(aging['buckets'].keys())
+
+        txt_path = os.path.join(self.output_dir, f'aging_{timestamp}.txt')
+        with open(txt_path, 'w', encoding='utf-8') as f:
+            f.write('='*80 + '\n')
+            f.write('AGING DE RECEBIVEIS - MERCADO PAGO\n')
+            f.write('='*80 + '\n\n')
+            f.write(f'Data/Hora: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}\n')
+            f.write(f"Data de referencia: {aging['as_of']}\n")
+            f.write('-'*80 + '\n\n')
+
+            f.write('1. FAIXAS (dias apos money_release_date)\n')
+            f.write('-'*80 + '\n')
+            for name, bucket in aging['buckets'].items():
+                f.write(f"  {name:>8}: {bucket['count']:>6} parcelas | R$ {bucket['amount']:.2f} "
+                        f"({self._percentage(bucket['amount'], aging['total_open'])}%)\n")
+            f.write(f"\n  Total em aberto: R$ {aging['total_open']:.2f}\n")
+            f.write(f"  Total vencido: R$ {aging['total_past_due']:.2f}\n")
+            f.write(f"  Media de dias em atraso: {aging['avg_days_past_due']}\n\n")
+
+            f.write('2. POR TIPO DE PAGAMENTO (R$)\n')
+            f.write('-'*80 + '\n')
+            f.write(f"  {'Tipo':<20}" + ''.join(f'{name:>12}' for name in bucket_names) + f"{'Total':>14}\n")
+            for payment_type, buckets in aging['by_payment_type'].items():
+                f.write(f'  {payment_type:<20}'
+                        + ''.join(f"{buckets[name]['amount']:>12.2f}" for name in bucket_names)
+                        + f"{buckets['total']:>14.2f}\n")
+            f.write('\n' + '='*80 + '\n')
+
+        json_path = os.path.join(self.output_dir, f'aging_{timestamp}.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'metadata': {
+                    'exported_at': datetime.now().isoformat(),
+                    'version': 'V5',
+                    'format': 'JSON'
+                },
+                'aging': aging
+            }, f, indent=2, ensure_ascii=False)
+
+        print(f"[EXPORT] Aging gerado: {txt_path}, {json_path}")
+        return {'txt': txt_path, 'json': json_path}
+
     def _percentage(self, value, total):
         """Calcula percentual"""
         if total == 0:
@@ -0,0 +1,129 @@
+"""
+Installment Index - Índices de parcelas por status, pré-ordenados
+Uma visão por rota de /api/installments/*:
+- Membros pelo status, já ordenados pela chave da rota (desempate pela ordem
+  original, igual à ordenação estável anterior)
+- Totais acumulados (prefixos): total da visão e de qualquer página em O(1)
+- Página (limit/offset) em O(tamanho da página)
+- Mudanças de status (ex: OverdueTracker pending -> overdue) atualizam só as
+  visões afetadas, por intercalação linear com as parcelas que entraram
+"""
+
+import heapq
+from itertools import accumulate
+
+
+# Visão -> status aceitos, chave de ordenação, ordem e campo de valor
+VIEWS = {
+    'pending': {
+        'statuses': ('pending',),
+        'sort_key': lambda i: i.get('money_release_date') or '9999-12-31',
+        'reverse': False,
+        'amount': 'installment_net_amount'
+    },
+    'received': {
+        'statuses': ('received', 'received_advance'),
+        'sort_key': lambda i: i.get('received_date') or '0000-01-01',
+        'reverse': True,
+        'amount': 'received_amount'
+    },
+    'overdue': {
+        'statuses': ('overdue',),
+        'sort_key': lambda i: i.get('money_release_date') or '9999-12-31',
+        'reverse': False,
+        'amount': 'installment_net_amount'
+    },
+    'advance': {
+        'statuses': ('received_advance',),
+        'sort_key': lambda i: i.get('days_advance') or 0,
+        'reverse': True,
+        'amount': 'received_amount'
+    }
+}
+
+
+class InstallmentIndex:
+    """Visões por status das parcelas, ordenadas e com totais acumulados"""
+
+    def __init__(self, installments):
+        """
+        Args:
+            installments: Todas as parcelas (settlement_proc.get_installments())
+        """
+        self._positions = {id(i): pos for pos, i in enumerate(installments)}
+        self._views = {}
+
+        for name, spec in VIEWS.items():
+            members = [i for i in installments if i.get('status') in spec['statuses']]
+            self._set_view(name, sorted(members, key=self._order_key(name), reverse=spec['reverse']))
+
+    def _order_key(self, name):
+        """Chave da visão com desempate pela posição original
+
+        Em ordem decrescente a posição entra negativa: empates continuam na
+        ordem original, como no sorted(..., reverse=True) estável.
+        """
+        spec = VIEWS[name]
+        sort_key = spec['sort_key']
+        positions = self._positions
+        sign = -1 if spec['reverse'] else 1
+        return lambda i: (sort_key(i), sign * positions[id(i)])
+
+    def _set_view(self, name, items):
+        amount = VIEWS[name]['amount']
+        self._views[name] = {
+            'items': items,
+            'amounts': list(accumulate((float(i.get(amount, 0)) for i in items), initial=0.0)),
+            'days': list(accumulate((float(i.get('days_advance') or 0) for i in items), initial=0.0))
+        }
+
+    def move_status(self, installments, old_status, new_status):
+        """Atualiza as visões após parcelas mudarem de old_status para new_status
+
+        As parcelas já devem estar com o novo status.
+        """
+        moved = {id(i) for i in installments}
+        if not moved:
+            return
+
+        for name, spec in VIEWS.items():
+            was_member = old_status in spec['statuses']
+            is_member = new_status in spec['statuses']
+            if was_member == is_member:
+                continue
+
+            items = self._views[name]['items']
+            if was_member:
+                self._set_view(name, [i for i in items if id(i) not in moved])
+            else:
+                order_key = self._order_key(name)
+                added = sorted(installments, key=order_key, reverse=spec['reverse'])
+                self._set_view(name, list(heapq.merge(items, added, key=order_key, reverse=spec['reverse'])))
+
+    def get_page(self, name, limit=None, offset=0):
+        """Página de uma visão com totais da visão e da página
+
+        Args:
+            name: pending, received, overdue ou advance
+            limit: Tamanho da página (None = todas a partir de offset)
+            offset: Posição inicial
+        """
+        view = self._views[name]
+        count = len(view['items'])
+        lo = min(max(offset, 0), count)
+        hi = count if limit is None else min(lo + max(limit, 0), count)
+        amounts = view['amounts']
+
+        return {
+            'installments': view['items'][lo:hi],
+            'count': count,
+            'total_amount': round(amounts[count], 2),
+            'page_amount': round(amounts[hi] - amounts[lo], 2),
+            'offset': lo,
+            'limit': limit,
+            'avg_days_advance': round(view['days'][count] / count, 1) if count else 0
+        }
+
+    def get_counts(self):
+        """Quantidade de parcelas por visão"""
+        return {name: len(view['items']) for name, view in self._views.items()}
@@ -0,0 +1,274 @@
+"""
+Jobs - Execução do processamento em segundo plano
+Cada chamada de processamento vira um job com ID:
+- Executado em uma thread dedicada (um job por vez; novos pedidos durante a
+  execução recebem o job em andamento)
+- Etapa atual, linhas processadas por etapa e tempo de cada etapa
+- Etapas por partição só concluem quando todas as partições esperadas concluem;
+  uma exceção dentro de uma etapa a marca como 'failed'
+- ETA pela duração do último job concluído (ou pela fração de etapas concluídas)
+- Histórico limitado dos últimos jobs para consulta
+"""
+
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+
+class ProcessingJob:
+    """Estado e progresso de um job de processamento"""
+
+    def __init__(self, stages, params=None):
+        """
+        Args:
+            stages: Lista ordenada dos nomes das etapas do pipeline
+            params: Parâmetros do job (apenas informativo)
+        """
+        self.job_id = uuid.uuid4().hex[:12]
+        self.params = params or {}
+        self.status = 'queued'
+        self.stage = None
+        self.stages = OrderedDict(
+            (name, {'status': 'pending', 'rows': 0, 'seconds': None}) for name in stages
+        )
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self._started = None
+        self._finished = None
+        self._stage_started = {}
+        self._expected = {}
+        self._finished_parts = {}
+        self._lock = threading.Lock()
+
+    def expect(self, names, partitions):
+        """Etapas executadas uma vez por partição; sem partições = puladas
+
+        Args:
+            names: Etapas do pipeline de cada partição
+            partitions: Chaves das partições que vão executá-las
+        """
+        partitions = set(partitions)
+        with self._lock:
+            for name in names:
+                self._expected[name] = partitions
+                if not partitions:
+                    self.stages[name].update(status='skipped', seconds=0)
+
+    def start_stage(self, name, partition=None):
+        """Marca o início de uma etapa (idempotente entre partições paralelas)"""
+        with self._lock:
+            stage = self.stages.setdefault(name, {'status': 'pending', 'rows': 0, 'seconds': None})
+            if stage['status'] == 'pending':
+                stage['status'] = 'running'
+                self._stage_started[name] = time.perf_counter()
+            self.stage = name
+
+    def add_rows(self, name, rows):
+        """Soma linhas processadas em uma etapa"""
+        with self._lock:
+            self.stages.setdefault(name, {'status': 'pending', 'rows': 0, 'seconds': None})['rows'] += int(rows)
+
+    def finish_stage(self, name, partition=None):
+        """Marca a etapa da partição como concluída
+
+        A etapa só fica 'done' (com sua duração) quando todas as partições
+        esperadas a concluíram.
+        """
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None or stage['status'] in ('done', 'skipped', 'failed'):
+                return
+            finished = self._finished_parts.setdefault(name, set())
+            finished.add(partition)
+            if not self._expected.get(name, {None}) <= finished:
+                return
+            self._close_stage(name, stage, 'done')
+
+    def fail_stage(self, name, partition=None):
+        """Marca a etapa como falha (exceção em qualquer partição)"""
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None or stage['status'] in ('done', 'skipped', 'failed'):
+                return
+            if partition is not None:
+                stage['failed_partition'] = partition
+            self._close_stage(name, stage, 'failed')
+
+    def _close_stage(self, name, stage, status):
+        """Registra status final e duração da etapa; requer o lock"""
+        started = self._stage_started.get(name, self._started or time.perf_counter())
+        stage['status'] = status
+        stage['seconds'] = round(time.perf_counter() - started, 3)
+
+    @contextmanager
+    def step(self, name, partition=None):
+        """Bloco de uma etapa: with job.step('settlement', key): ...
+
+        Se o bloco levantar uma exceção, a etapa fica 'failed' e a exceção segue.
+        """
+        self.start_stage(name, partition)
+        try:
+            yield
+        except BaseException:
+            self.fail_stage(name, partition)
+            raise
+        self.finish_stage(name, partition)
+
+    def elapsed(self):
+        """Segundos desde o início (até o fim, se concluído)"""
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.perf_counter()) - self._started
+
+    def to_dict(self, reference_duration=None):
+        """Representação JSON do job
+
+        Args:
+            reference_duration: Duração (s) do último job concluído, para o ETA
+        """
+        with self._lock:
+            stages = [dict(stage, name=name) for name, stage in self.stages.items()]
+
+        done = sum(1 for s in stages if s['status'] in ('done', 'skipped'))
+        progress = done / len(stages) if stages else 0.0
+        elapsed = self.elapsed()
+
+        eta = None
+        if self.status in ('done', 'failed'):
+            eta = 0
+        elif self.status == 'running':
+            if reference_duration:
+                eta = max(reference_duration - elapsed, 0.0)
+            elif progress > 0:
+                eta = elapsed * (1 - progress) / progress
+            if eta is not None:
+                eta = round(eta, 1)
+
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'stage': self.stage,
+            'params': self.params,
+            'progress': round(progress * 100, 1),
+            'elapsed_seconds': round(elapsed, 1),
+            'eta_seconds': eta,
+            'stages': stages,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+            'traceback': self.traceback,
+            'result': self.result
+        }
+
+
+class NullProgress:
+    """Progresso sem efeito (processamento fora de um job)"""
+
+    def expect(self, names, partitions):
+        pass
+
+    def start_stage(self, name, partition=None):
+        pass
+
+    def add_rows(self, name, rows):
+        pass
+
+    def finish_stage(self, name, partition=None):
+        pass
+
+    def fail_stage(self, name, partition=None):
+        pass
+
+    def step(self, name, partition=None):
+        return nullcontext()
+
+
+class JobManager:
+    """Fila de jobs de processamento (um em execução por vez)"""
+
+    def __init__(self, stages, max_history=20):
+        """
+        Args:
+            stages: Etapas do pipeline (usadas em todos os jobs)
+            max_history: Quantidade de jobs mantidos para consulta
+        """
+        self.stages = list(stages)
+        self.max_history = max_history
+        self._jobs = OrderedDict()
+        self._active = None
+        self._last_duration = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, params=None):
+        """Agenda func(job) em segundo plano
+
+        Se já houver um job em execução, ele é retornado em vez de criar outro.
+
+        Returns:
+            (job, created) - created=False quando o job em andamento foi reaproveitado
+        """
+        with self._lock:
+            if self._active is not None and self._active.status in ('queued', 'running'):
+                return self._active, False
+
+            job = ProcessingJob(self.stages, params)
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+            self._active = job
+
+        thread = threading.Thread(target=self._run, args=(job, func), name=f'job-{job.job_id}', daemon=True)
+        thread.start()
+        return job, True
+
+    def _run(self, job, func):
+        job.status = 'running'
+        job.started_at = datetime.now().isoformat()
+        job._started = time.perf_counter()
+        print(f"[JOB {job.job_id}] Iniciado")
+
+        try:
+            job.result = func(job)
+            status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.traceback = traceback.format_exc()
+            status = 'failed'
+
+        job._finished = time.perf_counter()
+        job.finished_at = datetime.now().isoformat()
+        job.status = status
+
+        if job.status == 'done':
+            self._last_duration = job.elapsed()
+        print(f"[JOB {job.job_id}] {job.status} em {job.elapsed():.1f}s")
+
+    def get(self, job_id):
+        """Job pelo ID (None se não existir ou já saiu do histórico)"""
+        return self._jobs.get(job_id)
+
+    def describe(self, job):
+        """Representação JSON de um job com ETA"""
+        return job.to_dict(reference_duration=self._last_duration)
+
+    def list(self):
+        """Jobs do histórico, mais recentes primeiro (sem o resultado)"""
+        jobs = [self.describe(job) for job in reversed(list(self._jobs.values()))]
+        for job in jobs:
+            job.pop('result')
+        return jobs
+
+    @property
+    def active(self):
+        """Job em execução (None se nenhum)"""
+        job = self._active
+        return job if job is not None and job.status in ('queued', 'running') else None
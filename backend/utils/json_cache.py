@@ -20,7 +20,7 @@ class JSONCache:
             cache_dir: Diretório onde os arquivos de cache serão armazenados
         """
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(exist_ok=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
 
         # Subdiretórios por tipo de dados
         self.settlement_dir = self.cache_dir / 'settlement'
@@ -134,6 +134,39 @@ class JSONCache:
             print(f"[ERRO] Erro ao carregar Reconciliation: {e}")
             return None
 
+    def save_aggregates(self, aggregates_data):
+        """Salva a tabela de agregados por SOURCE_ID (formato colunar compacto)
+
+        Args:
+            aggregates_data: Dict com 'columns' (coluna -> lista de valores),
+                             contagem de órfãos e regras usadas
+        """
+        try:
+            clean_data = self._ensure_serializable(aggregates_data)
+
+            file_path = self.reconciliation_dir / 'aggregates.json'
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(clean_data, f, ensure_ascii=False, separators=(',', ':'))
+
+            print(f"[OK] Agregados salvos em {file_path}")
+            return True
+        except Exception as e:
+            print(f"[ERRO] Erro ao salvar Agregados: {e}")
+            return False
+
+    def load_aggregates(self):
+        """Carrega a tabela de agregados por SOURCE_ID"""
+        try:
+            file_path = self.reconciliation_dir / 'aggregates.json'
+            if not file_path.exists():
+                return None
+
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[ERRO] Erro ao carregar Agregados: {e}")
+            return None
+
     def save_cashflow(self, cashflow_data):
         """Salva dados de Fluxo de Caixa"""
         try:
@@ -194,7 +227,7 @@ class JSONCache:
             import shutil
             if self.cache_dir.exists():
                 shutil.rmtree(self.cache_dir)
-                self.cache_dir.mkdir(exist_ok=True)
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
 
                 # Recriar subdiretórios
                 for dir_path in [self.settlement_dir, self.releases_dir,
@@ -0,0 +1,95 @@
+"""
+Overdue Tracker - Promoção de parcelas vencidas para 'overdue'
+Mantém as parcelas pendentes ordenadas por money_release_date e um ponteiro
+para o "hoje":
+- Ao virar o dia, só as parcelas que cruzaram a data são visitadas
+  (busca binária + fatia entre o ponteiro antigo e o novo)
+- Parcelas que deixaram de estar pendentes (recebidas) são ignoradas
+- Callbacks on_change invalidam caches (ex: CashFlowCalculatorV2.invalidate)
+- Callbacks on_promote recebem as parcelas promovidas (ex: InstallmentIndex)
+"""
+
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+
+class OverdueTracker:
+    """Índice de parcelas pendentes por data com ponteiro para o dia atual"""
+
+    def __init__(self, installments, on_change=None, today=None, on_promote=None):
+        """
+        Args:
+            installments: Parcelas (apenas as 'pending' com data são indexadas)
+            on_change: Lista de funções chamadas quando parcelas são promovidas
+            today: Data inicial YYYY-MM-DD (padrão: hoje)
+            on_promote: Lista de funções f(parcelas, 'pending', 'overdue')
+        """
+        pending = sorted(
+            (i for i in installments if i.get('status') == 'pending' and i.get('money_release_date')),
+            key=lambda i: i['money_release_date'][:10]
+        )
+        self._items = pending
+        self._dates = [i['money_release_date'][:10] for i in pending]
+        self._cursor = 0
+        self._on_change = list(on_change or [])
+        self._on_promote = list(on_promote or [])
+        self._lock = threading.Lock()
+
+        self.today = None
+        self.promoted_total = 0
+        self.advance(today)
+
+    def advance(self, today=None):
+        """Move o ponteiro até 'today' e promove as parcelas vencidas
+
+        Parcelas com money_release_date anterior a 'today' ainda pendentes
+        passam para 'overdue'. Sem custo se o dia não mudou.
+
+        Os callbacks rodam dentro do lock e self.today só recebe o novo dia
+        depois deles: quem já vê o novo dia (e o usa no ETag) nunca lê índices
+        ou caches pela metade, e quem chega no novo dia espera no lock.
+
+        Returns:
+            Quantidade de parcelas promovidas nesta chamada
+        """
+        today = today or datetime.now().strftime('%Y-%m-%d')
+        if today == self.today:
+            return 0
+
+        with self._lock:
+            if self.today is not None and today <= self.today:
+                return 0
+
+            end = bisect_left(self._dates, today, lo=self._cursor)
+            promoted_items = []
+
+            for installment in self._items[self._cursor:end]:
+                if installment.get('status') == 'pending':
+                    installment['status'] = 'overdue'
+                    promoted_items.append(installment)
+
+            promoted = len(promoted_items)
+
+            if promoted:
+                print(f"[OVERDUE] {today}: {promoted} parcelas vencidas promovidas para 'overdue'")
+                for callback in self._on_promote:
+                    callback(promoted_items, 'pending', 'overdue')
+                for callback in self._on_change:
+                    callback()
+
+            self._cursor = end
+            self.promoted_total += promoted
+            self.today = today
+
+        return promoted
+
+    def get_status(self):
+        """Estado do ponteiro (para diagnóstico)"""
+        return {
+            'today': self.today,
+            'indexed': len(self._items),
+            'crossed': self._cursor,
+            'promoted_total': self.promoted_total,
+            'next_due_date': self._dates[self._cursor] if self._cursor < len(self._dates) else None
+        }
@@ -0,0 +1,115 @@
+"""
+Seller Partitions - Descoberta de partições por conta Mercado Pago (USER_ID)
+Cada conta (vendedor) é uma partição independente:
+- data/settlement/<USER_ID>/ e data/recebimentos/<USER_ID>/ (uma pasta por conta)
+- Arquivos soltos na raiz formam a partição legada (conta única),
+  identificada pelo USER_ID encontrado no Settlement
+- Fingerprint por partição (nome, tamanho e data dos arquivos) para
+  reprocessar apenas as partições que mudaram
+"""
+
+import hashlib
+from collections import Counter
+from pathlib import Path
+
+
+ROOT_PARTITION = '_root'
+
+SETTLEMENT_EXTENSIONS = ['.xls', '.xlsx', '.csv']
+RELEASES_EXTENSIONS = ['.xls', '.xlsx', '.csv']
+
+
+class SellerPartitioner:
+    """Descobre as partições por vendedor nas pastas de dados"""
+
+    def __init__(self, settlement_dir='data/settlement', releases_dir='data/recebimentos'):
+        self.settlement_dir = Path(settlement_dir)
+        self.releases_dir = Path(releases_dir)
+
+    def discover(self):
+        """Retorna as partições encontradas
+
+        Returns:
+            Dict partition_key -> {
+                'partition_key', 'settlement_dir', 'releases_dir',
+                'settlement_files', 'releases_files', 'fingerprint'
+            }
+        """
+        keys = set()
+
+        for base in [self.settlement_dir, self.releases_dir]:
+            if not base.exists():
+                continue
+            for entry in base.iterdir():
+                if entry.is_dir() and not entry.name.startswith('.'):
+                    keys.add(entry.name)
+
+        partitions = {}
+
+        for key in sorted(keys):
+            partition = self._build_partition(key, self.settlement_dir / key, self.releases_dir / key)
+            if partition['settlement_files'] or partition['releases_files']:
+                partitions[key] = partition
+
+        # Partição legada: arquivos na raiz (ou nenhuma pasta por conta)
+        root = self._build_partition(ROOT_PARTITION, self.settlement_dir, self.releases_dir)
+        if root['settlement_files'] or root['releases_files'] or not partitions:
+            partitions[ROOT_PARTITION] = root
+
+        return partitions
+
+    def _build_partition(self, key, settlement_dir, releases_dir):
+        """Monta a descrição de uma partição com seu fingerprint"""
+        settlement_files = self._list_files(settlement_dir, SETTLEMENT_EXTENSIONS)
+        releases_files = self._list_files(releases_dir, RELEASES_EXTENSIONS)
+
+        return {
+            'partition_key': key,
+            'settlement_dir': str(settlement_dir),
+            'releases_dir': str(releases_dir),
+            'settlement_files': [f.name for f in settlement_files],
+            'releases_files': [f.name for f in releases_files],
+            'fingerprint': self._fingerprint(settlement_files + releases_files)
+        }
+
+    def _list_files(self, directory, extensions):
+        """Lista arquivos de dados (não recursivo) de uma pasta"""
+        if not directory.exists():
+            return []
+        return sorted(
+            f for f in directory.glob('*.*')
+            if f.is_file() and f.suffix.lower() in extensions
+        )
+
+    def _fingerprint(self, files):
+        """Hash de (caminho, tamanho, mtime) dos arquivos da partição"""
+        digest = hashlib.sha1()
+        for file_path in files:
+            stat = file_path.stat()
+            digest.update(f"{file_path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def resolve_seller_id(partition_key, transactions):
+        """Identifica o USER_ID da partição a partir das linhas do Settlement
+
+        Pastas por conta usam o nome da pasta; a partição legada (raiz) usa
+        o USER_ID mais frequente. Avisa quando há outros USER_IDs misturados.
+        """
+        user_ids = Counter(
+            t.get('user_id') for t in transactions
+            if t.get('user_id') and t.get('user_id') != 'nan'
+        )
+
+        if partition_key != ROOT_PARTITION:
+            seller_id = partition_key
+        elif user_ids:
+            seller_id = user_ids.most_common(1)[0][0]
+        else:
+            seller_id = 'default'
+
+        others = [u for u in user_ids if u != seller_id]
+        if others:
+            print(f"    AVISO: partição {seller_id} contém outros USER_IDs: {', '.join(sorted(others))}")
+
+        return seller_id
@@ -0,0 +1,393 @@
+"""
+Period Close - Fechamento de períodos (meses) da reconciliação
+Congela o estado conciliado de um mês em um snapshot imutável:
+- SOURCE_IDs fechados (matched, refunded, chargeback_reversed) são congelados
+  com seus resultados, parcelas e saldos de pedido
+- Itens em aberto (pending, chargeback_pending, mismatch, órfãos) continuam
+  sendo conciliados normalmente
+- Arquivos cujas linhas pertencem apenas a meses fechados deixam de ser lidos:
+  suas linhas já processadas ficam no snapshot e são repostas no processamento
+  (sem reler o XLSX), de modo que saldos, payouts e contagens não mudam
+- Linhas dos SOURCE_IDs congelados continuam nos processadores (ledger,
+  payouts, reservas); a conciliação usa o resultado congelado e as parcelas e
+  saldos de pedido vêm do snapshot (status do fechamento, sem novo cruzamento)
+- As chaves das linhas dos SOURCE_IDs congelados ficam no snapshot: só linhas
+  que não existiam no fechamento contam como atividade tardia
+"""
+
+import json
+import os
+import stat
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+
+CLOSED_STATUSES = ['matched', 'refunded', 'chargeback_reversed']
+OPEN_STATUSES = ['pending', 'chargeback_pending', 'mismatch', 'orphan_settlement', 'orphan_releases']
+
+# Campos que identificam uma linha (sem o arquivo de origem)
+ROW_KEY_FIELDS = {
+    'settlement': (
+        'source_id', 'transaction_type', 'description', 'installment_number',
+        'transaction_amount', 'settlement_net_amount', 'installment_net_amount',
+        'approval_date', 'money_release_date', 'refund_id'
+    ),
+    'releases': (
+        'source_id', 'release_date', 'record_type', 'description',
+        'net_credit_amount', 'net_debit_amount', 'gross_amount', 'installments'
+    )
+}
+
+
+def row_key(row, kind):
+    """Chave de uma linha de settlement ou releases (kind)"""
+    return '|'.join(str(row.get(field)) for field in ROW_KEY_FIELDS[kind])
+
+
+class PeriodCloseManager:
+    """Gerencia snapshots de períodos fechados por partição (conta)"""
+
+    def __init__(self, base_dir='periods'):
+        """
+        Args:
+            base_dir: Diretório dos snapshots (fora do cache, não é limpo por /api/reset)
+        """
+        self.base_dir = Path(base_dir)
+
+    def _partition_dir(self, partition_key):
+        return self.base_dir / partition_key
+
+    def list_periods(self, partition_key):
+        """Lista os snapshots de uma partição (metadados, sem o conteúdo)"""
+        directory = self._partition_dir(partition_key)
+        if not directory.exists():
+            return []
+
+        periods = []
+        for file_path in sorted(directory.glob('*.json')):
+            snapshot = self._read(file_path)
+            if snapshot:
+                periods.append(snapshot['metadata'])
+        return periods
+
+    def load_state(self, partition_key, partition=None):
+        """Carrega o estado acumulado dos períodos fechados de uma partição
+
+        Args:
+            partition_key: Chave da partição
+            partition: Descrição da partição (SellerPartitioner) para validar arquivos
+
+        Returns:
+            Dict com closed_through, frozen_ids, frozen_items, frozen_installments,
+            frozen_order_balances, skip_settlement_files, skip_releases_files,
+            as linhas dos arquivos pulados (skipped_settlement_rows,
+            skipped_releases_rows), que substituem a leitura desses arquivos,
+            e known_row_keys (Counter por tipo das linhas congeladas no fechamento)
+        """
+        state = {
+            'closed_through': None,
+            'frozen_ids': set(),
+            'frozen_items': [],
+            'frozen_installments': [],
+            'frozen_order_balances': {},
+            'skip_settlement_files': set(),
+            'skip_releases_files': set(),
+            'skipped_settlement_rows': [],
+            'skipped_releases_rows': [],
+            'known_row_keys': {'settlement': Counter(), 'releases': Counter()}
+        }
+        rows_by_file = {'settlement': {}, 'releases': {}}
+
+        directory = self._partition_dir(partition_key)
+        if not directory.exists():
+            return state
+
+        for file_path in sorted(directory.glob('*.json')):
+            snapshot = self._read(file_path)
+            if not snapshot:
+                continue
+
+            state['closed_through'] = snapshot['metadata']['period']
+            state['frozen_items'].extend(snapshot['frozen_items'])
+            state['frozen_installments'].extend(snapshot['frozen_installments'])
+            state['frozen_order_balances'].update(snapshot['frozen_order_balances'])
+            state['frozen_ids'].update(item['source_id'] for item in snapshot['frozen_items'])
+
+            # Só pula arquivos que não mudaram desde o fechamento
+            if partition:
+                state['skip_settlement_files'].update(
+                    self._unchanged(partition['settlement_dir'], snapshot['frozen_files']['settlement'])
+                )
+                state['skip_releases_files'].update(
+                    self._unchanged(partition['releases_dir'], snapshot['frozen_files']['releases'])
+                )
+
+            for kind, keys in snapshot.get('row_keys', {}).items():
+                state['known_row_keys'][kind].update(keys)
+
+            # Linhas por arquivo congelado (o fechamento mais recente prevalece)
+            for kind in rows_by_file:
+                for name, rows in self._file_rows(snapshot, kind).items():
+                    rows_by_file[kind][name] = rows
+
+        # Apenas arquivos efetivamente pulados são repostos (os demais são relidos)
+        state['skipped_settlement_rows'] = [
+            row for name in sorted(state['skip_settlement_files'])
+            for row in rows_by_file['settlement'].get(name, [])
+        ]
+        state['skipped_releases_rows'] = [
+            row for name in sorted(state['skip_releases_files'])
+            for row in rows_by_file['releases'].get(name, [])
+        ]
+
+        return state
+
+    def late_rows(self, state, kind, rows):
+        """Linhas de SOURCE_IDs congelados que não existiam no fechamento
+
+        Args:
+            state: Estado de load_state
+            kind: 'settlement' ou 'releases'
+            rows: Linhas dos SOURCE_IDs congelados lidas dos arquivos (late_rows
+                do processador)
+        """
+        known = Counter(state['known_row_keys'][kind])
+        late = []
+        for row in rows:
+            key = row_key(row, kind)
+            if known[key] > 0:
+                known[key] -= 1
+            else:
+                late.append(row)
+        return late
+
+    def _file_rows(self, snapshot, kind):
+        """Linhas de um snapshot agrupadas por arquivo de origem
+
+        Snapshots antigos guardavam só as linhas dos itens em aberto (carried).
+        """
+        if 'file_rows' in snapshot:
+            rows = snapshot['file_rows'][kind]
+        else:
+            rows = snapshot.get('carried', {}).get(kind, [])
+
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row.get('file_source'), []).append(row)
+        return grouped
+
+    def close_period(self, partition, seller_id, period, settlement_proc, releases_proc, reconciliator):
+        """Fecha um período (YYYY-MM) gravando um snapshot imutável
+
+        Args:
+            partition: Descrição da partição (SellerPartitioner)
+            seller_id: USER_ID da conta
+            period: Mês a fechar (YYYY-MM); inclui todos os meses anteriores ainda abertos
+            settlement_proc, releases_proc, reconciliator: Estado processado da partição
+
+        Returns:
+            Metadados do snapshot gravado
+
+        Raises:
+            ValueError: Período inválido, já fechado ou anterior ao último fechamento
+        """
+        try:
+            datetime.strptime(period, '%Y-%m')
+        except (TypeError, ValueError):
+            raise ValueError(f"Período inválido: {period} (use YYYY-MM)")
+
+        partition_key = partition['partition_key']
+        file_path = self._partition_dir(partition_key) / f'{period}.json'
+
+        if file_path.exists():
+            raise ValueError(f"Período {period} já está fechado para {seller_id}")
+
+        closed = [p['period'] for p in self.list_periods(partition_key)]
+        if closed and period < max(closed):
+            raise ValueError(f"Período {period} é anterior ao último fechamento ({max(closed)})")
+
+        month_by_source = self._source_months(reconciliator)
+        frozen_items = []
+        open_ids = set()
+
+        for status, items in reconciliator.get_results().items():
+            for item in items:
+                source_id = item['source_id']
+                if item.get('frozen'):
+                    continue
+                if month_by_source.get(source_id, '9999-99') > period:
+                    continue
+
+                if status in CLOSED_STATUSES:
+                    frozen_items.append(self._compact_item(item, status, month_by_source[source_id], period))
+                else:
+                    open_ids.add(source_id)
+
+        frozen_ids = {item['source_id'] for item in frozen_items}
+
+        frozen_installments = [
+            i for i in settlement_proc.get_installments()
+            if i.get('source_id') in frozen_ids and not i.get('frozen_period')
+        ]
+        frozen_refs = {i['external_reference'] for i in frozen_installments}
+        frozen_order_balances = {
+            ref: balance for ref, balance in settlement_proc.order_balances.items()
+            if ref in frozen_refs
+        }
+
+        frozen_files = {
+            'settlement': self._closed_files(
+                partition['settlement_dir'], settlement_proc.transactions, month_by_source, period,
+                ['approval_date', 'money_release_date']
+            ),
+            'releases': self._closed_files(
+                partition['releases_dir'], releases_proc.releases, month_by_source, period,
+                ['release_date']
+            )
+        }
+        settlement_files = {f['name'] for f in frozen_files['settlement']}
+        releases_files = {f['name'] for f in frozen_files['releases']}
+
+        snapshot = {
+            'metadata': {
+                'period': period,
+                'seller_id': seller_id,
+                'partition_key': partition_key,
+                'closed_at': datetime.now().isoformat(),
+                'frozen_count': len(frozen_items),
+                'open_count': len(open_ids),
+                'frozen_installments': len(frozen_installments)
+            },
+            'frozen_items': frozen_items,
+            'frozen_installments': [dict(i, frozen_period=period) for i in frozen_installments],
+            'frozen_order_balances': frozen_order_balances,
+            'open_source_ids': sorted(open_ids),
+            'frozen_files': frozen_files,
+            # Linhas dos SOURCE_IDs congelados: base da atividade tardia
+            'row_keys': {
+                'settlement': [
+                    row_key(t, 'settlement') for t in settlement_proc.transactions
+                    if t.get('source_id') in frozen_ids
+                ],
+                'releases': [
+                    row_key(r, 'releases') for r in releases_proc.releases
+                    if r.get('source_id') in frozen_ids
+                ]
+            },
+            # Todas as linhas dos arquivos congelados: repostas quando forem pulados
+            'file_rows': {
+                'settlement': [t for t in settlement_proc.transactions if t.get('file_source') in settlement_files],
+                'releases': [r for r in releases_proc.releases if r.get('file_source') in releases_files]
+            }
+        }
+
+        self._write_immutable(file_path, snapshot)
+        print(f"[OK] Período {period} fechado para {seller_id}: "
+              f"{len(frozen_items)} congelados, {len(open_ids)} em aberto")
+
+        return snapshot['metadata']
+
+    def _source_months(self, reconciliator):
+        """Mês (YYYY-MM) de cada SOURCE_ID: aprovação do settlement ou data mais antiga"""
+        months = {}
+
+        for source_id, data in reconciliator.settlement_by_source.items():
+            settlement = data.get('settlement')
+            if settlement and settlement.get('approval_date'):
+                months[source_id] = settlement['approval_date'][:7]
+                continue
+
+            rows = data['refunds'] + data['chargebacks'] + data['chargeback_cancels'] + data['installments']
+            dates = [r.get('approval_date') for r in rows if r.get('approval_date')]
+            if dates:
+                months[source_id] = min(dates)[:7]
+
+        for source_id, data in reconciliator.releases_by_source.items():
+            if source_id in months:
+                continue
+            rows = [r for rows in data.values() for r in rows]
+            dates = [r.get('release_date') for r in rows if r.get('release_date')]
+            if dates:
+                months[source_id] = min(dates)[:7]
+
+        # Itens congelados anteriormente mantêm o mês original
+        for item in reconciliator.frozen_items:
+            months[item['source_id']] = item['month']
+
+        return months
+
+    def _compact_item(self, item, status, month, period):
+        """Resultado congelado (sem linhas brutas)"""
+        return {
+            'status': status,
+            'source_id': item['source_id'],
+            'rule': item.get('rule'),
+            'settlement_net': item.get('settlement_net'),
+            'releases_net': item.get('releases_net'),
+            'difference': item.get('difference'),
+            'month': month,
+            'frozen': True,
+            'frozen_period': period
+        }
+
+    def _closed_files(self, directory, rows, month_by_source, period, date_fields):
+        """Arquivos cujas linhas pertencem apenas a meses <= período"""
+        max_month = {}
+
+        for row in rows:
+            name = row.get('file_source')
+            if not name:
+                continue
+
+            month = month_by_source.get(row.get('source_id'))
+            if not month:
+                dates = [row.get(f) for f in date_fields if row.get(f)]
+                month = max(dates)[:7] if dates else '9999-99'
+
+            if month > max_month.get(name, ''):
+                max_month[name] = month
+
+        files = []
+        for name, month in sorted(max_month.items()):
+            file_path = Path(directory) / name
+            if month <= period and file_path.exists():
+                file_stat = file_path.stat()
+                files.append({
+                    'name': name,
+                    'size': file_stat.st_size,
+                    'mtime_ns': file_stat.st_mtime_ns
+                })
+        return files
+
+    def _unchanged(self, directory, files):
+        """Nomes dos arquivos congelados que não mudaram desde o fechamento"""
+        names = set()
+        for entry in files:
+            file_path = Path(directory) / entry['name']
+            if not file_path.exists():
+                continue
+            file_stat = file_path.stat()
+            if file_stat.st_size == entry['size'] and file_stat.st_mtime_ns == entry['mtime_ns']:
+                names.add(entry['name'])
+        return names
+
+    def _write_immutable(self, file_path, snapshot):
+        """Grava o snapshot e o marca como somente leitura"""
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_path.with_suffix('.json.tmp')
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'), default=str)
+
+        os.replace(tmp_path, file_path)
+        os.chmod(file_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    def _read(self, file_path):
+        """Lê um snapshot (None se inválido)"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[ERRO] Erro ao carregar snapshot {file_path}: {e}")
+            return None
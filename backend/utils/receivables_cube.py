@@ -0,0 +1,96 @@
+"""
+Receivables Cube - Cubo de recebíveis pré-agregado
+Agrega as parcelas uma única vez por todas as dimensões:
+- Dimensões: status, tipo de pagamento, bandeira/meio, mês de liberação, conta
+- Medidas: quantidade e valor (recebido ou líquido da parcela)
+- Consultas (slice/dice) filtram e reagrupam apenas as células do cubo,
+  sem tocar nas parcelas
+"""
+
+import pandas as pd
+
+
+# Dimensão -> função que extrai o valor da parcela
+DIMENSIONS = {
+    'status': lambda i: i.get('status') or 'unknown',
+    'payment_type': lambda i: i.get('payment_type') or 'unknown',
+    'payment_method': lambda i: i.get('payment_method') or 'unknown',
+    'month': lambda i: (i.get('money_release_date') or '')[:7] or 'unknown',
+    'seller_id': lambda i: i.get('seller_id') or 'unknown'
+}
+
+MEASURES = ['count', 'amount']
+
+
+class ReceivablesCube:
+    """Cubo status x tipo de pagamento x bandeira x mês x conta"""
+
+    def __init__(self, installments, value_func):
+        """
+        Args:
+            installments: Todas as parcelas (inclusive canceladas)
+            value_func: Função parcela -> valor
+        """
+        rows = {name: [extract(i) for i in installments] for name, extract in DIMENSIONS.items()}
+        rows['amount'] = [value_func(i) for i in installments]
+
+        df = pd.DataFrame(rows, columns=list(DIMENSIONS) + ['amount'])
+        df['count'] = 1
+
+        # Uma linha por combinação existente de dimensões (cubo esparso)
+        self.cells = (
+            df.groupby(list(DIMENSIONS), sort=True, observed=True)[MEASURES]
+            .sum()
+            .reset_index()
+        )
+
+    def __len__(self):
+        return len(self.cells)
+
+    def dimension_values(self):
+        """Valores distintos de cada dimensão"""
+        return {
+            name: sorted(self.cells[name].unique().tolist())
+            for name in DIMENSIONS
+        }
+
+    def query(self, group_by=None, filters=None):
+        """Fatia (filters) e reagrupa (group_by) o cubo
+
+        Args:
+            group_by: Lista de dimensões do resultado (vazio = total geral)
+            filters: Dict dimensão -> lista de valores aceitos
+
+        Returns:
+            Dict com 'rows' (uma por combinação de group_by) e 'total'
+
+        Raises:
+            ValueError: Dimensão desconhecida
+        """
+        group_by = list(group_by or [])
+        filters = filters or {}
+
+        unknown = [d for d in group_by + list(filters) if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Dimensões desconhecidas: {', '.join(unknown)} (use {', '.join(DIMENSIONS)})")
+
+        cells = self.cells
+        for name, values in filters.items():
+            cells = cells[cells[name].isin(values)]
+
+        total = {
+            'count': int(cells['count'].sum()),
+            'amount': round(float(cells['amount'].sum()), 2)
+        }
+
+        if not group_by:
+            return {'rows': [], 'total': total}
+
+        grouped = cells.groupby(group_by, sort=True)[MEASURES].sum().reset_index()
+        grouped['count'] = grouped['count'].astype(int)
+        grouped['amount'] = grouped['amount'].round(2)
+
+        return {
+            'rows': grouped.to_dict(orient='records'),
+            'total': total
+        }
@@ -0,0 +1,143 @@
+"""
+Receivables Forecast - Projeção de recebíveis e simulação de antecipação
+Projeta a curva de parcelas pendentes e simula cenários de antecipação:
+- Curva a receber a partir do índice diário do CashFlowCalculatorV2
+- Taxa histórica estimada a partir das taxas fee-release_in_advance
+  e das parcelas recebidas antecipadamente (received_advance)
+- Cenários (janela x taxa) avaliados de uma vez com numpy
+- Modelo de custo: taxa mensal pro rata pelos dias antecipados
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+
+DEFAULT_WINDOWS = [7, 15, 30, 60, 90, 180]
+
+# Taxa mensal (%) usada quando não há histórico de antecipação
+DEFAULT_MONTHLY_RATE = 2.99
+
+
+class ReceivablesForecaster:
+    """Projeção do fluxo a receber e simulação de antecipações"""
+
+    def __init__(self, cashflow, movements_proc=None):
+        """
+        Args:
+            cashflow: CashFlowCalculatorV2 (parcelas e índice diário)
+            movements_proc: MovementsProcessorV2 (histórico de taxas de antecipação)
+        """
+        self.cashflow = cashflow
+        self.movements_proc = movements_proc
+
+    def historical_monthly_rate(self):
+        """Estima a taxa mensal (%) cobrada nas antecipações passadas
+
+        Cada taxa fee-release_in_advance é associada às parcelas antecipadas
+        recebidas no mesmo dia; a taxa mensal é fee / (valor * dias / 30).
+
+        Returns:
+            Dict com rate_percentage (None sem histórico), fees, advanced_amount e dias
+        """
+        fees_by_date = {}
+        if self.movements_proc:
+            for fee in self.movements_proc.get_advance_fees_summary()['fees']:
+                date = (fee['date'] or '')[:10]
+                fees_by_date[date] = fees_by_date.get(date, 0.0) + fee['amount']
+
+        advance = self.cashflow.get_advance_summary()['installments']
+        dates = np.array([(i.get('received_date') or '')[:10] for i in advance], dtype=str)
+        amounts = np.array([i.get('received_amount') or 0.0 for i in advance], dtype=float)
+        days = np.array([max(i.get('days_advance') or 0, 0) for i in advance], dtype=float)
+
+        fee_dates = set(fees_by_date) & set(dates.tolist())
+        matched = np.isin(dates, list(fee_dates))
+        fee_total = sum(fees_by_date[d] for d in fee_dates)
+        amount_days = float(np.sum(amounts[matched] * days[matched]))
+
+        rate = None
+        if fee_total > 0 and amount_days > 0:
+            rate = fee_total / (amount_days / 30) * 100
+
+        return {
+            'rate_percentage': round(rate, 4) if rate is not None else None,
+            'fees_matched': round(fee_total, 2),
+            'advanced_amount': round(float(np.sum(amounts[matched])), 2),
+            'advanced_installments': int(np.sum(matched)),
+            'avg_days_advance': round(float(np.mean(days[matched])), 1) if np.any(matched) else 0
+        }
+
+    def pending_curve(self, as_of=None):
+        """Parcelas pendentes após as_of: (datas, dias à frente, valores)"""
+        as_of = as_of or datetime.now().strftime('%Y-%m-%d')
+        index = self.cashflow.get_index()
+
+        lo = int(np.searchsorted(index.dates, as_of, side='right'))
+        dates = index.dates[lo:]
+        amounts = index.values['pending'][lo:]
+
+        base = np.datetime64(as_of, 'D')
+        days_ahead = (dates.astype('datetime64[D]') - base).astype(np.int64) if len(dates) \
+            else np.zeros(0, dtype=np.int64)
+
+        keep = amounts > 0
+        return dates[keep], days_ahead[keep], amounts[keep]
+
+    def simulate(self, windows=None, rates=None, as_of=None, granularity='week'):
+        """Simula antecipar as parcelas dos próximos N dias para cada (janela, taxa)
+
+        Args:
+            windows: Janelas em dias a antecipar (padrão: DEFAULT_WINDOWS)
+            rates: Taxas mensais (%) a simular (padrão: histórica ou DEFAULT_MONTHLY_RATE)
+            as_of: Data base YYYY-MM-DD (padrão: hoje)
+            granularity: Granularidade da curva projetada
+
+        Returns:
+            Dict com a curva projetada, a taxa histórica e os cenários
+            (valor antecipado, custo, caixa líquido e taxa efetiva)
+        """
+        as_of = as_of or datetime.now().strftime('%Y-%m-%d')
+        windows = np.array(sorted(set(windows or DEFAULT_WINDOWS)), dtype=np.int64)
+
+        historical = self.historical_monthly_rate()
+        if not rates:
+            rates = [historical['rate_percentage'] or DEFAULT_MONTHLY_RATE]
+        rates = np.array(rates, dtype=float)
+
+        _, days_ahead, amounts = self.pending_curve(as_of)
+        total_pending = float(amounts.sum())
+
+        # in_window[w, d]: parcela do dia d cai dentro da janela w
+        in_window = days_ahead[np.newaxis, :] <= windows[:, np.newaxis]
+        gross = in_window @ amounts
+        amount_days = in_window @ (amounts * days_ahead)
+        counts = in_window.sum(axis=1)
+
+        # fee[w, r] = taxa_r/100 * sum(valor * dias / 30)
+        fees = np.outer(amount_days / 30, rates / 100)
+        net = gross[:, np.newaxis] - fees
+
+        scenarios = []
+        for w, window in enumerate(windows):
+            avg_days = amount_days[w] / gross[w] if gross[w] > 0 else 0.0
+            for r, rate in enumerate(rates):
+                scenarios.append({
+                    'window_days': int(window),
+                    'monthly_rate': float(rate),
+                    'days_count': int(counts[w]),
+                    'advanced_gross': round(float(gross[w]), 2),
+                    'fee_cost': round(float(fees[w, r]), 2),
+                    'net_cash': round(float(net[w, r]), 2),
+                    'effective_rate': round(float(fees[w, r] / gross[w] * 100), 4) if gross[w] > 0 else 0.0,
+                    'avg_days_advanced': round(float(avg_days), 1),
+                    'remaining_pending': round(total_pending - float(gross[w]), 2)
+                })
+
+        return {
+            'as_of': as_of,
+            'total_pending': round(total_pending, 2),
+            'historical_rate': historical,
+            'projection': self.cashflow.get_cashflow_series(granularity, as_of),
+            'scenarios': scenarios
+        }
@@ -0,0 +1,151 @@
+"""
+Response Cache - Respostas condicionais das rotas de leitura
+As respostas de leitura só mudam quando um novo snapshot é publicado
+(ou quando o dia vira e parcelas passam para 'overdue'):
+- ETag derivado da versão do snapshot, do dia do rastreador de vencidos,
+  do caminho e dos parâmetros da query (ordem dos parâmetros não importa)
+- If-None-Match com o ETag atual -> 304 sem executar a rota
+- ResponseCache: corpo já serializado por ETag (rota + query + versão) e suas
+  versões comprimidas, com despejo LRU por quantidade e por bytes; esvaziado
+  quando chega uma geração (versão, dia) mais nova; requisições ainda na
+  geração anterior não leem nem esvaziam o cache
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def data_etag(version, day, path, args):
+    """ETag (sem aspas) de uma rota de leitura
+
+    Args:
+        version: Versão do snapshot
+        day: Dia atual do rastreador de vencidos (None se não houver)
+        path: Caminho da requisição
+        args: MultiDict dos parâmetros da query
+    """
+    query = '&'.join(f'{key}={value}' for key, value in sorted(args.items(multi=True)))
+    digest = hashlib.sha1(f'{path}?{query}'.encode('utf-8')).hexdigest()[:16]
+    return f'v{version}-{day or "0"}-{digest}'
+
+
+class ResponseCache:
+    """Cache LRU de respostas serializadas, limitado em bytes e entradas"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=512):
+        """
+        Args:
+            max_bytes: Tamanho máximo somado dos corpos em cache
+            max_entries: Quantidade máxima de respostas em cache
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _order(generation):
+        version, day = generation
+        return version, day or ''
+
+    def _sync(self, generation):
+        """Esvazia o cache se a geração (versão, dia) é mais nova; requer o lock
+
+        Returns:
+            False se a geração é mais antiga que a do cache (requisição atrasada)
+        """
+        if generation == self._generation:
+            return True
+        if self._generation is not None and self._order(generation) < self._order(self._generation):
+            return False
+
+        self._entries.clear()
+        self._bytes = 0
+        self._generation = generation
+        return True
+
+    def get(self, key, generation):
+        """Resposta em cache (dict com body e mimetype) ou None"""
+        with self._lock:
+            if not self._sync(generation):
+                self.misses += 1
+                return None
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, generation, body, mimetype):
+        """Guarda o corpo serializado (ignorado se maior que o limite total
+        ou de uma geração mais antiga)"""
+        size = len(body)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if not self._sync(generation):
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous['size']
+
+            self._entries[key] = {'body': body, 'mimetype': mimetype, 'size': size, 'encodings': {}}
+            self._bytes += size
+            self._evict()
+
+    def get_encoded(self, key, generation, encoding):
+        """Corpo comprimido em cache (None se ainda não foi comprimido)"""
+        with self._lock:
+            if generation != self._generation:
+                return None
+            entry = self._entries.get(key)
+            return entry['encodings'].get(encoding) if entry else None
+
+    def put_encoded(self, key, generation, encoding, body):
+        """Guarda a versão comprimida de uma resposta já em cache"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            entry = self._entries.get(key)
+            if entry is None or encoding in entry['encodings']:
+                return
+            entry['encodings'][encoding] = body
+            entry['size'] += len(body)
+            self._bytes += len(body)
+            self._evict()
+
+    def _evict(self):
+        """Despeja as respostas menos usadas até caber nos limites; requer o lock"""
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted['size']
+            self.evictions += 1
+
+    def clear(self):
+        """Remove todas as respostas"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        """Uso do cache (para diagnóstico)"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
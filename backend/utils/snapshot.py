@@ -0,0 +1,120 @@
+"""
+Snapshot - Conjunto imutável e versionado dos dados processados
+Substitui o dicionário global mutado chave a chave:
+- Todos os processadores, partições e o rastreador de vencidos em um objeto
+- Atributos não podem ser reatribuídos e as partições são somente leitura
+- Publicado com uma única troca de referência (atômica no CPython)
+- Leitores pegam a referência uma vez por requisição, sem lock, e nunca veem
+  uma publicação pela metade; apenas quem publica serializa pelo lock do SnapshotStore
+
+Exceção à imutabilidade: a virada de dia não publica uma nova versão. O
+OverdueTracker do snapshot altera no lugar o status das parcelas, as visões do
+InstallmentIndex e o cache do fluxo de caixa (via on_promote/on_change). O
+snapshot fica imutável apenas na referência aos objetos; quem depende do dia
+(ETag, cache de respostas) usa (versão, overdue_tracker.today).
+"""
+
+import itertools
+import threading
+from datetime import datetime
+from types import MappingProxyType
+
+
+# Processadores da visão consolidada (acessados como snapshot['campo'])
+FIELDS = (
+    'settlement_proc',
+    'releases_proc',
+    'reconciliator',
+    'movements_proc',
+    'cashflow',
+    'ledger',
+    'payout_attribution',
+    'installment_index'
+)
+
+
+class DataSnapshot:
+    """Versão imutável dos dados processados"""
+
+    __slots__ = ('version', 'published_at', 'processed', 'partitions', 'overdue_tracker', '_fields')
+
+    def __init__(self, version, partitions=None, overdue_tracker=None, **fields):
+        """
+        Args:
+            version: Número da versão (crescente a cada publicação)
+            partitions: Dict partition_key -> resultado de _process_partition
+            overdue_tracker: OverdueTracker das parcelas consolidadas
+            **fields: Processadores consolidados (ver FIELDS); vazio = não processado
+        """
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+
+        values = {name: fields.get(name) for name in FIELDS}
+        set_attr = object.__setattr__
+        set_attr(self, 'version', version)
+        set_attr(self, 'published_at', datetime.now().isoformat())
+        set_attr(self, 'processed', all(value is not None for value in values.values()))
+        set_attr(self, 'partitions', MappingProxyType(dict(partitions or {})))
+        set_attr(self, 'overdue_tracker', overdue_tracker)
+        set_attr(self, '_fields', MappingProxyType(values))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('DataSnapshot é imutável; publique uma nova versão')
+
+    def __delattr__(self, name):
+        raise AttributeError('DataSnapshot é imutável; publique uma nova versão')
+
+    def __getitem__(self, name):
+        if name == 'processed':
+            return self.processed
+        return self._fields[name]
+
+    def replace(self, version, **changes):
+        """Nova versão com alguns campos trocados (o snapshot atual não muda)"""
+        fields = dict(self._fields)
+        partitions = changes.pop('partitions', self.partitions)
+        overdue_tracker = changes.pop('overdue_tracker', self.overdue_tracker)
+        fields.update(changes)
+        return DataSnapshot(version, partitions, overdue_tracker, **fields)
+
+    def describe(self):
+        """Versão e estado (para diagnóstico)"""
+        return {
+            'version': self.version,
+            'published_at': self.published_at,
+            'processed': self.processed,
+            'partitions': len(self.partitions)
+        }
+
+
+class SnapshotStore:
+    """Referência para o snapshot atual, trocada atomicamente a cada publicação"""
+
+    def __init__(self):
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        self._current = DataSnapshot(0)
+
+    @property
+    def current(self):
+        """Snapshot atual (leitura sem lock; guarde a referência durante a requisição)"""
+        return self._current
+
+    def publish(self, partitions=None, overdue_tracker=None, **fields):
+        """Publica um novo conjunto completo de dados"""
+        with self._lock:
+            snapshot = DataSnapshot(next(self._versions), partitions, overdue_tracker, **fields)
+            self._current = snapshot
+        return snapshot
+
+    def update(self, **changes):
+        """Publica uma nova versão trocando alguns campos do snapshot atual"""
+        with self._lock:
+            snapshot = self._current.replace(next(self._versions), **changes)
+            self._current = snapshot
+        return snapshot
+
+    def clear(self):
+        """Publica um snapshot vazio (não processado)"""
+        return self.publish()
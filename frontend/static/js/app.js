@@ -101,7 +101,7 @@ async function processData() {
     btn.disabled = true;
     btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Processando...';
 
-    showInfo("Processando dados... Isso pode levar alguns segundos.");
+    showInfo("Processando dados em segundo plano...");
 
     const response = await fetch("/api/process", {
       method: "POST",
@@ -109,12 +109,18 @@ async function processData() {
 
     const data = await response.json();
 
-    if (data.success) {
+    if (!data.success) {
+      throw new Error(data.error || "Erro desconhecido");
+    }
+
+    const job = await pollProcessJob(data.job_id, btn);
+
+    if (job.status === "done") {
       showSuccess("Dados processados com sucesso!");
       state.processed = true;
       await loadSummary();
     } else {
-      throw new Error(data.error || "Erro desconhecido");
+      throw new Error(job.error || "Erro desconhecido");
     }
   } catch (error) {
     console.error("Erro ao processar:", error);
@@ -125,6 +131,28 @@ async function processData() {
   }
 }
 
+async function pollProcessJob(jobId, btn, interval = 1000) {
+  // Consulta o job até terminar, exibindo etapa, progresso e ETA no botão
+  while (true) {
+    const response = await fetch(`/api/process/jobs/${jobId}`);
+    const data = await response.json();
+
+    if (!data.success) {
+      throw new Error(data.error || "Job não encontrado");
+    }
+
+    const job = data.job;
+    if (job.status === "done" || job.status === "failed") {
+      return job;
+    }
+
+    const eta = job.eta_seconds !== null ? ` - ~${Math.ceil(job.eta_seconds)}s` : "";
+    btn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> ${job.stage || "Na fila"} (${Math.round(job.progress)}%${eta})`;
+
+    await new Promise((resolve) => setTimeout(resolve, interval));
+  }
+}
+
 async function clearCache() {
   try {
     const response = await fetch("/api/reset");
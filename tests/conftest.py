@@ -0,0 +1,94 @@
+"""
+Fixtures compartilhadas: diretório de trabalho temporário com os relatórios
+de exemplo (data/settlement_total.xlsx e data/recebimento_total.xlsx)
+"""
+
+import contextlib
+import io
+import shutil
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+SETTLEMENT_FILE = ROOT / 'data' / 'settlement_total.xlsx'
+RELEASES_FILE = ROOT / 'data' / 'recebimento_total.xlsx'
+
+
+def _require_data():
+    if not SETTLEMENT_FILE.exists() or not RELEASES_FILE.exists():
+        pytest.skip('Relatórios de exemplo não encontrados em data/')
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Diretório com data/settlement e data/recebimentos (um arquivo cada)"""
+    _require_data()
+    (tmp_path / 'data' / 'settlement').mkdir(parents=True)
+    (tmp_path / 'data' / 'recebimentos').mkdir(parents=True)
+    shutil.copy(SETTLEMENT_FILE, tmp_path / 'data' / 'settlement' / SETTLEMENT_FILE.name)
+    shutil.copy(RELEASES_FILE, tmp_path / 'data' / 'recebimentos' / RELEASES_FILE.name)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def split_workspace(tmp_path, monkeypatch):
+    """Diretório com os relatórios divididos em 'até 2025-02' e 'depois'
+
+    A divisão é pelo mês do SOURCE_ID (primeira aprovação no settlement ou
+    primeira liberação), de modo que o arquivo antigo pode ser pulado ao
+    fechar 2025-02.
+    """
+    _require_data()
+    settlement = pd.read_excel(SETTLEMENT_FILE)
+    releases = pd.read_excel(RELEASES_FILE)
+
+    months = (
+        settlement.assign(month=settlement['APPROVAL_DATE'].astype(str).str[:7])
+        .groupby(settlement['SOURCE_ID'].astype(str))['month'].min()
+        .to_dict()
+    )
+    release_months = (
+        releases.assign(month=releases['RELEASE_DATE'].astype(str).str[:7])
+        .groupby(releases['SOURCE_ID'].astype(str))['month'].min()
+        .to_dict()
+    )
+    for source_id, month in release_months.items():
+        months.setdefault(source_id, month)
+
+    def early(df):
+        return df['SOURCE_ID'].astype(str).map(months).fillna('9999-99') <= '2025-02'
+
+    for folder, df, name in [('settlement', settlement, 'settlement'), ('recebimentos', releases, 'recebimento')]:
+        directory = tmp_path / 'data' / folder
+        directory.mkdir(parents=True)
+        mask = early(df)
+        df[mask].to_excel(directory / f'{name}_1_antigo.xlsx', index=False)
+        df[~mask].to_excel(directory / f'{name}_2_atual.xlsx', index=False)
+
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    """Módulo app com o snapshot limpo (saída do processamento silenciada)"""
+    import app
+
+    app._snapshots.clear()
+    app._response_cache.clear()
+    yield app
+    app._snapshots.clear()
+    app._response_cache.clear()
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silencia os prints do pipeline"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
@@ -0,0 +1,31 @@
+"""
+Testes do aging: vencida só depois do dia de money_release_date (como o OverdueTracker)
+"""
+
+from backend.utils.aging import compute_aging
+from backend.utils.overdue_tracker import OverdueTracker
+
+
+def _installment(date, amount):
+    return {'status': 'pending', 'money_release_date': f'{date}T00:00:00', 'amount': amount, 'payment_type': 'credit_card'}
+
+
+def test_due_today_is_not_past_due():
+    installments = [_installment('2025-01-10', 100.0), _installment('2025-01-05', 40.0)]
+
+    aging = compute_aging(installments, lambda i: i['amount'], as_of='2025-01-10')
+
+    assert aging['total_open'] == 140.0
+    assert aging['total_past_due'] == 40.0
+    assert aging['avg_days_past_due'] == 5.0
+    assert aging['buckets']['0-30']['count'] == 2
+
+
+def test_past_due_matches_overdue_tracker():
+    installments = [_installment('2025-01-10', 100.0), _installment('2025-01-05', 40.0)]
+    OverdueTracker(installments, today='2025-01-10')
+
+    aging = compute_aging(installments, lambda i: i['amount'], as_of='2025-01-10')
+
+    overdue = sum(i['amount'] for i in installments if i['status'] == 'overdue')
+    assert aging['total_past_due'] == overdue
@@ -0,0 +1,51 @@
+"""
+Testes do progresso por etapa de ProcessingJob
+"""
+
+import pytest
+
+from backend.utils.jobs import ProcessingJob
+
+
+def test_stage_done_only_after_every_partition():
+    job = ProcessingJob(['settlement'])
+    job.expect(['settlement'], ['a', 'b'])
+
+    with job.step('settlement', 'a'):
+        pass
+    # A mesma partição de novo não conta como a outra
+    with job.step('settlement', 'a'):
+        pass
+    assert job.stages['settlement']['status'] == 'running'
+
+    with job.step('settlement', 'b'):
+        pass
+    assert job.stages['settlement']['status'] == 'done'
+
+
+def test_exception_marks_stage_failed():
+    job = ProcessingJob(['settlement', 'merge'])
+    job.expect(['settlement'], ['a', 'b'])
+
+    with pytest.raises(RuntimeError):
+        with job.step('settlement', 'a'):
+            raise RuntimeError('arquivo inválido')
+
+    with job.step('settlement', 'b'):
+        pass
+
+    stage = job.stages['settlement']
+    assert stage['status'] == 'failed'
+    assert stage['failed_partition'] == 'a'
+    assert stage['seconds'] is not None
+
+
+def test_stage_without_partitions_is_skipped():
+    job = ProcessingJob(['settlement', 'merge'])
+    job.expect(['settlement'], [])
+
+    with job.step('merge'):
+        pass
+
+    assert job.stages['settlement']['status'] == 'skipped'
+    assert job.stages['merge']['status'] == 'done'
@@ -0,0 +1,47 @@
+"""
+Testes do MismatchExplainer
+"""
+
+from backend.processors.mismatch_explainer import MismatchExplainer
+
+
+def _item(settlement_net, releases_net, payments=(), settlement_amount=None):
+    return {
+        'source_id': '1',
+        'settlement_net': settlement_net,
+        'releases_net': releases_net,
+        'settlement': {'settlement_net_amount': settlement_net if settlement_amount is None else settlement_amount},
+        'payments': [{'net_credit_amount': amount, 'release_date': '2025-01-10'} for amount in payments]
+    }
+
+
+def test_zero_gap_is_no_difference():
+    explanation = MismatchExplainer().explain(_item(100.0, 100.0, payments=[100.0]))
+
+    assert explanation['result'] == 'no_difference'
+    assert explanation['components'] == []
+
+
+def test_all_rows_missing_is_not_an_explanation():
+    # Marcar settlement e payment como faltantes soma exatamente a diferença
+    explanation = MismatchExplainer().explain(_item(397.18, 120.0, payments=[120.0]))
+
+    assert explanation['result'] == 'not_found'
+    assert explanation['rows_considered'] == 2
+
+
+def test_single_row_explains_gap():
+    explanation = MismatchExplainer().explain(_item(100.0, 150.0, payments=[100.0, 50.0]))
+
+    assert explanation['result'] == 'explained'
+    assert [(c['component'], c['kind'], c['explained_amount']) for c in explanation['components']] == [
+        ('payment', 'missing', -50.0)
+    ]
+
+
+def test_summary_counts_no_difference():
+    summary = MismatchExplainer().explain_all([_item(10.0, 10.0, payments=[10.0]), _item(100.0, 150.0, payments=[100.0, 50.0])])
+
+    assert summary['no_difference'] == 1
+    assert summary['explained'] == 1
+    assert summary['not_found'] == 0
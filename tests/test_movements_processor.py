@@ -0,0 +1,103 @@
+"""
+Testes de MovementsProcessorV2 (taxas de antecipação e ciclo das reservas)
+"""
+
+from backend.processors.movements_processor import MovementsProcessorV2
+
+
+def _fee(source_id, date, amount):
+    return {
+        'description': 'fee-release_in_advance',
+        'source_id': source_id,
+        'release_date': f'{date}T00:00:00',
+        'net_credit_amount': 0.0,
+        'net_debit_amount': -amount,
+        'gross_amount': -amount,
+        'mp_fee': 0.0
+    }
+
+
+def _installment(source_id, date, amount, days):
+    return {
+        'source_id': source_id,
+        'external_reference': f'ref-{source_id}',
+        'installment_number': 1,
+        'payment_type': 'credit_card',
+        'status': 'received_advance',
+        'received_date': date,
+        'received_amount': amount,
+        'days_advance': days
+    }
+
+
+def test_no_fees_and_no_installments():
+    result = MovementsProcessorV2([]).get_advance_fee_rates([])
+
+    assert result['summary']['count'] == 0
+    assert result['summary']['installments_without_fee'] == 0
+    assert result['summary']['fees_without_installments'] == 0
+    assert result['by_day'] == []
+    assert result['by_payment_type'] == []
+    assert result['installments'] == []
+
+
+def test_installment_without_fees():
+    result = MovementsProcessorV2([]).get_advance_fee_rates([_installment('1', '2025-01-10', 100.0, 30)])
+
+    assert result['summary']['count'] == 0
+    assert result['summary']['installments_without_fee'] == 1
+    assert result['installments'] == []
+
+
+def test_fees_without_installments():
+    result = MovementsProcessorV2([_fee('1', '2025-01-10', 2.5)]).get_advance_fee_rates([])
+
+    assert result['summary']['count'] == 0
+    assert result['summary']['fees_without_installments'] == 2.5
+    assert result['installments'] == []
+
+
+def test_date_fee_without_installments_in_date_group():
+    # A única parcela do dia é agrupada pelo SOURCE_ID; a taxa '2' cai no grupo
+    # da data, que fica sem parcelas
+    processor = MovementsProcessorV2([_fee('1', '2025-01-10', 2.0), _fee('2', '2025-01-10', 1.5)])
+    result = processor.get_advance_fee_rates([_installment('1', '2025-01-10', 100.0, 30)])
+
+    assert result['summary']['fee'] == 2.0
+    assert result['summary']['fees_without_installments'] == 1.5
+
+
+def test_fee_matched_by_source_id():
+    processor = MovementsProcessorV2([_fee('1', '2025-01-10', 2.0)])
+    result = processor.get_advance_fee_rates([_installment('1', '2025-01-10', 100.0, 30)])
+
+    assert result['summary']['count'] == 1
+    assert result['summary']['fee'] == 2.0
+    assert result['summary']['rate_pct'] == 2.0
+    assert result['installments'][0]['fee'] == 2.0
+
+
+def _reserve(description, source_id, date, credit=0.0, debit=0.0):
+    return {
+        'description': description,
+        'source_id': source_id,
+        'release_date': date,
+        'net_credit_amount': credit,
+        'net_debit_amount': debit,
+        'gross_amount': credit - debit,
+        'mp_fee': 0.0
+    }
+
+
+def test_reserve_lifecycle_skips_undated_rows():
+    processor = MovementsProcessorV2([
+        _reserve('reserve_for_dispute', '1', '2025-01-10T00:00:00', debit=50.0),
+        _reserve('reserve_for_dispute', '1', '2025-01-20T00:00:00', credit=50.0),
+        _reserve('reserve_for_dispute', '2', None, debit=30.0)
+    ])
+
+    lifecycle = processor.get_reserve_lifecycle(as_of='2025-02-01')
+
+    assert [(p['source_id'], p['held_days']) for p in lifecycle['pairs']] == [('1', 10)]
+    assert lifecycle['open'] == []
+    assert [(u['source_id'], u['debit']) for u in lifecycle['undated']] == [('2', 30.0)]
@@ -0,0 +1,50 @@
+"""
+Testes da virada de dia do OverdueTracker
+"""
+
+import threading
+
+from backend.utils.overdue_tracker import OverdueTracker
+
+
+def _pending(source_id, date):
+    return {'source_id': source_id, 'status': 'pending', 'money_release_date': f'{date}T00:00:00'}
+
+
+def test_new_day_is_published_after_callbacks():
+    seen = []
+    tracker = OverdueTracker([_pending('1', '2025-01-10')], today='2025-01-05')
+    tracker._on_promote.append(lambda items, old, new: seen.append(('promote', tracker.today)))
+    tracker._on_change.append(lambda: seen.append(('change', tracker.today)))
+
+    assert tracker.advance('2025-01-11') == 1
+    assert seen == [('promote', '2025-01-05'), ('change', '2025-01-05')]
+    assert tracker.today == '2025-01-11'
+
+
+def test_new_day_readers_wait_for_callbacks():
+    entered = threading.Event()
+    release = threading.Event()
+
+    def slow_promote(items, old, new):
+        entered.set()
+        release.wait(5)
+
+    tracker = OverdueTracker([_pending('1', '2025-01-10')], today='2025-01-05', on_promote=[slow_promote])
+    roller = threading.Thread(target=tracker.advance, args=('2025-01-11',))
+    roller.start()
+    assert entered.wait(5)
+
+    reader_done = threading.Event()
+    reader = threading.Thread(target=lambda: (tracker.advance('2025-01-11'), reader_done.set()))
+    reader.start()
+
+    assert not reader_done.wait(0.2)
+    assert tracker.today == '2025-01-05'
+
+    release.set()
+    roller.join(5)
+    reader.join(5)
+    assert reader_done.is_set()
+    assert tracker.today == '2025-01-11'
+    assert tracker.promoted_total == 1
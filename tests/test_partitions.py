@@ -0,0 +1,38 @@
+"""
+Partições por conta: conta duplicada e colisão de external_reference no merge
+"""
+
+import shutil
+
+import pytest
+
+from backend.processors.settlement_processor import SettlementProcessorV3
+from conftest import RELEASES_FILE, SETTLEMENT_FILE, quiet
+
+SELLER_ID = '309435303'
+
+
+def test_root_files_of_a_seller_with_folder_are_rejected(workspace, app_module):
+    for folder, source in [('settlement', SETTLEMENT_FILE), ('recebimentos', RELEASES_FILE)]:
+        seller_dir = workspace / 'data' / folder / SELLER_ID
+        seller_dir.mkdir()
+        shutil.copy(source, seller_dir / source.name)
+
+    with quiet(), pytest.raises(ValueError, match=SELLER_ID):
+        app_module.process_all_data()
+
+    assert not app_module._snapshots.current.processed
+
+
+def test_merge_keys_order_balances_by_seller():
+    first, second = SettlementProcessorV3(), SettlementProcessorV3()
+    first.order_balances['PEDIDO-1'] = {'final_net': 10.0}
+    second.order_balances['PEDIDO-1'] = {'final_net': 20.0}
+
+    merged = SettlementProcessorV3.merge([first, second], ['A', 'B'])
+
+    assert merged.order_balances == {
+        ('A', 'PEDIDO-1'): {'final_net': 10.0},
+        ('B', 'PEDIDO-1'): {'final_net': 20.0}
+    }
+    assert merged.find_order_balances('PEDIDO-1') == {'A': {'final_net': 10.0}, 'B': {'final_net': 20.0}}
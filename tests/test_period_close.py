@@ -0,0 +1,110 @@
+"""
+Fechamento de período: saldos e contagens não podem mudar ao fechar um mês
+(itens congelados saem só da conciliação; arquivos pulados são repostos)
+"""
+
+from collections import Counter
+
+from backend.utils.period_close import PeriodCloseManager, row_key
+from conftest import quiet
+
+
+def _state(app):
+    snapshot = app._snapshots.current
+    releases = snapshot['releases_proc'].releases
+    keys = [
+        (r['source_id'], r.get('description'), r.get('release_date'),
+         r.get('net_credit_amount'), r.get('net_debit_amount'))
+        for r in releases
+    ]
+    ledger = snapshot['ledger'].get_summary()
+    return {
+        'releases': len(releases),
+        'duplicate_release_keys': len(keys) - len(set(keys)),
+        'settlement_transactions': len(snapshot['settlement_proc'].transactions),
+        'installments': len(snapshot['settlement_proc'].get_installments()),
+        'installment_statuses': Counter(i['status'] for i in snapshot['settlement_proc'].get_installments()),
+        'movements': len(snapshot['movements_proc'].movements),
+        'payouts': snapshot['payout_attribution'].get_summary()['count'],
+        'ledger_count': ledger['count'],
+        'closing_balance': ledger['closing_balance'],
+        'total_credits': ledger['total_credits'],
+        'total_debits': ledger['total_debits']
+    }
+
+
+def _close(app, period):
+    client = app.app.test_client()
+    with quiet():
+        response = client.post('/api/periods/close', json={'period': period})
+    assert response.status_code == 200, response.get_json()
+    return client
+
+
+def test_close_keeps_ledger_and_counts(workspace, app_module):
+    with quiet():
+        app_module.process_all_data()
+    before = _state(app_module)
+    reconciliation_before = app_module._snapshots.current['reconciliator'].get_summary()
+
+    _close(app_module, '2025-03')
+    after = _state(app_module)
+
+    assert after == before
+    assert app_module._snapshots.current['reconciliator'].get_summary() == reconciliation_before
+
+    # Parcelas dos SOURCE_IDs congelados vêm do snapshot, não do recálculo
+    snapshot = app_module._snapshots.current
+    frozen_ids = {i['source_id'] for i in snapshot['reconciliator'].frozen_items}
+    installments = [i for i in snapshot['settlement_proc'].get_installments() if i['source_id'] in frozen_ids]
+    assert frozen_ids and installments
+    assert all(i.get('frozen_period') == '2025-03' for i in installments)
+
+
+def test_close_with_skipped_files_keeps_ledger_and_counts(split_workspace, app_module):
+    with quiet():
+        app_module.process_all_data()
+    before = _state(app_module)
+
+    _close(app_module, '2025-02')
+
+    # O arquivo antigo deve ter sido pulado e reposto a partir do snapshot
+    partition = next(iter(app_module._partitioner.discover().values()))
+    state = app_module._period_manager.load_state(partition['partition_key'], partition)
+    assert state['skip_releases_files'] == {'recebimento_1_antigo.xlsx'}
+    assert state['skip_settlement_files'] == {'settlement_1_antigo.xlsx'}
+
+    assert _state(app_module) == before
+
+    # Reprocessar de novo (apenas a partir dos snapshots) também não muda nada
+    with quiet():
+        app_module.process_all_data(force=True)
+    assert _state(app_module) == before
+
+
+def _late_activity(client):
+    sellers = client.get('/api/periods').get_json()['sellers']
+    return sum(s['late_activity']['count'] for s in sellers)
+
+
+def test_close_then_reprocess_same_data_has_no_late_activity(workspace, app_module):
+    with quiet():
+        app_module.process_all_data()
+
+    client = _close(app_module, '2025-03')
+    assert _late_activity(client) == 0
+
+    with quiet():
+        app_module.process_all_data(force=True)
+    assert _late_activity(client) == 0
+
+
+def test_late_rows_keeps_only_rows_missing_at_close():
+    known = {'source_id': '1', 'release_date': '2025-03-10', 'description': 'payment', 'net_credit_amount': 10.0}
+    new = dict(known, release_date='2025-05-02', description='refund')
+    state = {'known_row_keys': {'releases': Counter([row_key(known, 'releases')]), 'settlement': Counter()}}
+
+    late = PeriodCloseManager().late_rows(state, 'releases', [dict(known), new, dict(known)])
+
+    # A segunda cópia da linha conhecida também é nova
+    assert late == [new, known]
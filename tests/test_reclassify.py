@@ -0,0 +1,55 @@
+"""
+Reclassificação: apply publica uma nova versão; regras inválidas retornam 400
+"""
+
+import pytest
+
+from conftest import quiet
+
+
+def _buckets(reconciliator):
+    return {status: len(items) for status, items in reconciliator.get_results().items()}
+
+
+def test_apply_publishes_new_snapshot_without_touching_previous(workspace, app_module):
+    with quiet():
+        app_module.process_all_data()
+
+    previous = app_module._snapshots.current
+    reconciliator = previous['reconciliator']
+    buckets = _buckets(reconciliator)
+    statuses = [item['status'] for item in reconciliator._items]
+    aggregate_statuses = list(reconciliator.aggregates['status'])
+
+    client = app_module.app.test_client()
+    response = client.post('/api/reconciliation/reclassify', json={'params': {'tolerance': 1000}, 'apply': True})
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['reclassification']['applied']
+
+    current = app_module._snapshots.current
+    assert current.version > previous.version
+    assert _buckets(current['reconciliator']) != buckets
+    assert next(iter(current.partitions.values()))['reconciliator'] is not reconciliator
+
+    # O snapshot anterior (ainda em uso por leitores) não mudou
+    assert _buckets(reconciliator) == buckets
+    assert [item['status'] for item in reconciliator._items] == statuses
+    assert list(reconciliator.aggregates['status']) == aggregate_statuses
+
+
+@pytest.mark.parametrize('body', [
+    {'rules': ['refund', 'mismatch']},
+    {'rules': [{'name': 'x', 'status': 'mismatch', 'when': {'field': 'difference', 'op': '>', 'value': 'abc'}}]},
+    {'rules': [{'name': 'x', 'status': 'mismatch', 'when': {'all': {'field': 'difference'}}}]},
+    {'params': {'tolerance': 'abc'}},
+    {'params': ['tolerance']}
+])
+def test_malformed_rules_return_400(workspace, app_module, body):
+    with quiet():
+        app_module.process_all_data()
+    version = app_module._snapshots.current.version
+
+    response = app_module.app.test_client().post('/api/reconciliation/reclassify', json=dict(body, apply=True))
+
+    assert response.status_code == 400, response.get_json()
+    assert app_module._snapshots.current.version == version
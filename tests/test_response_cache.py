@@ -0,0 +1,37 @@
+"""
+Testes do ResponseCache: gerações (versão, dia) antigas não esvaziam o cache
+"""
+
+from backend.utils.response_cache import ResponseCache
+
+
+def test_stale_generation_does_not_clear_newer_entries():
+    cache = ResponseCache()
+    cache.put('a', (2, '2025-01-10'), b'novo', 'application/json')
+
+    # Requisição ainda com o snapshot anterior
+    assert cache.get('a', (1, '2025-01-10')) is None
+    cache.put('b', (1, '2025-01-10'), b'antigo', 'application/json')
+
+    assert cache.get('a', (2, '2025-01-10'))['body'] == b'novo'
+    assert cache.get('b', (2, '2025-01-10')) is None
+
+
+def test_newer_generation_resets_cache():
+    cache = ResponseCache()
+    cache.put('a', (2, '2025-01-10'), b'dia 10', 'application/json')
+
+    assert cache.get('a', (2, '2025-01-11')) is None
+    cache.put('a', (2, '2025-01-11'), b'dia 11', 'application/json')
+
+    assert cache.get('a', (2, '2025-01-10')) is None
+    assert cache.get('a', (2, '2025-01-11'))['body'] == b'dia 11'
+    assert cache.get_stats()['entries'] == 1
+
+
+def test_generation_without_day():
+    cache = ResponseCache()
+    cache.put('a', (1, None), b'x', 'application/json')
+
+    assert cache.get('a', (1, None))['body'] == b'x'
+    assert cache.get('a', (2, '2025-01-10')) is None